@@ -0,0 +1,141 @@
+# plugins/GroupInsight/analytics.py
+
+from array import array
+from typing import Dict, List, NamedTuple, Tuple
+
+from .invite_graph import InviteGraph
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+TOP_N = 10
+
+
+class GroupStats(NamedTuple):
+    """群邀请关系的统计结果，人数均只计在群成员（已退群的邀请人仅作为“邀请人已退群”统计的依据）。"""
+    member_count: int
+    leaver_inviter_count: int          # 花名册中被引用、但已退群的邀请人数
+    no_inviter_count: int              # 无邀请人的成员（扫码入群等）
+    inviter_left_count: int            # 邀请人已退群的成员
+    isolated_count: int                # 无邀请人且未邀请任何人的成员
+    cycle_count: int
+    cycle_member_count: int
+    tree_count: int                    # 至少邀请过一人的顶级邀请人（邀请树）数
+    max_depth: int
+    depth_histogram: List[int]         # 下标为深度，值为该深度的成员数
+    top_direct: List[Tuple[int, int]]  # (节点下标, 直接邀请的在群人数)
+    top_downline: List[Tuple[int, int]]  # (节点下标, 全部下级在群人数)
+    max_downline: int
+    mean_downline: float               # 邀请过人的成员的平均下级数
+    p90_downline: int
+    # 最大直接邀请数 / 图中节点数（含仅作为邀请人出现的已退群节点）。绘制全群时 choose_engine 的分母
+    # len(plan.nodes) + 折叠人数恰为全部节点数，二者相同；分页绘制单棵子树时只统计该子树，可能不同
+    star_ratio: float
+
+
+def compute_group_stats(graph: InviteGraph, top_n: int = TOP_N) -> GroupStats:
+    """对整张邀请图做一次性统计，使用 NumPy 数组运算；仅在无法导入 NumPy 的环境中退化为等价的纯 Python 实现。"""
+    if np is not None:
+        return _compute_numpy(graph, top_n)
+    return _compute_python(graph, top_n)
+
+
+def _compute_numpy(graph: InviteGraph, top_n: int) -> GroupStats:
+    n = len(graph)
+    m = graph.member_count
+    parent = np.frombuffer(graph.parent, dtype=np.int32) if n else np.zeros(0, dtype=np.int32)
+    tree_parent = np.frombuffer(graph.tree_parent, dtype=np.int32) if n else parent
+    depth = np.frombuffer(graph.depth, dtype=np.int32)[:m] if n else parent
+    is_member = np.zeros(n, dtype=np.int64)
+    is_member[:m] = 1
+
+    member_parent = parent[:m]
+    has_parent = member_parent >= 0
+    direct = np.bincount(tree_parent[:m][tree_parent[:m] >= 0], minlength=n) if m else np.zeros(n, dtype=np.int64)
+
+    # 欧拉序上在群标记的前缀和：order[tin[v]:tout[v]] 即 v 的子树，区间和即子树内在群人数
+    if n:
+        order = np.frombuffer(graph.order, dtype=np.int32)
+        prefix = np.concatenate(([0], np.cumsum(is_member[order])))
+        tin = np.frombuffer(graph.tin, dtype=np.int32)
+        tout = np.frombuffer(graph.tout, dtype=np.int32)
+        downline = prefix[tout] - prefix[tin] - is_member
+    else:
+        downline = np.zeros(0, dtype=np.int64)
+
+    inviters = downline[downline > 0]
+    roots = tree_parent == -1
+    cycle_nodes = sum(len(c) for c in graph.cycles)
+    return GroupStats(
+        member_count=m,
+        leaver_inviter_count=n - m,
+        no_inviter_count=int(np.count_nonzero(~has_parent)),
+        inviter_left_count=int(np.count_nonzero(member_parent >= m)),
+        isolated_count=int(np.count_nonzero(roots[:m] & (direct[:m] == 0))),
+        cycle_count=len(graph.cycles),
+        cycle_member_count=cycle_nodes,
+        tree_count=int(np.count_nonzero(roots & (direct > 0))),
+        max_depth=int(depth.max()) if m else 0,
+        depth_histogram=np.bincount(depth).tolist() if m else [],
+        top_direct=_top_numpy(direct, top_n),
+        top_downline=_top_numpy(downline, top_n),
+        max_downline=int(inviters.max()) if inviters.size else 0,
+        mean_downline=float(inviters.mean()) if inviters.size else 0.0,
+        p90_downline=int(np.percentile(inviters, 90, method='lower')) if inviters.size else 0,
+        star_ratio=float(direct.max()) / n if m else 0.0,
+    )
+
+
+def _top_numpy(values, top_n: int) -> List[Tuple[int, int]]:
+    if not values.size:
+        return []
+    # 按数值降序、下标升序排序，与纯 Python 实现的并列顺序一致
+    idx = np.lexsort((np.arange(values.size), -values))[:top_n]
+    return [(int(v), int(values[v])) for v in idx if values[v] > 0]
+
+
+def _compute_python(graph: InviteGraph, top_n: int) -> GroupStats:
+    n = len(graph)
+    m = graph.member_count
+    direct = array('i', [0]) * n
+    for v in range(m):
+        p = graph.tree_parent[v]
+        if p >= 0:
+            direct[p] += 1
+
+    prefix = array('i', [0]) * (n + 1)
+    for i, v in enumerate(graph.order):
+        prefix[i + 1] = prefix[i] + (1 if v < m else 0)
+    downline = [prefix[graph.tout[v]] - prefix[graph.tin[v]] - (1 if v < m else 0) for v in range(n)]
+
+    depth_histogram: Dict[int, int] = {}
+    for v in range(m):
+        depth_histogram[graph.depth[v]] = depth_histogram.get(graph.depth[v], 0) + 1
+    max_depth = max(depth_histogram, default=0)
+    inviters = sorted(d for d in downline if d > 0)
+    roots = [v for v in range(n) if graph.tree_parent[v] == -1]
+
+    def top(values) -> List[Tuple[int, int]]:
+        ranked = sorted((v for v in range(n) if values[v] > 0), key=lambda v: (-values[v], v))
+        return [(v, values[v]) for v in ranked[:top_n]]
+
+    return GroupStats(
+        member_count=m,
+        leaver_inviter_count=n - m,
+        no_inviter_count=sum(1 for v in range(m) if graph.parent[v] < 0),
+        inviter_left_count=sum(1 for v in range(m) if graph.parent[v] >= m),
+        isolated_count=sum(1 for v in roots if v < m and not direct[v]),
+        cycle_count=len(graph.cycles),
+        cycle_member_count=sum(len(c) for c in graph.cycles),
+        tree_count=sum(1 for v in roots if direct[v]),
+        max_depth=max_depth,
+        depth_histogram=[depth_histogram.get(d, 0) for d in range(max_depth + 1)] if m else [],
+        top_direct=top(direct),
+        top_downline=top(downline),
+        max_downline=inviters[-1] if inviters else 0,
+        mean_downline=sum(inviters) / len(inviters) if inviters else 0.0,
+        p90_downline=inviters[int(0.9 * (len(inviters) - 1))] if inviters else 0,
+        star_ratio=max(direct, default=0) / n if m else 0.0,
+    )
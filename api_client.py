@@ -0,0 +1,171 @@
+# plugins/GroupInsight/api_client.py
+
+import asyncio
+import logging
+import time
+from typing import Dict, Any, Optional, List
+
+import aiohttp
+
+from .metrics import Metrics
+from .resilience import OPEN, CircuitBreaker, CircuitOpenError, RetryPolicy
+
+ENDPOINT_GET_CHATROOM_INFO = "/group/GetChatRoomInfo"
+ENDPOINT_DEL_CHATROOM_MEMBER = "/group/SendDelDelChatRoomMember"
+
+# 各接口的独立超时（秒），踢人接口在服务端较慢，给更宽裕的时间
+ENDPOINT_TIMEOUTS = {
+    ENDPOINT_GET_CHATROOM_INFO: 15,
+    ENDPOINT_DEL_CHATROOM_MEMBER: 20,
+}
+DEFAULT_TIMEOUT = 15
+CONNECT_TIMEOUT = 5
+MAX_CONCURRENT_REQUESTS = 8  # 同时在途的 API 请求上限
+POOL_SIZE = 16               # 连接池大小（keep-alive 复用）
+KEEPALIVE_TIMEOUT = 60
+# 可安全重试的只读接口；踢人接口不重试（由 KickEngine 按批次自行重试与拆分）
+IDEMPOTENT_ENDPOINTS = frozenset({ENDPOINT_GET_CHATROOM_INFO})
+
+
+class WeChatPadAPIError(Exception):
+    """WeChatPadPro 接口在传输层失败（网络错误、超时、HTTP 非 2xx、非 JSON 响应）。"""
+
+
+class WeChatPadCircuitOpen(WeChatPadAPIError):
+    """接口已熔断，请求未发出即被拒绝。"""
+
+
+class WeChatPadTimeout(WeChatPadAPIError):
+    """请求超时；对有副作用的接口而言，请求可能已被执行。"""
+
+
+class WeChatPadClient:
+    """
+    WeChatPadPro 的共享异步 API 客户端。
+    由插件在 initialize() 中创建、在 destroy() 中关闭；内部持有一个 keep-alive 连接池，
+    并用信号量限制同时在途的请求数，避免管理员并发指令时压垮 API 或事件循环。
+    【新增】每个接口有独立的熔断器：API 故障或持续缓慢时快速失败，而不是让每条指令都等满超时；
+    只读接口的传输层错误按指数退避加抖动重试。
+    """
+
+    def __init__(self, base_url: str, api_key: str,
+                 max_concurrency: int = MAX_CONCURRENT_REQUESTS,
+                 timeouts: Optional[Dict[str, float]] = None,
+                 logger: Optional[logging.Logger] = None,
+                 metrics: Optional[Metrics] = None,
+                 retry_policy: Optional[RetryPolicy] = None):
+        self.base_url = base_url.rstrip('/')
+        self.api_key = api_key
+        self.timeouts = dict(ENDPOINT_TIMEOUTS)
+        if timeouts:
+            self.timeouts.update(timeouts)
+        self.logger = logger or logging.getLogger("GroupInsightPlugin")
+        self.metrics = metrics or Metrics()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.breakers: Dict[str, CircuitBreaker] = {}
+
+    def _breaker(self, endpoint: str) -> CircuitBreaker:
+        breaker = self.breakers.get(endpoint)
+        if breaker is None:
+            breaker = self.breakers[endpoint] = CircuitBreaker(
+                endpoint.rsplit('/', 1)[-1], on_state_change=self._on_breaker_change,
+                slow_call_seconds=self.timeouts.get(endpoint, DEFAULT_TIMEOUT) / 2,
+            )
+        return breaker
+
+    def _on_breaker_change(self, name: str, old: str, new: str):
+        self.metrics.inc('api_circuit_transitions', endpoint=name, state=new)
+        breaker = next(b for b in self.breakers.values() if b.name == name)
+        if new == 'open':
+            self.logger.warning(f"接口 {name} 已熔断：最近调用失败率 {breaker.failure_ratio():.0%}，"
+                                f"{breaker.retry_after():.0f} 秒内的请求将直接失败")
+        elif new == 'half_open':
+            self.logger.info(f"接口 {name} 熔断冷却结束，发送探测请求")
+        else:
+            self.logger.info(f"接口 {name} 探测成功，熔断已恢复")
+
+    async def start(self):
+        if self._session is not None and not self._session.closed:
+            return
+        connector = aiohttp.TCPConnector(limit=POOL_SIZE, keepalive_timeout=KEEPALIVE_TIMEOUT)
+        self._session = aiohttp.ClientSession(connector=connector)
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    @property
+    def closed(self) -> bool:
+        return self._session is None or self._session.closed
+
+    async def post(self, endpoint: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        向指定接口 POST JSON，返回解析后的响应体；传输层错误统一抛出 WeChatPadAPIError，
+        接口熔断时立即抛出 WeChatPadCircuitOpen。只读接口失败时按 retry_policy 退避重试。
+        """
+        name = endpoint.rsplit('/', 1)[-1]
+        attempts = max(1, self.retry_policy.attempts) if endpoint in IDEMPOTENT_ENDPOINTS else 1
+        for attempt in range(attempts):
+            try:
+                return await self._post_once(endpoint, name, payload)
+            except WeChatPadCircuitOpen:
+                raise
+            except WeChatPadAPIError as e:
+                # 最后一次尝试，或本次失败已触发熔断时，不再等待重试
+                if attempt + 1 >= attempts or self._breaker(endpoint).state == OPEN:
+                    raise
+                delay = self.retry_policy.delay(attempt)
+                self.metrics.inc('api_retries', endpoint=name)
+                self.logger.warning(f"{e}（第 {attempt + 1}/{attempts} 次），{delay:.2f} 秒后重试")
+                await asyncio.sleep(delay)
+
+    async def _post_once(self, endpoint: str, name: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        if self.closed:
+            await self.start()
+
+        breaker = self._breaker(endpoint)
+        try:
+            breaker.before_call()
+        except CircuitOpenError as e:
+            self.metrics.inc('api_errors', endpoint=name, kind='circuit_open')
+            raise WeChatPadCircuitOpen(f"接口 {e}") from e
+
+        timeout = aiohttp.ClientTimeout(
+            total=self.timeouts.get(endpoint, DEFAULT_TIMEOUT),
+            connect=CONNECT_TIMEOUT,
+        )
+        url = f"{self.base_url}{endpoint}"
+        async with self._semaphore:
+            started = time.perf_counter()
+            try:
+                async with self._session.post(url, params={'key': self.api_key}, json=payload, timeout=timeout) as response:
+                    response.raise_for_status()
+                    result = await response.json(content_type=None)
+            except asyncio.TimeoutError as e:
+                breaker.record(False)
+                self.metrics.inc('api_errors', endpoint=name, kind='timeout')
+                raise WeChatPadTimeout(f"请求 {endpoint} 超时") from e
+            except (aiohttp.ClientError, ValueError) as e:
+                breaker.record(False)
+                self.metrics.inc('api_errors', endpoint=name, kind='transport')
+                raise WeChatPadAPIError(f"请求 {endpoint} 失败: {e}") from e
+            except BaseException:
+                breaker.release()
+                raise
+            finally:
+                elapsed = time.perf_counter() - started
+                self.metrics.observe('api_request', elapsed, endpoint=name)
+            breaker.record(True, elapsed)
+            return result
+
+    def stats(self) -> Dict[str, float]:
+        return {f"circuit_{breaker.name}_{k}": v for breaker in self.breakers.values() for k, v in breaker.stats().items()}
+
+    async def get_chatroom_info(self, chatroom_ids: List[str]) -> Dict[str, Any]:
+        return await self.post(ENDPOINT_GET_CHATROOM_INFO, {"ChatRoomWxIdList": chatroom_ids})
+
+    async def del_chatroom_members(self, chatroom_id: str, member_ids: List[str]) -> Dict[str, Any]:
+        return await self.post(ENDPOINT_DEL_CHATROOM_MEMBER, {"ChatRoomName": chatroom_id, "UserList": member_ids})
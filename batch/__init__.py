@@ -0,0 +1 @@
+# plugins/GroupInsight/batch/__init__.py
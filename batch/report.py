@@ -0,0 +1,282 @@
+# plugins/GroupInsight/batch/report.py
+"""
+离线批量报告：脱离 LangBot，为大量群生成邀请关系图、群统计与汇总索引，供夜间巡检使用。
+
+数据来源二选一：
+- --input DIR：目录中的 *.json 花名册，格式与 GetChatRoomInfo 一致（完整响应、contactList 数组或单个 contact 均可）；
+- --api-base-url / --api-key / --group-ids：直接从 WeChatPadPro 拉取，原始数据同时保存到 <output>/rosters/，便于复查与重跑。
+
+每个花名册文件在进程池中独立处理（解析、建图、统计、调用 Graphviz），进程数默认等于 CPU 核数。
+输出：每个群一张图片与一份统计 JSON，以及 index.json / index.html 汇总。
+
+用法（在插件目录下执行）：
+    python -m batch.report --input dumps/ --output reports/
+    python -m batch.report --api-base-url http://127.0.0.1:1239 --api-key KEY --group-ids-file groups.txt --output reports/
+"""
+
+import argparse
+import asyncio
+import html
+import importlib
+import json
+import logging
+import os
+import re
+import subprocess
+import sys
+import time
+import types
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FETCH_BATCH_SIZE = 20  # 与插件一致：单次 GetChatRoomInfo 请求携带的群ID上限
+RENDER_TIMEOUT = 120   # 单个档位的 Graphviz 运行时限（秒），超时后降级到下一档
+PLUGIN_MODULES = ('roster', 'invite_graph', 'analytics', 'graph_render', 'api_client')
+
+
+def load_plugin_modules() -> types.SimpleNamespace:
+    """
+    以包的形式导入插件中与 LangBot 无关的模块（它们之间使用相对导入）。
+    手动注册包对象、不执行包的 __init__.py，因为其中会导入依赖 LangBot 的 main.py。
+    """
+    package = os.path.basename(PLUGIN_DIR)
+    if package not in sys.modules:
+        module = types.ModuleType(package)
+        module.__path__ = [PLUGIN_DIR]
+        sys.modules[package] = module
+    return types.SimpleNamespace(**{name: importlib.import_module(f"{package}.{name}") for name in PLUGIN_MODULES})
+
+
+def safe_filename(group_id: str) -> str:
+    return re.sub(r'[^\w@.\-]', '_', group_id)
+
+
+def iter_contacts(data: Any, fallback_id: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """从一份 JSON 中取出 (群ID, contact)；contact 中没有群ID时使用文件名。"""
+    if isinstance(data, dict) and 'Data' in data:
+        data = (data.get('Data') or {}).get('contactList') or []
+    contacts = data if isinstance(data, list) else [data]
+    for contact in contacts:
+        if isinstance(contact, dict):
+            group_id = (contact.get('userName') or {}).get('str') or fallback_id
+            yield group_id, contact
+
+
+def render_image(modules, graph, group_id: str, group_name: str, plan, fmt: Optional[str],
+                 timeout: float) -> Tuple[Optional[bytes], Optional[str], str, str]:
+    """
+    按插件的渲染档位依次尝试，返回 (图片, 档位名, 实际格式, 说明)；fmt 为 'dot' 时只输出 DOT 源码。
+    图片为 None 时说明为失败原因，否则为降级前各档位的失败记录（未降级时为空）。
+    """
+    gr = modules.graph_render
+    errors = []
+    # 报告在浏览器中查看，未指定格式时超大图可以直接输出 SVG
+    for profile in gr.render_ladder(graph, plan, vector_ok=True):
+        dot = gr.build_invite_digraph(graph, group_id, group_name, plan, None, profile.engine, profile.graph_attrs)
+        if dot is None:
+            return None, None, '', "无法生成 DOT（未安装 graphviz 包或成员为空）"
+        if fmt == 'dot':
+            return dot.source.encode('utf-8'), profile.name, 'dot', ''
+        out_fmt = fmt or profile.fmt
+        try:
+            proc = subprocess.run([profile.engine, f'-T{out_fmt}'], input=dot.source.encode('utf-8'),
+                                  capture_output=True, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            errors.append(f"{profile.name} 超时")
+            continue
+        except OSError as e:
+            return None, None, '', f"无法启动 {profile.engine}: {e}"
+        if proc.returncode == 0 and proc.stdout:
+            return proc.stdout, profile.name, out_fmt, '；'.join(errors)
+        errors.append(f"{profile.name} 退出码 {proc.returncode}: {proc.stderr.decode('utf-8', 'replace').strip()[:200]}")
+    return None, None, '', '；'.join(errors)
+
+
+def stats_to_json(graph, stats) -> Dict[str, Any]:
+    result = stats._asdict()
+    for key in ('top_direct', 'top_downline'):
+        result[key] = [{'wxid': graph.ids[v], 'name': graph.names[v], 'count': count} for v, count in result[key]]
+    return result
+
+
+def process_file(path: str, output_dir: str, options: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """进程池中的任务：处理一个花名册文件中的所有群，返回每个群的汇总行。"""
+    modules = load_plugin_modules()
+    logging.getLogger("GroupInsightPlugin").setLevel(options['log_level'])
+    fallback_id = os.path.splitext(os.path.basename(path))[0]
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    rows = []
+    for group_id, contact in iter_contacts(data, fallback_id):
+        started = time.perf_counter()
+        row: Dict[str, Any] = {'group_id': group_id, 'source': os.path.basename(path), 'error': '', 'note': ''}
+        try:
+            roster = modules.roster.Roster.from_group_data(group_id, contact)
+            graph = modules.invite_graph.InviteGraph(roster)
+            stats = modules.analytics.compute_group_stats(graph)
+            row.update(group_name=roster.group_name, member_count=stats.member_count, tree_count=stats.tree_count,
+                       max_depth=stats.max_depth, cycle_count=stats.cycle_count, no_inviter_count=stats.no_inviter_count,
+                       inviter_left_count=stats.inviter_left_count, max_downline=stats.max_downline)
+            name = safe_filename(group_id)
+            with open(os.path.join(output_dir, f"{name}.json"), 'w', encoding='utf-8') as f:
+                json.dump({'group_id': group_id, 'group_name': roster.group_name, 'fingerprint': roster.fingerprint(),
+                           'stats': stats_to_json(graph, stats)}, f, ensure_ascii=False, indent=2)
+            row['stats_file'] = f"{name}.json"
+
+            if options['render'] and roster.member_count:
+                plan = modules.graph_render.plan_render(graph)
+                if plan.node_count > modules.graph_render.MAX_NODES_LARGE_GRAPH:
+                    row['error'] = f"折叠后仍有 {plan.node_count} 个节点，未生成图片"
+                else:
+                    render_started = time.perf_counter()
+                    image, profile, ext, message = render_image(modules, graph, group_id, roster.group_name, plan,
+                                                           options['format'], options['timeout'])
+                    row['render_seconds'] = round(time.perf_counter() - render_started, 3)
+                    if image is None:
+                        row['error'] = message
+                    else:
+                        with open(os.path.join(output_dir, f"{name}.{ext}"), 'wb') as f:
+                            f.write(image)
+                        # 降级后成功的群不算失败，降级经过只作为备注
+                        row.update(image_file=f"{name}.{ext}", profile=profile, note=f"已降级（{message}）" if message else '')
+        except Exception as e:
+            row['error'] = f"{type(e).__name__}: {e}"
+        row['seconds'] = round(time.perf_counter() - started, 3)
+        rows.append(row)
+    return rows
+
+
+async def fetch_rosters(base_url: str, api_key: str, group_ids: List[str], rosters_dir: str) -> List[str]:
+    """从 API 拉取花名册并按群保存为 JSON，返回写入的文件路径。"""
+    modules = load_plugin_modules()
+    client = modules.api_client.WeChatPadClient(base_url, api_key)
+    await client.start()
+    paths = []
+
+    async def fetch(chunk: List[str]):
+        try:
+            data = await client.get_chatroom_info(chunk)
+        except modules.api_client.WeChatPadAPIError as e:
+            print(f"拉取 {chunk} 失败: {e}", file=sys.stderr)
+            return
+        if data.get('Code') != 200:
+            print(f"拉取 {chunk} 返回错误: {data.get('Text') or data.get('Code')}", file=sys.stderr)
+            return
+        for group_id, contact in iter_contacts(data, ''):
+            if group_id not in chunk:
+                continue
+            path = os.path.join(rosters_dir, f"{safe_filename(group_id)}.json")
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(contact, f, ensure_ascii=False)
+            paths.append(path)
+
+    try:
+        await asyncio.gather(*(fetch(group_ids[i:i + FETCH_BATCH_SIZE]) for i in range(0, len(group_ids), FETCH_BATCH_SIZE)))
+    finally:
+        await client.close()
+    return paths
+
+
+def write_index(output_dir: str, rows: List[Dict[str, Any]], elapsed: float, workers: int):
+    rows.sort(key=lambda r: (-r.get('member_count', 0), r['group_id']))
+    summary = {
+        'generated_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'group_count': len(rows),
+        'failed_count': sum(1 for r in rows if r['error']),
+        'member_total': sum(r.get('member_count', 0) for r in rows),
+        'elapsed_seconds': round(elapsed, 2),
+        'workers': workers,
+        'groups': rows,
+    }
+    with open(os.path.join(output_dir, 'index.json'), 'w', encoding='utf-8') as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+
+    def cell(value: Any) -> str:
+        return f"<td>{html.escape(str(value))}</td>"
+
+    body = []
+    for r in rows:
+        image = f'<a href="{html.escape(r["image_file"])}">{html.escape(r.get("profile", ""))}</a>' if r.get('image_file') else ''
+        stats_link = f'<a href="{html.escape(r["stats_file"])}">JSON</a>' if r.get('stats_file') else ''
+        body.append("<tr>" + cell(r.get('group_name', '')) + cell(r['group_id']) + cell(r.get('member_count', '')) +
+                    cell(r.get('tree_count', '')) + cell(r.get('max_depth', '')) + cell(r.get('cycle_count', '')) +
+                    cell(r.get('inviter_left_count', '')) + f"<td>{image}</td><td>{stats_link}</td>" +
+                    cell(r['error'] or r.get('note', '')) + "</tr>")
+    with open(os.path.join(output_dir, 'index.html'), 'w', encoding='utf-8') as f:
+        f.write(f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>GroupInsight 批量报告</title>
+<style>body{{font-family:sans-serif}}table{{border-collapse:collapse}}td,th{{border:1px solid #ccc;padding:4px 8px}}</style></head>
+<body><h1>GroupInsight 批量报告</h1>
+<p>生成于 {summary['generated_at']}，共 {summary['group_count']} 个群、{summary['member_total']} 名成员，
+失败 {summary['failed_count']} 个，耗时 {summary['elapsed_seconds']} 秒（{workers} 个进程）。</p>
+<table><tr><th>群名称</th><th>群ID</th><th>成员数</th><th>邀请树</th><th>最大深度</th><th>邀请环</th><th>邀请人已退群</th><th>关系图</th><th>统计</th><th>备注</th></tr>
+{chr(10).join(body)}
+</table></body></html>
+""")
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="GroupInsight 离线批量报告")
+    parser.add_argument('--input', help="GetChatRoomInfo 格式花名册 JSON 所在目录")
+    parser.add_argument('--api-base-url', help="从 WeChatPadPro 拉取花名册时的 API 地址")
+    parser.add_argument('--api-key', default='')
+    parser.add_argument('--group-ids', default='', help="要拉取的群ID，逗号分隔")
+    parser.add_argument('--group-ids-file', help="要拉取的群ID列表文件，每行一个")
+    parser.add_argument('--output', required=True, help="输出目录")
+    parser.add_argument('--workers', type=int, default=0, help="进程数，默认等于 CPU 核数")
+    parser.add_argument('--format', choices=('png', 'jpg', 'svg', 'dot'), help="图片格式，默认按图的大小自动选择；dot 只输出 DOT 源码")
+    parser.add_argument('--no-render', action='store_true', help="只生成统计，不生成图片")
+    parser.add_argument('--timeout', type=float, default=RENDER_TIMEOUT, help="单个渲染档位的超时（秒）")
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args(argv)
+    if not args.input and not args.api_base_url:
+        parser.error("需要指定 --input 或 --api-base-url")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, format="%(levelname)s %(message)s")
+    os.makedirs(args.output, exist_ok=True)
+    started = time.perf_counter()
+
+    if args.input:
+        paths = sorted(os.path.join(args.input, name) for name in os.listdir(args.input) if name.endswith('.json'))
+    else:
+        group_ids = [g.strip() for g in args.group_ids.split(',') if g.strip()]
+        if args.group_ids_file:
+            with open(args.group_ids_file, 'r', encoding='utf-8') as f:
+                group_ids += [line.strip() for line in f if line.strip() and not line.startswith('#')]
+        group_ids = list(dict.fromkeys(g if g.endswith('@chatroom') else f"{g}@chatroom" for g in group_ids))
+        rosters_dir = os.path.join(args.output, 'rosters')
+        os.makedirs(rosters_dir, exist_ok=True)
+        paths = asyncio.run(fetch_rosters(args.api_base_url, args.api_key, group_ids, rosters_dir))
+        print(f"已拉取 {len(paths)}/{len(group_ids)} 个群的花名册")
+
+    workers = args.workers or os.cpu_count() or 1
+    options = {'render': not args.no_render, 'format': args.format, 'timeout': args.timeout,
+               'log_level': logging.INFO if args.verbose else logging.WARNING}
+    rows: List[Dict[str, Any]] = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(process_file, path, args.output, options): path for path in paths}
+        for done, future in enumerate(as_completed(futures), 1):
+            try:
+                file_rows = future.result()
+            except Exception as e:
+                file_rows = [{'group_id': os.path.basename(futures[future]), 'source': os.path.basename(futures[future]),
+                              'error': f"{type(e).__name__}: {e}"}]
+            rows.extend(file_rows)
+            for row in file_rows:
+                status = row['error'] or 'ok'
+                print(f"[{done}/{len(paths)}] {row.get('group_name', '')} ({row['group_id']}) "
+                      f"{row.get('member_count', '-')} 人，{row.get('seconds', 0):.2f}s，{status}")
+
+    elapsed = time.perf_counter() - started
+    write_index(args.output, rows, elapsed, workers)
+    print(f"完成：{len(rows)} 个群，耗时 {elapsed:.1f} 秒，汇总见 {os.path.join(args.output, 'index.html')}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1 @@
+# plugins/GroupInsight/benchmarks/__init__.py
@@ -0,0 +1,88 @@
+# plugins/GroupInsight/benchmarks/fake_server.py
+"""
+本地模拟的 WeChatPadPro 服务，仅实现插件用到的两个接口：
+- POST /group/GetChatRoomInfo          按 ChatRoomWxIdList 返回已注册的合成花名册
+- POST /group/SendDelDelChatRoomMember 记录被踢成员并从花名册中移除
+可配置固定延迟、随机抖动和错误率（返回 Code 500 或直接断开连接）。
+"""
+
+import asyncio
+import random
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web
+
+from .synthetic import build_contact
+
+
+class FakeWeChatPadServer:
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0, jitter: float = 0.0,
+                 error_rate: float = 0.0, disconnect_rate: float = 0.0, seed: int = 0):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.disconnect_rate = disconnect_rate
+        self.rosters: Dict[str, List[Dict[str, Any]]] = {}
+        self.kicked: List[Dict[str, Any]] = []
+        self.request_counts: Dict[str, int] = {}
+        self._rng = random.Random(seed)
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def add_group(self, group_id: str, member_list: List[Dict[str, Any]]):
+        self.rosters[group_id] = member_list
+
+    async def start(self):
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_post('/group/GetChatRoomInfo', self._get_chatroom_info)
+        app.router.add_post('/group/SendDelDelChatRoomMember', self._del_chatroom_member)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        if not self.port:
+            self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _simulate(self, request: web.Request, endpoint: str) -> Optional[web.Response]:
+        self.request_counts[endpoint] = self.request_counts.get(endpoint, 0) + 1
+        delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay:
+            await asyncio.sleep(delay)
+        roll = self._rng.random()
+        if roll < self.disconnect_rate:
+            request.transport.close()
+            return web.Response(status=503)
+        if roll < self.disconnect_rate + self.error_rate:
+            return web.json_response({'Code': 500, 'Text': '模拟服务端错误'})
+        return None
+
+    async def _get_chatroom_info(self, request: web.Request) -> web.Response:
+        failure = await self._simulate(request, 'GetChatRoomInfo')
+        if failure is not None:
+            return failure
+        body = await request.json()
+        contacts = [build_contact(gid, self.rosters[gid]) for gid in body.get('ChatRoomWxIdList', []) if gid in self.rosters]
+        return web.json_response({'Code': 200, 'Data': {'contactCount': len(contacts), 'contactList': contacts}})
+
+    async def _del_chatroom_member(self, request: web.Request) -> web.Response:
+        failure = await self._simulate(request, 'SendDelDelChatRoomMember')
+        if failure is not None:
+            return failure
+        body = await request.json()
+        group_id = body.get('ChatRoomName')
+        removed = set(body.get('UserList') or [])
+        self.kicked.append(body)
+        if group_id in self.rosters:
+            self.rosters[group_id] = [m for m in self.rosters[group_id] if m['user_name'] not in removed]
+        return web.json_response({'Code': 200, 'Text': ''})
@@ -0,0 +1,97 @@
+# plugins/GroupInsight/benchmarks/langbot_stubs.py
+"""
+脱离 LangBot 运行插件所需的最小替身：pkg.* 模块（仅在未安装 LangBot 时注入）、
+记录所有发送消息的 FakeHost，以及模拟群消息事件的 FakeEventContext。
+"""
+
+import asyncio
+import importlib.util
+import sys
+import time
+import types
+from typing import Any, Callable, List, Optional, Tuple
+
+
+def install():
+    """若当前环境没有 LangBot，则向 sys.modules 注入插件导入所需的 pkg.* 替身模块。"""
+    try:
+        if importlib.util.find_spec('pkg.plugin.context') is not None:
+            return
+    except ImportError:
+        # 父包 pkg 或 pkg.plugin 不存在时 find_spec 抛出 ModuleNotFoundError，同样视为未安装 LangBot
+        pass
+
+    class BasePlugin:
+        def __init__(self, host):
+            self.host = host
+            self.config = {}
+
+    class MessageChain(list):
+        def get_plain_text(self) -> str:
+            return "".join(getattr(c, 'text', '') for c in self)
+
+    class Plain:
+        def __init__(self, text: str):
+            self.text = text
+
+    class Image:
+        def __init__(self, base64: Optional[str] = None, **kwargs):
+            self.base64 = base64
+
+    modules = {
+        'pkg': types.ModuleType('pkg'),
+        'pkg.plugin': types.ModuleType('pkg.plugin'),
+        'pkg.plugin.context': types.ModuleType('pkg.plugin.context'),
+        'pkg.plugin.events': types.ModuleType('pkg.plugin.events'),
+        'pkg.platform': types.ModuleType('pkg.platform'),
+        'pkg.platform.types': types.ModuleType('pkg.platform.types'),
+    }
+    context = modules['pkg.plugin.context']
+    context.BasePlugin = BasePlugin
+    context.APIHost = object
+    context.EventContext = object
+    events = modules['pkg.plugin.events']
+    events.GroupMessageReceived = type('GroupMessageReceived', (), {})
+    events.GroupNormalMessageReceived = type('GroupNormalMessageReceived', (), {})
+    platform_types = modules['pkg.platform.types']
+    platform_types.MessageChain = MessageChain
+    platform_types.Plain = Plain
+    platform_types.Image = Image
+    sys.modules.update(modules)
+
+
+class FakeHost:
+    """替代 APIHost：记录每条主动消息，可配置模拟的发送延迟；on_send 用于统计发送耗时。"""
+
+    def __init__(self, send_latency: float = 0.0, on_send: Optional[Callable[[float, Any], None]] = None):
+        self.send_latency = send_latency
+        self.on_send = on_send
+        self.sent: List[Tuple[str, str, Any]] = []
+
+    async def send_active_message(self, adapter, target_type: str, target_id: str, message):
+        started = time.perf_counter()
+        if self.send_latency:
+            await asyncio.sleep(self.send_latency)
+        self.sent.append((target_type, target_id, message))
+        if self.on_send is not None:
+            self.on_send(time.perf_counter() - started, message)
+
+
+class FakeEventContext:
+    """模拟 GroupMessageReceived 事件的 EventContext。"""
+
+    def __init__(self, text: str, sender_id: str, group_id: str):
+        message_chain = types.SimpleNamespace(get_plain_text=lambda: text)
+        query = types.SimpleNamespace(message_chain=message_chain, launcher_id=group_id, adapter=None)
+        self.event = types.SimpleNamespace(query=query, sender_id=sender_id, text_message=text)
+        self.replies: List[Any] = []
+        self.default_prevented = False
+
+    def prevent_default(self):
+        self.default_prevented = True
+
+    def prevent_postorder(self):
+        pass
+
+    async def reply(self, message):
+        self.replies.append(message)
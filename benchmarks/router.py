@@ -0,0 +1,124 @@
+# plugins/GroupInsight/benchmarks/router.py
+"""
+指令路由微基准：模拟高流量群聊的消息流（绝大多数是普通聊天，少量是 # 话题和指令），
+测量每条消息经过 group_message_handler 的额外开销，并与重构前“逐个 startswith 扫描触发词、
+在分支内临时 re.compile 语法”的做法对比。
+
+用法（在插件目录下执行）：
+    python -m benchmarks.router --messages 200000 --command-ratio 0.01 --hashtag-ratio 0.05
+"""
+
+import argparse
+import asyncio
+import random
+import re
+import time
+import types
+from typing import List
+
+from .langbot_stubs import FakeEventContext, FakeHost
+from .run import load_plugin_modules
+
+ADMIN_ID = 'wxid_bench_admin'
+MEMBER_ID = 'wxid_bench_member'
+GROUP_ID = 'bench@chatroom'
+CHAT_SAMPLES = ("哈哈哈", "收到", "今晚几点开会？", "[图片]", "好的 👍", "有人在吗", "这个链接打不开 https://example.com",
+                "明天见", "谢谢大家", "1", "ok")
+HASHTAG_SAMPLES = ("#今日打卡", "#话题 周末去哪儿", "#接龙 1. 张三", "#求助")
+
+
+def generate_stream(count: int, command_ratio: float, hashtag_ratio: float, triggers: List[str], seed: int) -> List[str]:
+    rng = random.Random(seed)
+    stream = []
+    for _ in range(count):
+        r = rng.random()
+        if r < command_ratio:
+            trigger = rng.choice(triggers)
+            stream.append(f"{trigger} wxid_{rng.randrange(10 ** 6)}" if rng.random() < 0.5 else trigger)
+        elif r < command_ratio + hashtag_ratio:
+            stream.append(rng.choice(HASHTAG_SAMPLES))
+        else:
+            stream.append(rng.choice(CHAT_SAMPLES))
+    return stream
+
+
+def legacy_match(raw_msg: str, triggers: List[str]):
+    """重构前的路由：每条消息重建触发词列表并逐个 startswith，命中后在分支内编译语法。"""
+    all_triggers = list(triggers)
+    if not any(raw_msg.startswith(trigger) for trigger in all_triggers):
+        return None
+    group_id_regex = r'[\w\-\.]+(?:@chatroom)?'
+    trigger = next(t for t in all_triggers if raw_msg.startswith(t))
+    patterns = [
+        re.compile(r'^\s*' + re.escape(trigger) + r'\s+(?P<fetch_id>' + group_id_regex + r')\s+到\s+(?P<send_id>' + group_id_regex + r')\s*$'),
+        re.compile(r'^\s*' + re.escape(trigger) + r'\s+(?P<fetch_id>' + group_id_regex + r')\s*$'),
+        re.compile(r'^\s*' + re.escape(trigger) + r'到\s+(?P<send_id>' + group_id_regex + r')\s*$'),
+        re.compile(r'^\s*' + re.escape(trigger) + r'\s*$'),
+    ]
+    for pattern in patterns:
+        match = pattern.match(raw_msg)
+        if match:
+            return match
+    return None
+
+
+def routed_match(router, raw_msg: str):
+    route = router.route(raw_msg)
+    return route.parse(raw_msg) if route is not None else None
+
+
+def time_per_message(func, stream: List[str], repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for msg in stream:
+            func(msg)
+        best = min(best, time.perf_counter() - started)
+    return best / len(stream)
+
+
+async def time_handler(plugin, stream: List[str], sender_id: str) -> float:
+    contexts = [FakeEventContext(msg, sender_id, GROUP_ID) for msg in stream]
+    started = time.perf_counter()
+    for ctx in contexts:
+        await plugin.group_message_handler(ctx)
+    return (time.perf_counter() - started) / len(stream)
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="GroupInsight 指令路由微基准")
+    parser.add_argument('--messages', type=int, default=200_000)
+    parser.add_argument('--command-ratio', type=float, default=0.01, help="指令消息占比")
+    parser.add_argument('--hashtag-ratio', type=float, default=0.05, help="以 # 开头但不是指令的消息占比")
+    parser.add_argument('--repeat', type=int, default=3, help="纯路由计时重复次数，取最好一次")
+    parser.add_argument('--seed', type=int, default=0)
+    return parser.parse_args(argv)
+
+
+async def main(argv=None):
+    args = parse_args(argv)
+    main_mod, _, _ = load_plugin_modules()
+    plugin = main_mod.GroupInsightPlugin(FakeHost())
+    plugin.config = {'api_base_url': 'http://127.0.0.1:1', 'api_key': 'bench', 'admin_user_ids': [ADMIN_ID]}
+    plugin.ADMIN_USER_IDS = frozenset([ADMIN_ID])
+    plugin.ap = types.SimpleNamespace(plugin_mgr=types.SimpleNamespace(get_plugin=lambda **kwargs: None))
+
+    router = plugin.command_router
+    triggers = list(router.triggers)
+    stream = generate_stream(args.messages, args.command_ratio, args.hashtag_ratio, triggers, args.seed)
+    print(f"消息数 {len(stream)}，指令占比 {args.command_ratio:.1%}，# 话题占比 {args.hashtag_ratio:.1%}")
+
+    legacy = time_per_message(lambda msg: legacy_match(msg, triggers), stream, args.repeat)
+    routed = time_per_message(lambda msg: routed_match(router, msg), stream, args.repeat)
+    print(f"{'路由方式':<24}{'ns/消息':>12}")
+    print(f"{'legacy startswith + compile':<24}{legacy * 1e9:>12.0f}")
+    print(f"{'CommandRouter':<24}{routed * 1e9:>12.0f}  ({legacy / routed if routed else 0:.1f}x)")
+
+    # 端到端：普通成员发出的所有消息（含指令）都不应触发任何处理，只计路由与权限检查的开销
+    handler = await time_handler(plugin, stream, MEMBER_ID)
+    print(f"group_message_handler（非管理员消息流）: {handler * 1e9:.0f} ns/消息，"
+          f"约 {1 / handler if handler else 0:,.0f} 条/秒")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
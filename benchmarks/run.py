@@ -0,0 +1,217 @@
+# plugins/GroupInsight/benchmarks/run.py
+"""
+GroupInsight 离线压测：用本地模拟的 WeChatPadPro 服务和合成花名册，端到端驱动
+group_message_handler("#邀请关系")，分阶段统计耗时分位数与吞吐。
+
+阶段划分：
+- fetch:  GetChatRoomInfo 请求（含 HTTP 往返与 JSON 解析）
+- roster: 由 API 数据构建紧凑花名册
+- graph:  构建邀请关系索引 (InviteGraph)
+- render: 生成 DOT 并交给渲染调度器，直到拿到图片字节
+- layout: 其中 Graphviz 子进程本身的耗时
+- encode: 图片 base64 编码
+- send:   发送带图片的消息
+- total:  整条指令的处理耗时
+
+用法（在插件目录下执行）：
+    python -m benchmarks.run --sizes 50,500,5000,50000 --shapes random,star --iterations 5
+未安装 Graphviz 可执行文件时（或指定 --no-layout），layout 阶段跳过，render 只统计 DOT 构建。
+"""
+
+import argparse
+import asyncio
+import base64
+import functools
+import importlib
+import json
+import os
+import shutil
+import sys
+import time
+import types
+from typing import Any, Dict, List
+
+from . import langbot_stubs
+from .fake_server import FakeWeChatPadServer
+from .langbot_stubs import FakeEventContext, FakeHost
+from .synthetic import SHAPES, generate_member_list
+
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STAGES = ('fetch', 'roster', 'graph', 'render', 'layout', 'encode', 'send', 'total')
+ADMIN_ID = 'wxid_bench_admin'
+GROUP_ID = 'bench@chatroom'
+
+
+def load_plugin_modules():
+    """以包的形式导入插件（main.py 使用相对导入），返回 (main, snapshot, image_cache) 模块。"""
+    langbot_stubs.install()
+    sys.path.insert(0, os.path.dirname(PLUGIN_DIR))
+    package = os.path.basename(PLUGIN_DIR)
+    return (importlib.import_module(f"{package}.main"),
+            importlib.import_module(f"{package}.snapshot"),
+            importlib.import_module(f"{package}.image_cache"))
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+class StageRecorder:
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+
+    def record(self, stage: str, seconds: float):
+        self.samples[stage].append(seconds)
+
+    def timed_async(self, stage: str, func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                self.record(stage, time.perf_counter() - started)
+        return wrapper
+
+    def timed(self, stage: str, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.record(stage, time.perf_counter() - started)
+        return wrapper
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        result = {}
+        for stage, values in self.samples.items():
+            if not values:
+                continue
+            total = sum(values)
+            result[stage] = {
+                'count': len(values),
+                'p50_ms': percentile(values, 50) * 1000,
+                'p90_ms': percentile(values, 90) * 1000,
+                'p99_ms': percentile(values, 99) * 1000,
+                'max_ms': max(values) * 1000,
+                'ops_per_s': len(values) / total if total else 0.0,
+            }
+        return result
+
+
+def instrument(plugin, recorder: StageRecorder, main_mod, snapshot_mod, with_layout: bool):
+    """在插件实例与模块上挂计时包装；只影响本进程内的压测对象。"""
+    plugin._request_group_chunk = recorder.timed_async('fetch', plugin._request_group_chunk)
+    plugin._generate_invite_tree_image = recorder.timed_async('render', plugin._generate_invite_tree_image)
+
+    roster_cls = main_mod.Roster
+    main_mod.Roster = type('TimedRoster', (roster_cls,), {
+        'from_group_data': classmethod(lambda cls, *a: recorder.timed('roster', roster_cls.from_group_data)(*a)),
+    })
+    snapshot_mod.InviteGraph = recorder.timed('graph', snapshot_mod.InviteGraph)
+    main_mod.base64 = types.SimpleNamespace(b64encode=recorder.timed('encode', base64.b64encode))
+
+    if with_layout:
+        plugin.render_scheduler.render = recorder.timed_async('layout', plugin.render_scheduler.render)
+    else:
+        async def dot_only(key, source, engine, fmt, **kwargs):
+            return source.encode('utf-8')
+        plugin.render_scheduler.render = dot_only
+
+
+async def run_case(main_mod, snapshot_mod, image_cache_mod, size: int, shape: str, iterations: int,
+                   args: argparse.Namespace) -> Dict[str, Any]:
+    server = FakeWeChatPadServer(latency=args.api_latency, jitter=args.api_jitter, error_rate=args.error_rate)
+    server.add_group(GROUP_ID, generate_member_list(size, shape, seed=args.seed))
+    await server.start()
+
+    recorder = StageRecorder()
+
+    def on_send(seconds: float, message):
+        if any(type(component).__name__ == 'Image' for component in message):
+            recorder.record('send', seconds)
+
+    host = FakeHost(send_latency=args.send_latency, on_send=on_send)
+    plugin = main_mod.GroupInsightPlugin(host)
+    plugin.config = {'api_base_url': server.base_url, 'api_key': 'bench', 'admin_user_ids': [ADMIN_ID]}
+    plugin.ap = types.SimpleNamespace(plugin_mgr=types.SimpleNamespace(get_plugin=lambda **kwargs: None))
+    original_roster, original_graph, original_base64 = main_mod.Roster, snapshot_mod.InviteGraph, main_mod.base64
+    await plugin.initialize()
+    with_layout = not args.no_layout and shutil.which('dot') is not None
+    instrument(plugin, recorder, main_mod, snapshot_mod, with_layout)
+
+    failures = 0
+    try:
+        for _ in range(iterations):
+            # 每轮都模拟冷启动：清空群信息缓存与渲染结果缓存
+            plugin.group_info_cache.clear()
+            plugin.image_cache = image_cache_mod.ImageCache(max_memory_bytes=0)
+            sent_before = len(host.sent)
+            ctx = FakeEventContext(main_mod.TRIGGER_KEYWORD, ADMIN_ID, GROUP_ID)
+            started = time.perf_counter()
+            await plugin.group_message_handler(ctx)
+            recorder.record('total', time.perf_counter() - started)
+            if not any(type(c).__name__ == 'Image' for _, _, m in host.sent[sent_before:] for c in m):
+                failures += 1
+    finally:
+        main_mod.Roster, snapshot_mod.InviteGraph, main_mod.base64 = original_roster, original_graph, original_base64
+        await plugin.destroy()
+        await server.stop()
+
+    return {'size': size, 'shape': shape, 'iterations': iterations, 'failures': failures,
+            'layout': with_layout, 'api_requests': sum(server.request_counts.values()), 'stages': recorder.summary()}
+
+
+def print_case(result: Dict[str, Any]):
+    layout_note = "" if result['layout'] else "（未执行 Graphviz 布局）"
+    print(f"\n== {result['shape']} × {result['size']} 成员，{result['iterations']} 轮，失败 {result['failures']} 轮{layout_note} ==")
+    print(f"{'stage':<8}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}{'ops/s':>10}")
+    for stage in STAGES:
+        s = result['stages'].get(stage)
+        if s:
+            print(f"{stage:<8}{s['p50_ms']:>10.2f}{s['p90_ms']:>10.2f}{s['p99_ms']:>10.2f}{s['max_ms']:>10.2f}{s['ops_per_s']:>10.1f}")
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="GroupInsight 离线压测")
+    parser.add_argument('--sizes', default='50,500,5000,50000', help="花名册规模，逗号分隔")
+    parser.add_argument('--shapes', default='random,star', help=f"花名册形状，逗号分隔，可选: {','.join(SHAPES)}")
+    parser.add_argument('--iterations', type=int, default=5)
+    parser.add_argument('--api-latency', type=float, default=0.0, help="模拟 API 固定延迟（秒）")
+    parser.add_argument('--api-jitter', type=float, default=0.0, help="模拟 API 随机抖动上限（秒）")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="模拟 API 返回错误的概率")
+    parser.add_argument('--send-latency', type=float, default=0.0, help="模拟发送消息的延迟（秒）")
+    parser.add_argument('--no-layout', action='store_true', help="不调用 Graphviz，只统计 DOT 构建")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="将结果另存为 JSON 文件")
+    return parser.parse_args(argv)
+
+
+async def main(argv=None):
+    args = parse_args(argv)
+    main_mod, snapshot_mod, image_cache_mod = load_plugin_modules()
+    if main_mod.graphviz is None:
+        raise SystemExit("未安装 Python 包 graphviz，无法执行压测。")
+    if not args.no_layout and shutil.which('dot') is None:
+        print("未找到 Graphviz 可执行文件，layout 阶段将被跳过。")
+
+    results = []
+    for shape in args.shapes.split(','):
+        for size in (int(s) for s in args.sizes.split(',')):
+            result = await run_case(main_mod, snapshot_mod, image_cache_mod, size, shape.strip(), args.iterations, args)
+            print_case(result)
+            results.append(result)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
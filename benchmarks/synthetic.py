@@ -0,0 +1,81 @@
+# plugins/GroupInsight/benchmarks/synthetic.py
+"""
+生成 GetChatRoomInfo 格式的合成花名册（chatroom_member_list），用于离线压测。
+
+每个成员为 {'user_name', 'nick_name', 'unknow'}，unknow 为邀请人 wxid（空串表示无）。
+支持的形状：
+- chain:   一条长邀请链，每人邀请下一个人（最深的树）
+- star:    少数几个邀请人邀请了绝大多数成员（触发 twopi 布局）
+- bushy:   每个邀请人有若干个下级的宽树（最常见的真实形态）
+- random:  每个成员的邀请人从之前入群的成员中随机挑选
+- cycles:  random 基础上插入若干邀请环
+- leavers: random 基础上让一部分邀请人已经退群（只作为 unknow 出现）
+"""
+
+import random
+from typing import Any, Dict, List, Optional
+
+SHAPES = ('chain', 'star', 'bushy', 'random', 'cycles', 'leavers')
+
+NICKNAME_POOL = ['小明', '阿花', 'Tom', '橙子', '🍀幸运草', '大壮', 'Lily', '风​中', '老王 ', '水果店-张姐']
+
+
+def _wxid(i: int) -> str:
+    return f"wxid_bench{i:06d}"
+
+
+def _nickname(rng: random.Random, i: int) -> str:
+    return f"{rng.choice(NICKNAME_POOL)}{i}"
+
+
+def _inviters(shape: str, n: int, rng: random.Random, branching: int) -> List[Optional[int]]:
+    if shape == 'chain':
+        return [None] + list(range(n - 1))
+    if shape == 'star':
+        hubs = max(1, n // 200)
+        return [None if i < hubs else rng.randrange(hubs) for i in range(n)]
+    if shape == 'bushy':
+        return [None] + [(i - 1) // branching for i in range(1, n)]
+    # random / cycles / leavers：约 10% 成员无邀请人（扫码入群等）
+    return [None if i == 0 or rng.random() < 0.1 else rng.randrange(i) for i in range(n)]
+
+
+def generate_member_list(size: int, shape: str = 'random', seed: int = 0, branching: int = 4,
+                         cycle_count: int = 5, leaver_ratio: float = 0.05) -> List[Dict[str, Any]]:
+    if shape not in SHAPES:
+        raise ValueError(f"未知的花名册形状 {shape}，可选: {', '.join(SHAPES)}")
+    rng = random.Random(seed)
+    n = max(1, size)
+    inviters = _inviters(shape, n, rng, max(1, branching))
+
+    if shape == 'cycles':
+        # 让若干段 a -> b -> ... -> a 首尾相连
+        for _ in range(min(cycle_count, n // 3)):
+            a = rng.randrange(n)
+            b = rng.randrange(n)
+            c = rng.randrange(n)
+            if len({a, b, c}) == 3:
+                inviters[a], inviters[b], inviters[c] = b, c, a
+
+    inviter_ids: List[Optional[str]] = [_wxid(p) if p is not None else None for p in inviters]
+    present = [True] * n
+    if shape == 'leavers':
+        # 被选中的邀请人从花名册中移除，但其下级的 unknow 仍指向他
+        candidates = [p for p in set(inviters) if p is not None]
+        rng.shuffle(candidates)
+        for p in candidates[:int(n * leaver_ratio)]:
+            present[p] = False
+
+    return [
+        {'user_name': _wxid(i), 'nick_name': _nickname(rng, i), 'unknow': inviter_ids[i] or ''}
+        for i in range(n) if present[i]
+    ]
+
+
+def build_contact(group_id: str, member_list: List[Dict[str, Any]], group_name: Optional[str] = None) -> Dict[str, Any]:
+    """包装成 GetChatRoomInfo 响应中 contactList 的单个元素。"""
+    return {
+        'userName': {'str': group_id},
+        'nickName': {'str': group_name or f"压测群 {group_id}"},
+        'newChatroomData': {'member_count': len(member_list), 'chatroom_member_list': member_list},
+    }
@@ -0,0 +1,287 @@
+# plugins/GroupInsight/cache.py
+
+import asyncio
+import logging
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+DEFAULT_TTL = 60            # 新鲜期（秒）
+DEFAULT_STALE_TTL = 600     # 过期后仍可先返回旧快照的时长（秒）
+DEFAULT_MAX_ENTRIES = 200
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def estimate_size(obj: Any, _depth: int = 0) -> int:
+    """粗略估算 API 返回结构（dict/list/str 嵌套）占用的内存字节数。"""
+    size = sys.getsizeof(obj)
+    if _depth > 8:
+        return size
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            size += estimate_size(k, _depth + 1) + estimate_size(v, _depth + 1)
+    elif isinstance(obj, (list, tuple)):
+        for item in obj:
+            size += estimate_size(item, _depth + 1)
+    return size
+
+
+class _CacheEntry:
+    __slots__ = ('value', 'fetched_at', 'size', 'ttl')
+
+    def __init__(self, value: Any, fetched_at: float, size: int, ttl: float):
+        self.value = value
+        self.fetched_at = fetched_at
+        self.size = size
+        self.ttl = ttl
+
+
+class GroupInfoCache:
+    """
+    群信息缓存：LRU 淘汰（条目数 + 内存双上限）、TTL 新鲜期、过期后 stale-while-revalidate，
+    以及同一 key 并发未命中时的单飞（single-flight）加载，避免缓存击穿时重复请求 API。
+    """
+
+    def __init__(self, ttl: float = DEFAULT_TTL, stale_ttl: float = DEFAULT_STALE_TTL,
+                 max_entries: int = DEFAULT_MAX_ENTRIES, max_bytes: Optional[int] = DEFAULT_MAX_BYTES,
+                 size_fn: Callable[[Any], int] = estimate_size,
+                 logger: Optional[logging.Logger] = None):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max(1, max_entries)
+        self.max_bytes = max_bytes
+        self.size_fn = size_fn
+        self.logger = logger or logging.getLogger("GroupInsightPlugin")
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._background: set = set()
+        self._total_bytes = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.refreshes = 0
+        self.load_failures = 0
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def peek(self, key: str) -> Optional[Any]:
+        """不计入统计、不触发加载地读取当前值（无论是否过期）。"""
+        entry = self._entries.get(key)
+        return entry.value if entry else None
+
+    def age(self, key: str) -> Optional[float]:
+        entry = self._entries.get(key)
+        return time.time() - entry.fetched_at if entry else None
+
+    def fresh_for(self, key: str) -> Optional[float]:
+        """距离该项过期还有多少秒（已过期时为负数），不存在时返回 None。"""
+        entry = self._entries.get(key)
+        return entry.ttl - (time.time() - entry.fetched_at) if entry else None
+
+    def values(self) -> List[Any]:
+        """按最近最少使用到最近使用的顺序返回全部当前值（含已过期的），不计入统计。"""
+        return [entry.value for entry in self._entries.values()]
+
+    def put(self, key: str, value: Any, fetched_at: Optional[float] = None, ttl: Optional[float] = None):
+        """写入一项；ttl 为该项单独的新鲜期（如由增量事件保持最新的花名册），默认使用缓存的 ttl。"""
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._total_bytes -= old.size
+        size = self.size_fn(value) if self.max_bytes else 0
+        self._entries[key] = _CacheEntry(value, fetched_at if fetched_at is not None else time.time(), size,
+                                         ttl if ttl is not None else self.ttl)
+        self._total_bytes += size
+        self._evict()
+
+    def invalidate(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._total_bytes -= entry.size
+
+    def clear(self):
+        self._entries.clear()
+        self._total_bytes = 0
+
+    def _evict(self):
+        while len(self._entries) > self.max_entries or (
+                self.max_bytes and self._total_bytes > self.max_bytes and len(self._entries) > 1):
+            key, entry = self._entries.popitem(last=False)
+            self._total_bytes -= entry.size
+            self.evictions += 1
+            self.logger.debug(f"群信息缓存淘汰: {key}")
+
+    async def get(self, key: str, loader: Callable[[], Awaitable[Optional[Any]]],
+                  force_refresh: bool = False) -> Optional[Any]:
+        """
+        读取缓存，按需调用 loader 加载。loader 返回 None 视为加载失败，不写入缓存。
+        - 新鲜命中：直接返回；
+        - 过期但在 stale_ttl 内：立即返回旧快照，并在后台刷新；
+        - 未命中或 force_refresh：与同 key 的在途加载共享同一次请求。
+        """
+        entry = self._entries.get(key)
+        if entry is not None and not force_refresh:
+            age = time.time() - entry.fetched_at
+            if age < entry.ttl:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return entry.value
+            if age < entry.ttl + self.stale_ttl:
+                self.stale_hits += 1
+                self._entries.move_to_end(key)
+                self._schedule_refresh(key, loader)
+                return entry.value
+
+        self.misses += 1
+        return await self._load(key, loader)
+
+    def _schedule_refresh(self, key: str, loader: Callable[[], Awaitable[Optional[Any]]]):
+        if key in self._inflight:
+            return
+        self.refreshes += 1
+        task = asyncio.ensure_future(self._load(key, loader))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _load(self, key: str, loader: Callable[[], Awaitable[Optional[Any]]]) -> Optional[Any]:
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._run_loader(key, loader))
+            self._inflight[key] = future
+            future.add_done_callback(lambda _f, k=key: self._inflight.pop(k, None))
+        # shield：某个等待方被取消时，不影响共享同一请求的其他等待方
+        return await asyncio.shield(future)
+
+    async def _run_loader(self, key: str, loader: Callable[[], Awaitable[Optional[Any]]]) -> Optional[Any]:
+        try:
+            value = await loader()
+        except Exception as e:
+            self.logger.error(f"加载缓存项 {key} 时出错: {e}")
+            value = None
+        if value is None:
+            self.load_failures += 1
+            return None
+        self.put(key, value)
+        return value
+
+    async def get_many(self, keys: Iterable[str],
+                       batch_loader: Callable[[List[str]], Awaitable[Dict[str, Any]]],
+                       force_refresh: bool = False) -> Dict[str, Optional[Any]]:
+        """
+        批量读取。命中规则与 get() 一致；所有未命中的 key 合并为一次 batch_loader 调用
+        （由调用方负责分块），并登记为在途加载，使同时到来的单 key 请求复用结果。
+        batch_loader 返回 {key: value}，缺失的 key 视为加载失败。
+        """
+        results: Dict[str, Optional[Any]] = {}
+        waiting: Dict[str, asyncio.Future] = {}
+        to_load: List[str] = []
+        to_refresh: List[str] = []
+        now = time.time()
+        for key in dict.fromkeys(keys):
+            entry = self._entries.get(key)
+            if entry is not None and not force_refresh:
+                age = now - entry.fetched_at
+                if age < entry.ttl:
+                    self.hits += 1
+                    self._entries.move_to_end(key)
+                    results[key] = entry.value
+                    continue
+                if age < entry.ttl + self.stale_ttl:
+                    self.stale_hits += 1
+                    self._entries.move_to_end(key)
+                    results[key] = entry.value
+                    if key not in self._inflight:
+                        to_refresh.append(key)
+                    continue
+            self.misses += 1
+            if key in self._inflight:
+                waiting[key] = self._inflight[key]
+            else:
+                to_load.append(key)
+
+        if to_load:
+            waiting.update(self._start_batch(to_load, batch_loader))
+        if to_refresh:
+            self.refreshes += len(to_refresh)
+            self._start_batch(to_refresh, batch_loader)
+
+        for key, future in waiting.items():
+            results[key] = await asyncio.shield(future)
+        return results
+
+    async def refresh_many(self, keys: Iterable[str],
+                           batch_loader: Callable[[List[str]], Awaitable[Dict[str, Any]]]) -> Dict[str, Optional[Any]]:
+        """
+        后台预取用：无条件重新加载给定的 key（已在途的直接复用），计入 refreshes 而不计入命中/未命中。
+        加载失败的 key 保留原有缓存值。
+        """
+        waiting: Dict[str, asyncio.Future] = {}
+        to_load: List[str] = []
+        for key in dict.fromkeys(keys):
+            if key in self._inflight:
+                waiting[key] = self._inflight[key]
+            else:
+                to_load.append(key)
+        if to_load:
+            self.refreshes += len(to_load)
+            waiting.update(self._start_batch(to_load, batch_loader))
+        return {key: await asyncio.shield(future) for key, future in waiting.items()}
+
+    def _start_batch(self, keys: List[str],
+                     batch_loader: Callable[[List[str]], Awaitable[Dict[str, Any]]]) -> Dict[str, asyncio.Future]:
+        loop = asyncio.get_running_loop()
+        futures = {key: loop.create_future() for key in keys}
+        for key, future in futures.items():
+            self._inflight[key] = future
+            future.add_done_callback(lambda _f, k=key: self._inflight.pop(k, None))
+
+        async def run():
+            try:
+                try:
+                    loaded = await batch_loader(keys) or {}
+                except Exception as e:
+                    self.logger.error(f"批量加载缓存项 {keys} 时出错: {e}")
+                    loaded = {}
+                for key, future in futures.items():
+                    value = loaded.get(key)
+                    if value is None:
+                        self.load_failures += 1
+                    else:
+                        self.put(key, value)
+                    if not future.done():
+                        future.set_result(value)
+            finally:
+                # 被 close() 取消时 CancelledError 不经过上面的 except：按加载失败结束所有等待方，同时移出在途登记
+                for future in futures.values():
+                    if not future.done():
+                        future.set_result(None)
+
+        task = asyncio.ensure_future(run())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+        return futures
+
+    async def close(self):
+        for task in list(self._background):
+            task.cancel()
+        self._background.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'bytes': self._total_bytes,
+            'hits': self.hits,
+            'stale_hits': self.stale_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'refreshes': self.refreshes,
+            'load_failures': self.load_failures,
+            'inflight': len(self._inflight),
+            'hit_rate': (self.hits + self.stale_hits) / lookups if lookups else 0.0,
+        }
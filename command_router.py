@@ -0,0 +1,93 @@
+# plugins/GroupInsight/command_router.py
+
+import re
+from typing import Awaitable, Callable, Dict, Iterable, Match, NamedTuple, Optional, Pattern, Tuple
+
+COMMAND_PREFIX = "#"
+GROUP_ID_REGEX = r'[\w\-\.]+(?:@chatroom)?'
+# 成员参数：wxid 或昵称；含空白的昵称用引号括起，@ 提及时的前导 @ 会被去掉（见 member_argument）
+MEMBER_REGEX = r'(?:"[^"]+"|“[^”]+”|[^\s"“”]+)'
+
+# handler(ctx, match, sender_id, current_group_id)
+RouteHandler = Callable[..., Awaitable[None]]
+
+
+class Route(NamedTuple):
+    """一条指令：触发词、指标名、预编译的语法（按顺序尝试）、处理函数，以及语法不匹配时的错误提示（None 表示静默忽略）。"""
+    trigger: str
+    name: str
+    grammar: Tuple[Pattern, ...]
+    handler: RouteHandler
+    usage: Optional[str]
+
+    def parse(self, text: str) -> Optional[Match]:
+        for pattern in self.grammar:
+            match = pattern.match(text)
+            if match is not None:
+                return match
+        return None
+
+
+def exact_grammar(trigger: str) -> Tuple[Pattern, ...]:
+    """不带参数的指令。"""
+    return (re.compile(re.escape(trigger) + r'\s*$'),)
+
+
+def group_target_grammar(trigger: str) -> Tuple[Pattern, ...]:
+    """`触发词 [<源群ID>] [到 <目标群ID>]`；`触发词到 <目标群ID>` 为省略源群的写法。"""
+    t = re.escape(trigger)
+    return (
+        re.compile(t + r'\s+(?P<fetch_id>' + GROUP_ID_REGEX + r')\s+到\s+(?P<send_id>' + GROUP_ID_REGEX + r')\s*$'),
+        re.compile(t + r'\s+(?P<fetch_id>' + GROUP_ID_REGEX + r')\s*$'),
+        re.compile(t + r'到\s+(?P<send_id>' + GROUP_ID_REGEX + r')\s*$'),
+        re.compile(t + r'\s*$'),
+    )
+
+
+def member_grammar(trigger: str, tail: str = '') -> Tuple[Pattern, ...]:
+    """`触发词 <成员ID或昵称>`，tail 为成员参数之后的可选参数部分（正则）。"""
+    return (re.compile(re.escape(trigger) + r'\s+(?P<member_id>' + MEMBER_REGEX + r')' + tail + r'\s*$'),)
+
+
+def member_argument(match: Match) -> str:
+    """取出语法匹配到的成员参数，去掉引号与 @ 提及的前缀。"""
+    text = match.group('member_id')
+    if text[:1] in '"“' and len(text) > 1:
+        text = text[1:-1]
+    return text.lstrip('@').strip() or text
+
+
+def member_target_grammar(trigger: str) -> Tuple[Pattern, ...]:
+    """`触发词 <成员ID> [在 <源群ID>] [到 <目标群ID>]`。"""
+    return member_grammar(trigger, r'(?:\s+在\s+(?P<fetch_id>' + GROUP_ID_REGEX + r'))?'
+                                   r'(?:\s+到\s+(?P<send_id>' + GROUP_ID_REGEX + r'))?')
+
+
+class CommandRouter:
+    """
+    预编译的指令路由：所有触发词合并为一个按长度降序排列的交替正则，每条指令的语法在构造时编译一次。
+    route() 对不以 COMMAND_PREFIX 开头的消息只做一次首字符比较即返回，群聊中绝大多数普通消息走这条路径。
+    """
+
+    __slots__ = ('routes', '_trigger_pattern')
+
+    def __init__(self, routes: Iterable[Route]):
+        self.routes: Dict[str, Route] = {}
+        for route in routes:
+            if not route.trigger.startswith(COMMAND_PREFIX):
+                raise ValueError(f"触发词必须以 {COMMAND_PREFIX} 开头: {route.trigger}")
+            self.routes[route.trigger] = route
+        # 较长的触发词优先，避免某个触发词恰好是另一个的前缀时被短的抢先匹配
+        alternation = "|".join(re.escape(t) for t in sorted(self.routes, key=len, reverse=True))
+        self._trigger_pattern = re.compile(f"(?:{alternation})")
+
+    def route(self, text: str) -> Optional[Route]:
+        """text 需已去除首尾空白；不是指令时返回 None。"""
+        if text[:1] != COMMAND_PREFIX:
+            return None
+        match = self._trigger_pattern.match(text)
+        return self.routes[match.group()] if match is not None else None
+
+    @property
+    def triggers(self) -> Tuple[str, ...]:
+        return tuple(self.routes)
@@ -0,0 +1,116 @@
+# plugins/GroupInsight/cross_group.py
+
+from typing import Dict, List, NamedTuple, Optional
+
+from .invite_graph import InviteGraph
+
+
+class GroupAppearance(NamedTuple):
+    """某个 wxid 在单个群中的出现情况；inviter 为邀请人 wxid（None 表示无），is_member 为 False 表示已退群（仅作为邀请人出现）。"""
+    group_id: str
+    group_name: str
+    is_member: bool
+    inviter: Optional[str]
+    inviter_name: str                    # 邀请人在该群的显示名，邀请人已退群时为空串
+    direct_count: int
+    downline_count: int
+
+
+class CrossGroupReport(NamedTuple):
+    member_id: str
+    display_name: str
+    appearances: List[GroupAppearance]
+    downline: List[str]                  # 跨群去重后的全部下级（仅统计至少在一个群中在群的成员）
+    downline_by_group: Dict[str, int]    # 群ID -> 该群中属于上述下级的在群人数
+
+
+class CrossGroupIndex:
+    """
+    把多个群的邀请关系合并为一张以 wxid 为键的全局图。节点为全局整数下标，
+    children 为跨群合并、去重后的邀请边；members_in 记录每个节点在哪些群中仍在群。
+    同一人在不同群中由不同邀请人拉入时，这些边会同时保留，下级统计按可达性去重。
+    """
+
+    __slots__ = ('graphs', 'ids', 'index', 'children', 'members_in')
+
+    def __init__(self, graphs: Dict[str, InviteGraph]):
+        self.graphs = graphs
+        self.ids: List[str] = []
+        self.index: Dict[str, int] = {}
+        children: List[set] = []
+        members_in: List[List[str]] = []
+
+        def node(wxid: str) -> int:
+            i = self.index.get(wxid)
+            if i is None:
+                i = self.index[wxid] = len(self.ids)
+                self.ids.append(wxid)
+                children.append(set())
+                members_in.append([])
+            return i
+
+        for group_id, graph in graphs.items():
+            local = [node(wxid) for wxid in graph.ids]
+            for v, p in enumerate(graph.parent):
+                if v < graph.member_count:
+                    members_in[local[v]].append(group_id)
+                if p >= 0:
+                    children[local[p]].add(local[v])
+
+        self.children = children
+        self.members_in = members_in
+
+    def __contains__(self, wxid: str) -> bool:
+        return wxid in self.index
+
+    def display_name(self, wxid: str) -> str:
+        for graph in self.graphs.values():
+            v = graph.index.get(wxid)
+            if v is not None and graph.is_member(v) and graph.names[v]:
+                return graph.names[v]
+        return wxid
+
+    def downline(self, wxid: str) -> List[str]:
+        """wxid 在所有群合并后的全部下级（不含自身），只返回至少在一个群中在群的成员。邀请环由 visited 集合截断。"""
+        start = self.index.get(wxid)
+        if start is None:
+            return []
+        visited = {start}
+        stack = [start]
+        result = []
+        while stack:
+            v = stack.pop()
+            for c in self.children[v]:
+                if c not in visited:
+                    visited.add(c)
+                    stack.append(c)
+                    if self.members_in[c]:
+                        result.append(self.ids[c])
+        return result
+
+    def appearances(self, wxid: str) -> List[GroupAppearance]:
+        result = []
+        for group_id, graph in self.graphs.items():
+            v = graph.index.get(wxid)
+            if v is None:
+                continue
+            p = graph.parent[v]
+            downline = graph.full_downline(v)
+            result.append(GroupAppearance(
+                group_id=group_id,
+                group_name=graph.roster.group_name,
+                is_member=graph.is_member(v),
+                inviter=graph.ids[p] if p >= 0 else None,
+                inviter_name=graph.names[p] if p >= 0 and graph.is_member(p) else '',
+                direct_count=sum(1 for c in graph.invitees(v) if graph.is_member(c)),
+                downline_count=sum(1 for u in downline if graph.is_member(u)),
+            ))
+        return result
+
+    def report(self, wxid: str) -> CrossGroupReport:
+        downline = self.downline(wxid)
+        by_group: Dict[str, int] = {}
+        for member in downline:
+            for group_id in self.members_in[self.index[member]]:
+                by_group[group_id] = by_group.get(group_id, 0) + 1
+        return CrossGroupReport(wxid, self.display_name(wxid), self.appearances(wxid), downline, by_group)
@@ -0,0 +1,282 @@
+# plugins/GroupInsight/graph_render.py
+"""
+邀请关系图的绘制逻辑：确定绘制范围、选择引擎与渲染档位、生成 DOT 源码。
+只依赖花名册与邀请关系索引，不依赖 LangBot，插件与离线批处理工具（batch/report.py）共用。
+"""
+
+import hashlib
+import html
+import json
+import logging
+import traceback
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from .invite_graph import InviteGraph
+from .layout_cache import NodeBox
+from .render_budget import RenderProfile, choose_format
+
+try:
+    import graphviz
+except ImportError:
+    graphviz = None
+
+# 【重构】默认的 dot 引擎参数，使用 ortho 优化线条
+GRAPH_ATTR_DOT = {
+    'rankdir': 'TB',
+    'dpi': '150',
+    'nodesep': '0.6',
+    'ranksep': '1.2',
+    'pad': '1.0,1.0',
+    'splines': 'ortho',  # 使用直角线，更整洁
+    'concentrate': 'false',
+}
+# 【重构】为 twopi 引擎定制的参数，解决高密度问题
+GRAPH_ATTR_TWOPI = {
+    'dpi': '150',
+    'pad': '1.5,1.5', # 更大的边距
+    'splines': 'spline',
+    'overlap': 'false', # 禁止节点重叠
+    'sep': '+25,25', # 强制增加节点间距
+}
+# 【新增】超大群使用 sfdp 力导向布局，直线边、低 dpi，保证数千节点也能在超时前完成
+GRAPH_ATTR_SFDP = {
+    'dpi': '72',
+    'pad': '1.0,1.0',
+    'splines': 'false',
+    'overlap': 'prism',
+    'outputorder': 'edgesfirst',
+    'K': '1.2',
+}
+# 【新增】渲染预算不足时的降级参数：直线边、较低 dpi
+GRAPH_ATTR_FAST = {
+    'splines': 'line',
+    'dpi': '96',
+}
+# 【新增】最后一档图片：sfdp 只做整体缩放去重叠，dpi 再降一档
+GRAPH_ATTR_SFDP_FAST = {
+    'dpi': '60',
+    'overlap': 'scale',
+}
+NODE_ATTR = {
+    'style': 'filled',
+    'shape': 'box',
+    'fontname': 'WenQuanYi Zen Hei',
+    'fontsize': '12',
+    'fixedsize': 'false',
+    'margin': '0.25,0.15',
+}
+EDGE_ATTR = {'arrowsize': '0.7'}
+MAX_NODES_TO_RENDER = 500 # 超过此成员数时进入大图模式（折叠叶子节点、必要时改用 sfdp）
+MAX_NODES_LARGE_GRAPH = 5000 # 大图模式折叠后仍超过此节点数时，建议使用分页模式
+ORTHO_SPLINES_NODE_LIMIT = 150 # ortho 直角线在节点较多时极慢，超过此数改用折线
+SFDP_NODE_THRESHOLD = 400 # 实际绘制节点数超过此值时使用 sfdp 引擎
+LEAF_COLLAPSE_MIN = 2 # 同一邀请人下至少有这么多个无下级成员时才折叠为摘要节点
+STAR_GRAPH_THRESHOLD_RATIO = 0.3
+STAR_GRAPH_THRESHOLD_ABSOLUTE = 15
+
+
+class RenderPlan(NamedTuple):
+    """一次渲染实际绘制的节点集合；summaries 为 {邀请人下标（-1 表示无邀请人）: 被折叠的成员数}。"""
+    nodes: List[int]
+    summaries: Dict[int, int]
+    subtree_root: Optional[int]
+
+    @property
+    def node_count(self) -> int:
+        return len(self.nodes) + len(self.summaries)
+
+
+def plan_render(graph: InviteGraph, subtree_root: Optional[int] = None) -> RenderPlan:
+    """
+    确定实际绘制的节点。成员数不超过 MAX_NODES_TO_RENDER 时绘制全部节点；
+    超过时进入大图模式：同一邀请人下的无下级成员折叠为一个带人数的摘要节点。
+    subtree_root 不为空时只绘制该顶级邀请人的子树（分页模式）。
+    """
+    if subtree_root is None:
+        candidates = range(len(graph))
+        represented = graph.member_count
+    else:
+        candidates = graph.order[graph.tin[subtree_root]:graph.tout[subtree_root]]
+        represented = graph.subtree_size[subtree_root]
+
+    if represented <= MAX_NODES_TO_RENDER:
+        return RenderPlan(list(candidates), {}, subtree_root)
+
+    leaf_counts: Dict[int, int] = {}
+    for v in candidates:
+        if v != subtree_root and not graph.children[v]:
+            p = graph.tree_parent[v]
+            leaf_counts[p] = leaf_counts.get(p, 0) + 1
+
+    nodes, summaries = [], {}
+    for v in candidates:
+        if v != subtree_root and not graph.children[v]:
+            p = graph.tree_parent[v]
+            if leaf_counts[p] >= LEAF_COLLAPSE_MIN:
+                summaries[p] = summaries.get(p, 0) + 1
+                continue
+        nodes.append(v)
+    return RenderPlan(nodes, summaries, subtree_root)
+
+
+def choose_engine(graph: InviteGraph, plan: RenderPlan) -> Tuple[str, Dict[str, str]]:
+    """按绘制规模与形状选择布局引擎：超大图 sfdp，星型（一人邀请了大部分成员）twopi，其余 dot。"""
+    engine = 'dot'
+    graph_attrs = GRAPH_ATTR_DOT.copy()
+    node_count = plan.node_count
+    if node_count > SFDP_NODE_THRESHOLD:
+        return 'sfdp', GRAPH_ATTR_SFDP.copy()
+
+    # 所有成员都无邀请人且无下级时，plan.nodes 为空、全部折叠进摘要节点，此时使用默认引擎
+    max_inviter = max(plan.nodes, key=lambda v: len(graph.children[v]), default=None)
+    if max_inviter is None:
+        return engine, graph_attrs
+    max_invite_count = len(graph.children[max_inviter])
+    group_size = len(plan.nodes) + sum(plan.summaries.values())
+
+    if (max_invite_count >= STAR_GRAPH_THRESHOLD_ABSOLUTE and 
+       (max_invite_count / group_size) >= STAR_GRAPH_THRESHOLD_RATIO):
+        engine = 'twopi'
+        graph_attrs = GRAPH_ATTR_TWOPI.copy()
+        graph_attrs['root'] = graph.ids[max_inviter]
+    elif node_count > ORTHO_SPLINES_NODE_LIMIT:
+        graph_attrs['splines'] = 'polyline'
+    return engine, graph_attrs
+
+
+def render_ladder(graph: InviteGraph, plan: RenderPlan, vector_ok: bool = False) -> List[RenderProfile]:
+    """
+    【新增】渲染档位，从 choose_engine 的默认选择开始画质依次降低；最后一档之后只剩文字版。
+    vector_ok 表示输出端能展示 SVG（如离线报告），超大图的档位改为输出 SVG。
+    """
+    engine, graph_attrs = choose_engine(graph, plan)
+    if engine == 'sfdp':
+        candidates = [('sfdp', graph_attrs)]
+    else:
+        candidates = [('twopi' if engine == 'twopi' else f"dot-{graph_attrs['splines']}", graph_attrs)]
+        if graph_attrs.get('splines') == 'ortho':
+            candidates.append(('dot-polyline', {**graph_attrs, 'splines': 'polyline'}))
+        candidates.append((f"{engine}-line", {**graph_attrs, **GRAPH_ATTR_FAST}))
+        candidates.append(('sfdp', GRAPH_ATTR_SFDP.copy()))
+    candidates.append(('sfdp-fast', {**GRAPH_ATTR_SFDP, **GRAPH_ATTR_SFDP_FAST}))
+    return [RenderProfile(name, name.split('-')[0], attrs, choose_format(plan.node_count, attrs, vector_ok)) for name, attrs in candidates]
+
+
+def plan_edge_count(graph: InviteGraph, plan: RenderPlan) -> int:
+    visible = set(plan.nodes)
+    return sum(1 for v in plan.nodes if graph.parent[v] in visible) + sum(1 for p in plan.summaries if p != -1)
+
+
+def plan_topology(graph: InviteGraph, plan: RenderPlan) -> Tuple[List[str], Dict[str, Optional[str]]]:
+    """实际绘制的节点名（与 DOT 中的节点名一致）及各自在图中的上级节点名。"""
+    visible = set(plan.nodes)
+    parent_of: Dict[str, Optional[str]] = {}
+    for v in plan.nodes:
+        p = graph.parent[v]
+        parent_of[graph.ids[v]] = graph.ids[p] if p in visible else None
+    for p in plan.summaries:
+        if p == -1:
+            parent_of['__collapsed_root'] = None
+        else:
+            parent_of[f"__collapsed_{graph.ids[p]}"] = graph.ids[p]
+    return list(parent_of), parent_of
+
+
+def render_cache_key(graph: InviteGraph, group_name: str, plan: RenderPlan, engine: str,
+                     graph_attrs: Dict[str, str], output_format: str, leaver_names: Optional[Dict[str, str]] = None) -> str:
+    """渲染结果的内容地址：花名册指纹（成员、清洗后的昵称、邀请人）+ 已退群成员的历史昵称 + 标题 + 绘制范围 + 引擎与全部图属性。"""
+    h = hashlib.sha1()
+    h.update(graph.fingerprint().encode())
+    h.update(json.dumps([group_name, plan.subtree_root, len(plan.nodes), sorted(plan.summaries.items()),
+                         engine, graph_attrs, NODE_ATTR, EDGE_ATTR, output_format, leaver_names or {}],
+                        sort_keys=True, ensure_ascii=False).encode('utf-8'))
+    return h.hexdigest()
+
+
+def build_invite_digraph(graph: InviteGraph, group_id: str, group_name: str, plan: RenderPlan,
+                         leaver_names: Optional[Dict[str, str]] = None, engine: Optional[str] = None,
+                         graph_attrs: Optional[Dict[str, str]] = None, positions: Optional[Dict[str, NodeBox]] = None,
+                         logger: Optional[logging.Logger] = None) -> Optional['graphviz.Digraph']:
+    if graphviz is None:
+        return None
+    logger = logger or logging.getLogger("GroupInsightPlugin")
+    leaver_names = leaver_names or {}
+    # 【新增】按已有布局绘制时为每个节点写入坐标（单位为点，供 neato -n2 使用）
+    positions = positions or {}
+
+    def pos(name: str) -> Dict[str, str]:
+        box = positions.get(name)
+        return {'pos': f"{box.x:.2f},{box.y:.2f}"} if box is not None else {}
+
+    try:
+        # 全部成员都被折叠时 plan.nodes 为空，仍绘制只含摘要节点的图
+        if not graph.member_count or not (plan.nodes or plan.summaries):
+            logger.warning(f"渲染中止：群 {group_id} 清理后的成员列表为空。")
+            return None
+
+        # --- 【重构】引擎选择与图属性设置 ---
+        if engine is None:
+            engine, graph_attrs = choose_engine(graph, plan)
+        logger.info(f"为群 {group_id} 选择的渲染引擎: {engine}（绘制 {plan.node_count} 个节点，折叠 {sum(plan.summaries.values())} 名成员）")
+
+        # --- 【重构】创建扁平、稳健的图 ---
+        dot = graphviz.Digraph(f'invite_tree_{group_id}', engine=engine)
+
+        # 设置图、节点、边的全局属性
+        dot.attr('graph', **graph_attrs)
+        dot.attr('node', **NODE_ATTR)
+        dot.attr('edge', **EDGE_ATTR)
+
+        # 使用 graph 的 label 属性设置标题，这是最稳健的方式
+        # 【重构】标题不再包含生成时间（改由发送时的文字说明附带），使未变化的群可以复用渲染缓存
+        title_text = f"{html.escape(group_name)} 的群成员邀请关系图表"
+        if plan.summaries:
+            title_text += f"\n(大图模式：已将 {sum(plan.summaries.values())} 名无下级成员折叠为摘要节点)"
+        dot.attr(label=title_text, labelloc='t', fontsize='20', fontname='WenQuanYi Zen Hei')
+
+        # --- 节点与边的创建 ---
+        visible = set(plan.nodes)
+        for v in sorted(plan.nodes, key=graph.ids.__getitem__):
+            wxid = graph.ids[v]
+            is_leaver = not graph.is_member(v)
+            nickname = graph.names[v]
+
+            label_parts = []
+            color = "grey88" # 默认颜色
+            if is_leaver:
+                # 【新增】开启花名册历史后，已退群的邀请人显示其退群前的昵称
+                leaver_name = leaver_names.get(wxid)
+                label_parts.append(f"已退群: {html.escape(leaver_name)}" if leaver_name else "已退群")
+            else:
+                label_parts.append(html.escape(nickname or " "))
+                color = "lightblue"
+                if graph.parent[v] == -1:
+                    color = "lightgreen"
+
+            label_parts.append(wxid)
+            # 使用 r"\n" 来确保在 DOT 源码中是字面上的换行符
+            label = r"\n".join(label_parts)
+            dot.node(wxid, label=label, fillcolor=color, **pos(wxid))
+
+        for v in plan.nodes:
+            p = graph.parent[v]
+            if p in visible:
+                dot.edge(graph.ids[p], graph.ids[v])
+
+        # --- 【新增】大图模式的折叠摘要节点 ---
+        for p, count in plan.summaries.items():
+            if p == -1:
+                dot.node('__collapsed_root', label=f"{count} 名成员\\n无邀请人且无下级", fillcolor="lemonchiffon", style="filled,dashed",
+                         **pos('__collapsed_root'))
+            else:
+                summary_id = f"__collapsed_{graph.ids[p]}"
+                dot.node(summary_id, label=f"另有 {count} 名成员\\n(均无下级)", fillcolor="lemonchiffon", style="filled,dashed",
+                         **pos(summary_id))
+                dot.edge(graph.ids[p], summary_id)
+
+        logger.debug(f"为群 {group_id} 生成的 DOT 源代码:\n{dot.source}")
+        return dot
+
+    except Exception as e:
+        logger.error(f"构建 Graphviz 图形时发生严重错误: {e}\n{traceback.format_exc()}")
+        return None
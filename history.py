@@ -0,0 +1,213 @@
+# plugins/GroupInsight/history.py
+
+import asyncio
+import logging
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from .roster import Roster
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS groups (
+    group_id   TEXT PRIMARY KEY,
+    group_name TEXT NOT NULL,
+    last_seen  REAL NOT NULL
+);
+-- 每个群每个 wxid 的最新状态；left_at 为空表示仍在群
+CREATE TABLE IF NOT EXISTS members (
+    group_id   TEXT NOT NULL,
+    wxid       TEXT NOT NULL,
+    nickname   TEXT NOT NULL,
+    inviter    TEXT,
+    first_seen REAL NOT NULL,
+    joined_at  REAL,
+    left_at    REAL,
+    PRIMARY KEY (group_id, wxid)
+) WITHOUT ROWID;
+-- 增量变更：join / leave / rename；首次记录某个群时只写 members，不产生 join 事件
+CREATE TABLE IF NOT EXISTS events (
+    id           INTEGER PRIMARY KEY,
+    group_id     TEXT NOT NULL,
+    wxid         TEXT NOT NULL,
+    kind         TEXT NOT NULL,
+    at           REAL NOT NULL,
+    inviter      TEXT,
+    nickname     TEXT,
+    old_nickname TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_events_group_at ON events (group_id, at);
+CREATE INDEX IF NOT EXISTS idx_events_group_wxid ON events (group_id, wxid, at);
+CREATE INDEX IF NOT EXISTS idx_events_inviter ON events (group_id, inviter, at) WHERE kind = 'join';
+CREATE INDEX IF NOT EXISTS idx_members_wxid ON members (wxid);
+CREATE INDEX IF NOT EXISTS idx_members_inviter ON members (group_id, inviter);
+"""
+
+
+class RosterDiff(NamedTuple):
+    joined: int
+    left: int
+    renamed: int
+
+
+class MemberRecord(NamedTuple):
+    group_id: str
+    wxid: str
+    nickname: str
+    inviter: Optional[str]
+    first_seen: float
+    joined_at: Optional[float]
+    left_at: Optional[float]
+
+
+class JoinEvent(NamedTuple):
+    wxid: str
+    nickname: str
+    at: float
+    left_at: Optional[float]
+
+
+class RosterHistory:
+    """
+    基于 SQLite 的花名册历史：每次拉取到新花名册时与上次状态做差，只写入入群、退群和改名的增量。
+    所有数据库操作都在一个专用线程中串行执行，不阻塞事件循环，也无需额外加锁。
+    花名册指纹未变化时直接跳过，不访问数据库。
+    """
+
+    def __init__(self, path: str, logger: Optional[logging.Logger] = None):
+        self.path = path
+        self.logger = logger or logging.getLogger("GroupInsightPlugin")
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="groupinsight-history")
+        self._conn: Optional[sqlite3.Connection] = None
+        self._fingerprints: Dict[str, str] = {}
+        self.recorded = 0
+        self.skipped = 0
+
+    async def _call(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    async def open(self):
+        await self._call(self._open)
+
+    async def close(self):
+        await self._call(self._close)
+        self._executor.shutdown(wait=True)
+
+    def _open(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        self._conn = conn
+
+    def _close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    async def record(self, roster: Roster, fetched_at: Optional[float] = None) -> Optional[RosterDiff]:
+        """记录一次花名册；返回本次的增量（首次记录或未变化时分别返回全 0 与 None）。"""
+        fingerprint = roster.fingerprint()
+        if self._fingerprints.get(roster.group_id) == fingerprint:
+            self.skipped += 1
+            return None
+        diff = await self._call(self._record, roster, fetched_at if fetched_at is not None else time.time())
+        self._fingerprints[roster.group_id] = fingerprint
+        self.recorded += 1
+        return diff
+
+    def _record(self, roster: Roster, now: float) -> RosterDiff:
+        conn = self._conn
+        group_id = roster.group_id
+        known = conn.execute("SELECT 1 FROM groups WHERE group_id = ?", (group_id,)).fetchone() is not None
+        previous = {wxid: (nickname, left_at) for wxid, nickname, left_at in conn.execute(
+            "SELECT wxid, nickname, left_at FROM members WHERE group_id = ?", (group_id,))}
+
+        ids, names, inviter = roster.ids, roster.names, roster.inviter
+        joins, upserts, renames, events = 0, [], [], []
+        for i in range(roster.member_count):
+            wxid, nickname = ids[i], names[i]
+            p = inviter[i]
+            inviter_id = ids[p] if p >= 0 else None
+            old = previous.pop(wxid, None)
+            if old is None or old[1] is not None:
+                # 新成员，或曾经退群后重新入群
+                joined_at = now if known else None
+                if known:
+                    joins += 1
+                    events.append((group_id, wxid, 'join', now, inviter_id, nickname, None))
+                upserts.append((group_id, wxid, nickname, inviter_id, now, joined_at))
+            elif old[0] != nickname:
+                renames.append((nickname, inviter_id, group_id, wxid))
+                events.append((group_id, wxid, 'rename', now, inviter_id, nickname, old[0]))
+
+        # 剩下的是上次仍在群、本次已不在群的成员
+        leaves = [(wxid, nickname) for wxid, (nickname, left_at) in previous.items() if left_at is None]
+        with conn:
+            conn.executemany(
+                "INSERT INTO members (group_id, wxid, nickname, inviter, first_seen, joined_at, left_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, NULL) "
+                "ON CONFLICT (group_id, wxid) DO UPDATE SET nickname = excluded.nickname, inviter = excluded.inviter, "
+                "joined_at = excluded.joined_at, left_at = NULL",
+                upserts)
+            conn.executemany("UPDATE members SET nickname = ?, inviter = ? WHERE group_id = ? AND wxid = ?", renames)
+            conn.executemany("UPDATE members SET left_at = ? WHERE group_id = ? AND wxid = ?",
+                             [(now, group_id, wxid) for wxid, _ in leaves])
+            events.extend((group_id, wxid, 'leave', now, None, nickname, None) for wxid, nickname in leaves)
+            conn.executemany(
+                "INSERT INTO events (group_id, wxid, kind, at, inviter, nickname, old_nickname) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                events)
+            conn.execute(
+                "INSERT INTO groups (group_id, group_name, last_seen) VALUES (?, ?, ?) "
+                "ON CONFLICT (group_id) DO UPDATE SET group_name = excluded.group_name, last_seen = excluded.last_seen",
+                (group_id, roster.group_name, now))
+        return RosterDiff(joins, len(leaves), len(renames))
+
+    async def lookup_members(self, group_id: str, wxids: Iterable[str]) -> Dict[str, MemberRecord]:
+        wxids = list(dict.fromkeys(wxids))
+        if not wxids:
+            return {}
+        return await self._call(self._lookup_members, group_id, wxids)
+
+    def _lookup_members(self, group_id: str, wxids: List[str]) -> Dict[str, MemberRecord]:
+        result = {}
+        # SQLite 默认单条语句最多 999 个参数，分块查询
+        for i in range(0, len(wxids), 900):
+            chunk = wxids[i:i + 900]
+            placeholders = ",".join("?" * len(chunk))
+            for row in self._conn.execute(
+                    f"SELECT group_id, wxid, nickname, inviter, first_seen, joined_at, left_at FROM members "
+                    f"WHERE group_id = ? AND wxid IN ({placeholders})", (group_id, *chunk)):
+                result[row[1]] = MemberRecord(*row)
+        return result
+
+    async def joined_via(self, group_id: str, inviter: str, since: float) -> List[JoinEvent]:
+        """since 之后经由 inviter 邀请入群的成员（按入群时间倒序），附带其当前是否已退群。"""
+        return await self._call(self._joined_via, group_id, inviter, since)
+
+    def _joined_via(self, group_id: str, inviter: str, since: float) -> List[JoinEvent]:
+        rows = self._conn.execute(
+            "SELECT e.wxid, COALESCE(m.nickname, e.nickname), e.at, m.left_at FROM events e "
+            "LEFT JOIN members m ON m.group_id = e.group_id AND m.wxid = e.wxid "
+            "WHERE e.group_id = ? AND e.inviter = ? AND e.kind = 'join' AND e.at >= ? ORDER BY e.at DESC",
+            (group_id, inviter, since))
+        return [JoinEvent(*row) for row in rows]
+
+    async def former_invitees(self, group_id: str, inviter: str) -> List[MemberRecord]:
+        """由 inviter 邀请、现已退群的成员（按退群时间倒序），用于在其下级中补全已消失的部分。"""
+        return await self._call(self._former_invitees, group_id, inviter)
+
+    def _former_invitees(self, group_id: str, inviter: str) -> List[MemberRecord]:
+        rows = self._conn.execute(
+            "SELECT group_id, wxid, nickname, inviter, first_seen, joined_at, left_at FROM members "
+            "WHERE group_id = ? AND inviter = ? AND left_at IS NOT NULL ORDER BY left_at DESC",
+            (group_id, inviter))
+        return [MemberRecord(*row) for row in rows]
+
+    def stats(self) -> Dict[str, int]:
+        return {'recorded': self.recorded, 'skipped': self.skipped}
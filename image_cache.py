@@ -0,0 +1,174 @@
+# plugins/GroupInsight/image_cache.py
+
+import asyncio
+import logging
+import os
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_MEMORY_BYTES = 32 * 1024 * 1024
+DEFAULT_DISK_BYTES = 256 * 1024 * 1024
+CACHE_FILE_SUFFIX = '.img'
+
+
+class ImageCache:
+    """
+    按内容寻址的渲染结果缓存：键由调用方根据花名册指纹与渲染参数计算。
+    内存层为按字节数封顶的 LRU；可选的磁盘层同样按总字节数封顶，按最近使用时间淘汰，
+    磁盘读写放到线程中执行，不阻塞事件循环。
+    """
+
+    def __init__(self, max_memory_bytes: int = DEFAULT_MEMORY_BYTES, disk_dir: Optional[str] = None,
+                 max_disk_bytes: int = DEFAULT_DISK_BYTES, logger: Optional[logging.Logger] = None):
+        self.max_memory_bytes = max_memory_bytes
+        self.disk_dir = disk_dir or None
+        self.max_disk_bytes = max_disk_bytes
+        self.logger = logger or logging.getLogger("GroupInsightPlugin")
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_index: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_bytes = 0
+        self._disk_loaded = False
+        self._disk_lock = asyncio.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    async def get(self, key: str) -> Optional[bytes]:
+        data = await self._lookup(key)
+        if data is None:
+            self.misses += 1
+        return data
+
+    async def get_first(self, keys: List[str]) -> Tuple[Optional[str], Optional[bytes]]:
+        """按顺序查找多个候选 key（如同一张图的不同画质），返回第一个命中的 (key, 数据)；全部未命中只计一次 miss。"""
+        for key in keys:
+            data = await self._lookup(key)
+            if data is not None:
+                return key, data
+        self.misses += 1
+        return None, None
+
+    async def _lookup(self, key: str) -> Optional[bytes]:
+        data = self._memory.get(key)
+        if data is not None:
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+            return data
+
+        if self.disk_dir:
+            async with self._disk_lock:
+                await self._ensure_disk_index()
+                if key in self._disk_index:
+                    data = await asyncio.to_thread(self._read_file, key)
+                    if data is not None:
+                        self._disk_index.move_to_end(key)
+                        self.disk_hits += 1
+                        self._put_memory(key, data)
+                        return data
+                    self._drop_disk_entry(key)
+        return None
+
+    async def put(self, key: str, data: bytes):
+        if not data:
+            return
+        self._put_memory(key, data)
+        if not self.disk_dir:
+            return
+        async with self._disk_lock:
+            await self._ensure_disk_index()
+            try:
+                await asyncio.to_thread(self._write_file, key, data)
+            except OSError as e:
+                self.logger.error(f"写入图片磁盘缓存失败: {e}")
+                return
+            self._drop_disk_entry(key)
+            self._disk_index[key] = len(data)
+            self._disk_bytes += len(data)
+            while self._disk_bytes > self.max_disk_bytes and len(self._disk_index) > 1:
+                old_key, _ = next(iter(self._disk_index.items()))
+                self._drop_disk_entry(old_key)
+                await asyncio.to_thread(self._remove_file, old_key)
+                self.evictions += 1
+
+    def _put_memory(self, key: str, data: bytes):
+        if len(data) > self.max_memory_bytes:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= len(old)
+        self._memory[key] = data
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+            self.evictions += 1
+
+    def _drop_disk_entry(self, key: str):
+        size = self._disk_index.pop(key, None)
+        if size is not None:
+            self._disk_bytes -= size
+
+    async def _ensure_disk_index(self):
+        if self._disk_loaded:
+            return
+        self._disk_loaded = True
+        try:
+            entries = await asyncio.to_thread(self._scan_disk)
+        except OSError as e:
+            self.logger.error(f"读取图片磁盘缓存目录 {self.disk_dir} 失败，已禁用磁盘缓存: {e}")
+            self.disk_dir = None
+            return
+        for key, size in entries:
+            self._disk_index[key] = size
+            self._disk_bytes += size
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key + CACHE_FILE_SUFFIX)
+
+    def _scan_disk(self):
+        os.makedirs(self.disk_dir, exist_ok=True)
+        entries = []
+        with os.scandir(self.disk_dir) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.endswith(CACHE_FILE_SUFFIX):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, entry.name[:-len(CACHE_FILE_SUFFIX)], stat.st_size))
+        entries.sort()
+        return [(key, size) for _, key, size in entries]
+
+    def _read_file(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)  # 刷新 mtime，重启后按最近使用顺序重建索引
+            return data
+        except OSError:
+            return None
+
+    def _write_file(self, key: str, data: bytes):
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _remove_file(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'memory_entries': len(self._memory),
+            'memory_bytes': self._memory_bytes,
+            'disk_entries': len(self._disk_index),
+            'disk_bytes': self._disk_bytes,
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
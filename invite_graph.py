@@ -0,0 +1,190 @@
+# plugins/GroupInsight/invite_graph.py
+
+from array import array
+from typing import Dict, List, Optional
+
+from .roster import Roster
+
+
+class InviteGraph:
+    """
+    群邀请关系的预计算索引，每个花名册快照构建一次。
+
+    节点下标与 Roster 一致：[0, member_count) 为在群成员，其后为已退群的邀请人；
+    ids / names / index 直接引用花名册中的数组，不做拷贝。
+    - parent: 原始邀请人下标（-1 表示无）；tree_parent: 断开邀请环后的树父节点；
+    - depth / root / subtree_size: 在树中的深度、所属根、子树大小（含自身）；
+    - tin / tout: 欧拉序进入/离开时间，order[tin[v]:tout[v]] 恰为 v 的整棵子树。
+    环检测在构建时以线性时间完成；每个环中下标最小的节点被视为树根（其原始邀请边记为“循环”）。
+    树结构只用于遍历与绘制；按成员回答“下级有哪些”时（invitees / full_downline）环在被查询的成员处断开，
+    结果与花名册顺序无关。
+    """
+
+    __slots__ = ('roster', 'ids', 'index', 'names', 'member_count', 'parent', 'tree_parent', 'children',
+                 'depth', 'root', 'subtree_size', 'tin', 'tout', 'order', 'cycles', '_cycle_roots')
+
+    def __init__(self, roster: Roster):
+        n = len(roster.ids)
+        self.roster = roster
+        self.ids = roster.ids
+        self.index = roster.index
+        self.names = roster.names
+        self.member_count = roster.member_count
+        self.parent = parent = roster.inviter
+        self.cycles = self._find_cycles(parent)
+        self._cycle_roots = self._index_cycle_roots(self.cycles)
+
+        tree_parent = array('i', parent)
+        for cycle in self.cycles:
+            tree_parent[min(cycle)] = -1
+        self.tree_parent = tree_parent
+
+        children: List[List[int]] = [[] for _ in range(n)]
+        for v in range(n):
+            p = tree_parent[v]
+            if p >= 0:
+                children[p].append(v)
+        self.children = children
+
+        depth = array('i', [0]) * n
+        root = array('i', range(n))
+        tin = array('i', [0]) * n
+        order = array('i')
+        for r in range(n):
+            if tree_parent[r] != -1:
+                continue
+            stack = [r]
+            while stack:
+                v = stack.pop()
+                tin[v] = len(order)
+                order.append(v)
+                for c in reversed(children[v]):
+                    depth[c] = depth[v] + 1
+                    root[c] = root[v]
+                    stack.append(c)
+
+        subtree_size = array('i', [1]) * n
+        for v in reversed(order):
+            p = tree_parent[v]
+            if p >= 0:
+                subtree_size[p] += subtree_size[v]
+
+        self.depth = depth
+        self.root = root
+        self.tin = tin
+        self.tout = array('i', (tin[v] + subtree_size[v] for v in range(n)))
+        self.subtree_size = subtree_size
+        self.order = order
+
+    @classmethod
+    def from_arrays(cls, roster: Roster, arrays: Dict[str, array], cycles: List[List[int]]) -> 'InviteGraph':
+        """由此前构建好的索引数组（见 warm_start）直接恢复，跳过环检测与树遍历；children 按先序重建，顺序与构建时一致。"""
+        n = len(roster.ids)
+        if any(len(values) != n for values in arrays.values()):
+            raise ValueError("索引数组长度与花名册不一致")
+        graph = cls.__new__(cls)
+        graph.roster = roster
+        graph.ids = roster.ids
+        graph.index = roster.index
+        graph.names = roster.names
+        graph.member_count = roster.member_count
+        graph.parent = roster.inviter
+        graph.cycles = cycles
+        graph._cycle_roots = cls._index_cycle_roots(cycles)
+        for name, values in arrays.items():
+            setattr(graph, name, values)
+        children: List[List[int]] = [[] for _ in range(n)]
+        tree_parent = graph.tree_parent
+        for v in graph.order:
+            p = tree_parent[v]
+            if p >= 0:
+                children[p].append(v)
+        graph.children = children
+        return graph
+
+    @staticmethod
+    def _find_cycles(parent) -> List[List[int]]:
+        """每个节点至多一个父节点（函数图），沿父指针着色遍历即可线性找出所有环。"""
+        n = len(parent)
+        state = bytearray(n)  # 0=未访问, 1=在当前路径上, 2=已完成
+        cycles = []
+        for start in range(n):
+            if state[start]:
+                continue
+            path = []
+            v = start
+            while v != -1 and state[v] == 0:
+                state[v] = 1
+                path.append(v)
+                v = parent[v]
+            if v != -1 and state[v] == 1:
+                cycles.append(path[path.index(v):])
+            for u in path:
+                state[u] = 2
+        return cycles
+
+    @staticmethod
+    def _index_cycle_roots(cycles: List[List[int]]) -> Dict[int, int]:
+        """环上每个节点 -> 该环断开处的树根；树根所在的整棵树恰为环及挂在环上的全部节点。"""
+        roots = {}
+        for cycle in cycles:
+            r = min(cycle)
+            for v in cycle:
+                roots[v] = r
+        return roots
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, wxid: str) -> bool:
+        return wxid in self.index
+
+    def fingerprint(self) -> str:
+        return self.roster.fingerprint()
+
+    def is_member(self, v: int) -> bool:
+        return v < self.member_count
+
+    def has_member(self, wxid: str) -> bool:
+        return wxid in self.roster
+
+    def is_descendant(self, v: int, ancestor: int) -> bool:
+        """v 是否为 ancestor 的（严格）下级，O(1)。"""
+        return self.tin[ancestor] < self.tin[v] < self.tout[ancestor]
+
+    def downline(self, v: int) -> List[int]:
+        """v 的全部下级（不含自身），按先序排列，耗时与结果规模成正比。"""
+        return self.order[self.tin[v] + 1:self.tout[v]].tolist()
+
+    def invitees(self, v: int) -> List[int]:
+        """v 按原始邀请关系直接邀请的节点，包括因断开邀请环而不在 children[v] 中的环根。"""
+        r = self._cycle_roots.get(v)
+        if r is not None and r != v and self.parent[r] == v:
+            return [*self.children[v], r]
+        return self.children[v]
+
+    def full_downline(self, v: int) -> List[int]:
+        """
+        v 按原始邀请关系的全部下级（不含自身）。v 不在邀请环上时与 downline 相同；
+        v 在环上时环在 v 处断开，同一环上的其他成员及挂在环上的所有节点都是 v 的下级。
+        """
+        r = self._cycle_roots.get(v)
+        if r is None:
+            return self.downline(v)
+        return [u for u in self.order[self.tin[r]:self.tout[r]] if u != v]
+
+    def upstream(self, v: int) -> List[int]:
+        """v 的上级邀请链，从顶级邀请人到直接邀请人，耗时与链长成正比。"""
+        chain = []
+        p = self.tree_parent[v]
+        while p != -1:
+            chain.append(p)
+            p = self.tree_parent[p]
+        chain.reverse()
+        return chain
+
+    def cycle_entry(self, v: int) -> Optional[int]:
+        """若 v 所在树的根是从邀请环上断开的，返回该根的原始邀请人下标，否则返回 None。"""
+        r = self.root[v]
+        p = self.parent[r]
+        return p if p != -1 else None
@@ -0,0 +1,203 @@
+# plugins/GroupInsight/kick_engine.py
+
+import asyncio
+import logging
+import random
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+DEFAULT_BATCH_SIZE = 20       # 单次 SendDelDelChatRoomMember 携带的成员数
+DEFAULT_CONCURRENCY = 2       # 同时在途的踢人请求数
+DEFAULT_RATE_PER_MINUTE = 30  # 每分钟最多发起的踢人请求数（含重试）
+DEFAULT_MAX_RETRIES = 3
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 30.0
+
+# _send_with_retry 的结果
+SENT = 'sent'
+REJECTED = 'rejected'        # 接口明确拒绝了该批次（业务错误），拆分后可定位到具体成员
+FAILED = 'failed'            # 重试耗尽后仍是网络错误，请求未到达接口，拆分无助于定位
+UNCONFIRMED = 'unconfirmed'  # 重试耗尽且有请求超时：接口可能已经执行，无法确认是否已移出
+UNAVAILABLE = 'unavailable'  # 接口已熔断，继续发送只会被直接拒绝，整个任务中止
+
+
+class KickTransportError(Exception):
+    """发送回调在请求未得到接口业务答复时抛出（网络错误等），按退避重试；message 为展示给用户的原因。"""
+
+
+class KickTimeout(KickTransportError):
+    """请求超时：接口可能已经执行了该批次。"""
+
+
+class KickUnavailable(KickTransportError):
+    """接口已熔断，请求未发出即被拒绝；不再重试，中止整个任务。"""
+
+
+# 发送单个批次的回调：返回 (是否成功, 失败原因)；未得到业务答复时抛出 KickTransportError 及其子类
+KickSender = Callable[[List[str]], Awaitable[Tuple[bool, str]]]
+ProgressCallback = Callable[['KickReport'], Awaitable[None]]
+
+
+class KickReport:
+    """
+    一次批量踢人的结果：removed 为确认已移出的成员，failed 为 {wxid: 最后一次失败原因}，skipped 为 {wxid: 跳过原因}，
+    unconfirmed 为 {wxid: 原因}（请求超时，可能已被移出）；aborted 为接口熔断导致任务中止时的原因，
+    此时尚未尝试的成员记入 not_attempted。
+    """
+
+    __slots__ = ('total', 'removed', 'failed', 'skipped', 'unconfirmed', 'not_attempted', 'requests', 'retries',
+                 'aborted', 'started_at', 'finished_at')
+
+    def __init__(self, total: int):
+        self.total = total
+        self.removed: List[str] = []
+        self.failed: Dict[str, str] = {}
+        self.skipped: Dict[str, str] = {}
+        self.unconfirmed: Dict[str, str] = {}
+        self.not_attempted: List[str] = []
+        self.requests = 0
+        self.retries = 0
+        self.aborted: Optional[str] = None
+        self.started_at = time.monotonic()
+        self.finished_at: Optional[float] = None
+
+    @property
+    def processed(self) -> int:
+        return (len(self.removed) + len(self.failed) + len(self.skipped) + len(self.unconfirmed)
+                + len(self.not_attempted))
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+
+class _RateLimiter:
+    """按固定间隔发放请求许可；多个协程排队领取，保证整体速率不超过 rate_per_minute。"""
+
+    def __init__(self, rate_per_minute: float):
+        self.interval = 60.0 / rate_per_minute if rate_per_minute > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class KickEngine:
+    """
+    批量踢人引擎：把待踢列表切成 API 大小的批次，以有限并发和全局速率上限发送。
+    被接口拒绝的批次按指数退避重试；重试耗尽后若批次多于一人则对半拆分（子批次不再重试），
+    从而精确定位是哪些成员无法移出，而不会因为个别成员导致整批失败。
+    网络错误与超时同样按退避重试（次数不随拆分减少），但不拆分：重试耗尽后超时的批次记为“未确认”，
+    其余记为失败。接口熔断时立即中止，尚未尝试的成员记为“未尝试”。
+    """
+
+    def __init__(self, sender: KickSender, batch_size: int = DEFAULT_BATCH_SIZE,
+                 concurrency: int = DEFAULT_CONCURRENCY, rate_per_minute: float = DEFAULT_RATE_PER_MINUTE,
+                 max_retries: int = DEFAULT_MAX_RETRIES, logger: Optional[logging.Logger] = None):
+        self.sender = sender
+        self.batch_size = max(1, batch_size)
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max(0, max_retries)
+        self.logger = logger or logging.getLogger("GroupInsightPlugin")
+        self._limiter = _RateLimiter(rate_per_minute)
+
+    async def run(self, member_ids: List[str], skipped: Optional[Dict[str, str]] = None,
+                  on_progress: Optional[ProgressCallback] = None) -> KickReport:
+        report = KickReport(len(member_ids) + len(skipped or {}))
+        report.skipped.update(skipped or {})
+
+        # 队列元素为 (批次, 允许的重试次数)；拆分出的子批次不再重试，失败即继续对半拆分
+        queue: "asyncio.Queue[Tuple[List[str], int]]" = asyncio.Queue()
+        for i in range(0, len(member_ids), self.batch_size):
+            queue.put_nowait((member_ids[i:i + self.batch_size], self.max_retries))
+
+        async def worker():
+            while True:
+                try:
+                    batch, retries = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                if report.aborted is not None:
+                    report.not_attempted.extend(batch)
+                    continue
+                outcome, reason = await self._send_with_retry(batch, retries, report)
+                if outcome == SENT:
+                    report.removed.extend(batch)
+                elif outcome == UNAVAILABLE:
+                    if report.aborted is None:
+                        report.aborted = reason
+                        self.logger.warning(f"踢人接口不可用，中止剩余批次: {reason}")
+                    report.not_attempted.extend(batch)
+                elif outcome == UNCONFIRMED:
+                    report.unconfirmed.update(dict.fromkeys(batch, reason))
+                elif outcome == FAILED:
+                    report.failed.update(dict.fromkeys(batch, reason))
+                elif len(batch) > 1:
+                    mid = len(batch) // 2
+                    self.logger.warning(f"踢人批次（{len(batch)} 人）失败，拆分后继续尝试: {reason}")
+                    queue.put_nowait((batch[:mid], 0))
+                    queue.put_nowait((batch[mid:], 0))
+                    continue
+                else:
+                    report.failed[batch[0]] = reason
+                if on_progress is not None:
+                    try:
+                        await on_progress(report)
+                    except Exception as e:
+                        self.logger.error(f"发送踢人进度时出错: {e}")
+
+        # 拆分出的子批次会重新入队，worker 退出前队列可能再次变为非空，因此循环直到队列耗尽
+        while not queue.empty():
+            await asyncio.gather(*(worker() for _ in range(min(self.concurrency, queue.qsize()))))
+        report.finished_at = time.monotonic()
+        self.logger.info(f"批量踢人完成：成功 {len(report.removed)}，失败 {len(report.failed)}，未确认 {len(report.unconfirmed)}，"
+                         f"跳过 {len(report.skipped)}，未尝试 {len(report.not_attempted)}，"
+                         f"请求 {report.requests} 次（重试 {report.retries} 次），耗时 {report.elapsed:.1f}s")
+        return report
+
+    async def _send_with_retry(self, batch: List[str], retries: int, report: KickReport) -> Tuple[str, str]:
+        """
+        返回 (SENT / REJECTED / FAILED / UNCONFIRMED / UNAVAILABLE, 原因)。
+        接口拒绝最多重试 retries 次；网络错误与超时最多重试 max_retries 次（拆分出的子批次同样适用）。
+        """
+        reason = ""
+        rejections = transport_errors = 0
+        timed_out = False
+        attempt = 0
+        while True:
+            if attempt:
+                report.retries += 1
+                delay = min(BACKOFF_MAX, BACKOFF_BASE * (2 ** (attempt - 1)))
+                await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+            attempt += 1
+            await self._limiter.acquire()
+            report.requests += 1
+            try:
+                ok, reason = await self.sender(batch)
+            except KickUnavailable as e:
+                return UNAVAILABLE, str(e) or "接口不可用"
+            except Exception as e:
+                # 未得到业务答复：网络错误或超时（超时的请求可能已被执行），未知异常同样按网络错误处理
+                if not isinstance(e, KickTransportError):
+                    self.logger.error(f"发送踢人批次时出错: {e}")
+                timed_out = timed_out or isinstance(e, KickTimeout)
+                reason = str(e) or type(e).__name__
+                self.logger.warning(f"踢人批次（{len(batch)} 人）第 {attempt} 次尝试未得到答复: {reason}")
+                transport_errors += 1
+                if transport_errors > self.max_retries:
+                    return (UNCONFIRMED if timed_out else FAILED), reason
+                continue
+            if ok:
+                return SENT, reason
+            self.logger.warning(f"踢人批次（{len(batch)} 人）第 {attempt} 次尝试失败: {reason}")
+            rejections += 1
+            if rejections > retries:
+                return REJECTED, reason
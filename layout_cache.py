@@ -0,0 +1,160 @@
+# plugins/GroupInsight/layout_cache.py
+
+import re
+from collections import OrderedDict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+POINTS_PER_INCH = 72.0
+LAYOUT_REUSE_MIN_NODES = 100   # 节点数少于此值时完整布局本身就很快，不缓存布局
+MAX_CHANGE_RATIO = 0.1         # 自上次完整布局以来累计新增 + 移除的节点超过此比例时重新完整布局
+MAX_CHANGE_NODES = 60          # 同上，累计变化节点数的绝对上限
+MAX_ENTRIES = 64               # 最多保留多少张图（群 × 分页）的布局
+NODE_GAP = 18.0                # 新节点与已有节点之间的最小间隙（点）
+MAX_SLIDE_STEPS = 40           # 为新节点寻找空位时，沿垂直方向最多尝试的偏移次数
+DEFAULT_EDGE_LENGTH = 100.0    # 已有布局中没有可参考的边时，新节点与邀请人的距离（点）
+
+# plain 输出中的节点行：node <名称> <x> <y> <宽> <高> ...，名称含特殊字符时带双引号
+_PLAIN_NODE = re.compile(r'^node ("(?:[^"\\]|\\.)*"|\S+) (\S+) (\S+) (\S+) (\S+)')
+
+
+class NodeBox(NamedTuple):
+    """节点的中心坐标与尺寸，单位均为点（neato -n 要求 pos 以点为单位）。"""
+    x: float
+    y: float
+    width: float
+    height: float
+
+    def overlaps(self, other: 'NodeBox', gap: float = NODE_GAP) -> bool:
+        return (abs(self.x - other.x) < (self.width + other.width) / 2 + gap and
+                abs(self.y - other.y) < (self.height + other.height) / 2 + gap)
+
+
+def parse_plain(data: bytes) -> Dict[str, NodeBox]:
+    """解析 Graphviz `-Tplain` 输出中的节点位置（英寸）并换算为点。"""
+    nodes = {}
+    for line in data.decode('utf-8', 'replace').splitlines():
+        match = _PLAIN_NODE.match(line)
+        if match is None:
+            continue
+        name, x, y, width, height = match.groups()
+        if name.startswith('"'):
+            name = re.sub(r'\\(.)', r'\1', name[1:-1])
+        nodes[name] = NodeBox(float(x) * POINTS_PER_INCH, float(y) * POINTS_PER_INCH,
+                              float(width) * POINTS_PER_INCH, float(height) * POINTS_PER_INCH)
+    return nodes
+
+
+def _median(values: List[float], default: float) -> float:
+    if not values:
+        return default
+    ordered = sorted(values)
+    return ordered[len(ordered) // 2]
+
+
+def place_new_nodes(positioned: Dict[str, NodeBox], new_nodes: Iterable[str],
+                    parent_of: Dict[str, Optional[str]]) -> Dict[str, NodeBox]:
+    """
+    在已有布局中为新节点找位置，已有节点一律不动。新节点放在邀请人“向外”一条典型边长处
+    （方向取邀请人相对其上级的方向，层次布局中即向下，放射布局中即向外），与已有节点重叠时沿垂直方向左右交替滑动。
+    邀请人也是新节点时先放邀请人；没有可定位邀请人的节点排在整张图下方的一行。返回包含新旧节点的完整布局。
+    """
+    placed = dict(positioned)
+    if not placed:
+        return placed
+    edge_lengths = [((b.x - placed[p].x) ** 2 + (b.y - placed[p].y) ** 2) ** 0.5
+                    for n, b in placed.items() if (p := parent_of.get(n)) in placed]
+    step = _median(edge_lengths, DEFAULT_EDGE_LENGTH)
+    width = _median([b.width for b in placed.values()], DEFAULT_EDGE_LENGTH)
+    height = _median([b.height for b in placed.values()], DEFAULT_EDGE_LENGTH / 2)
+    center_x = sum(b.x for b in placed.values()) / len(placed)
+    center_y = sum(b.y for b in placed.values()) / len(placed)
+    orphan_x = min(b.x for b in placed.values())
+    orphan_y = min(b.y for b in placed.values()) - step
+
+    pending = [n for n in new_nodes if n not in placed]
+    while pending:
+        # 邀请人尚未放置的节点推迟到下一轮；一轮内没有任何进展时剩余节点按无邀请人处理
+        ready = [n for n in pending if parent_of.get(n) in placed or parent_of.get(n) not in pending]
+        if not ready:
+            ready = pending
+        for name in ready:
+            anchor = placed.get(parent_of.get(name))
+            if anchor is not None:
+                origin = placed.get(parent_of.get(parent_of.get(name)))
+                dx, dy = (anchor.x - origin.x, anchor.y - origin.y) if origin else (anchor.x - center_x, anchor.y - center_y)
+                norm = (dx * dx + dy * dy) ** 0.5
+                dx, dy = (dx / norm, dy / norm) if norm > 1e-6 else (0.0, -1.0)
+                base_x, base_y = anchor.x + dx * step, anchor.y + dy * step
+                slide_x, slide_y = -dy * (width + NODE_GAP), dx * (width + NODE_GAP)
+            else:
+                base_x, base_y = orphan_x, orphan_y
+                slide_x, slide_y = width + NODE_GAP, 0.0
+            box = NodeBox(base_x, base_y, width, height)
+            for i in range(1, MAX_SLIDE_STEPS + 1):
+                if not any(box.overlaps(other) for other in placed.values()):
+                    break
+                # 0, +1, -1, +2, -2 ... 倍的滑动距离
+                k = (i + 1) // 2 * (1 if i % 2 else -1)
+                box = NodeBox(base_x + slide_x * k, base_y + slide_y * k, width, height)
+            placed[name] = box
+            if anchor is None:
+                orphan_x = box.x + width + NODE_GAP
+        pending = [n for n in pending if n not in placed]
+    return placed
+
+
+class _LayoutEntry:
+    __slots__ = ('profile', 'nodes', 'base_count', 'changed')
+
+    def __init__(self, profile: str, nodes: Dict[str, NodeBox]):
+        self.profile = profile
+        self.nodes = nodes
+        self.base_count = len(nodes)
+        self.changed = 0
+
+
+class LayoutCache:
+    """
+    按图（群 × 分页）保存最近一次的节点布局。花名册只有少量变化时沿用已有节点的位置、只为新节点找位置，
+    之后交给 `neato -n2` 按给定坐标绘制，跳过整张图的布局计算，图片在两次查询之间也保持稳定。
+    增量累计超过阈值、或渲染档位（引擎与图属性）改变时返回 None，由调用方重新完整布局。
+    """
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, max_change_ratio: float = MAX_CHANGE_RATIO,
+                 max_change_nodes: int = MAX_CHANGE_NODES):
+        self.max_entries = max_entries
+        self.max_change_ratio = max_change_ratio
+        self.max_change_nodes = max_change_nodes
+        self._entries: "OrderedDict[Tuple, _LayoutEntry]" = OrderedDict()
+        self.reused = 0
+        self.relayouts = 0
+
+    def lookup(self, key: Tuple, profile: str, node_ids: List[str],
+               parent_of: Dict[str, Optional[str]]) -> Optional[Dict[str, NodeBox]]:
+        entry = self._entries.get(key)
+        if entry is None or entry.profile != profile:
+            return None
+        current = set(node_ids)
+        added = [n for n in node_ids if n not in entry.nodes]
+        removed = sum(1 for n in entry.nodes if n not in current)
+        changed = entry.changed + len(added) + removed
+        if changed > min(self.max_change_nodes, entry.base_count * self.max_change_ratio):
+            self.relayouts += 1
+            return None
+        nodes = {n: box for n, box in entry.nodes.items() if n in current}
+        if added:
+            nodes = place_new_nodes(nodes, added, parent_of)
+        entry.nodes = nodes
+        entry.changed = changed
+        self._entries.move_to_end(key)
+        self.reused += 1
+        return nodes
+
+    def store(self, key: Tuple, profile: str, nodes: Dict[str, NodeBox]):
+        self._entries[key] = _LayoutEntry(profile, nodes)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        return {'entries': len(self._entries), 'reused': self.reused, 'relayouts': self.relayouts}
@@ -2,21 +2,43 @@
 
 import asyncio
 import base64
-import os
-import requests
+import functools
 import logging
 import time
-import html
-import re
+import itertools
+import threading
 import traceback
-from collections import defaultdict, deque
-from typing import Dict, Any, Optional, List, Tuple
+from collections import OrderedDict
+from typing import Dict, Any, Optional, List, Tuple, Iterable, Iterator
 from datetime import datetime, timezone, timedelta
 
 from pkg.plugin.context import BasePlugin, APIHost, EventContext
 from pkg.plugin.events import GroupNormalMessageReceived, GroupMessageReceived
 from pkg.platform.types import MessageChain, Plain, Image
 
+from .analytics import GroupStats, compute_group_stats, np as analytics_numpy
+from .api_client import WeChatPadCircuitOpen, WeChatPadClient, WeChatPadTimeout
+from .cache import GroupInfoCache
+from .command_router import (GROUP_ID_REGEX, CommandRouter, Route, exact_grammar, group_target_grammar,
+                             member_argument, member_grammar, member_target_grammar)
+from .cross_group import CrossGroupIndex, CrossGroupReport
+from .history import MemberRecord, RosterHistory
+from .invite_graph import InviteGraph
+from .graph_render import (MAX_NODES_LARGE_GRAPH, STAR_GRAPH_THRESHOLD_ABSOLUTE, STAR_GRAPH_THRESHOLD_RATIO, RenderPlan,
+                           build_invite_digraph, plan_edge_count, plan_render, plan_topology, render_cache_key, render_ladder)
+from .kick_engine import KickEngine, KickReport, KickTimeout, KickTransportError, KickUnavailable
+from .member_search import EXACT, MAX_HITS, MemberSearchIndex, SearchHit, search_groups
+from .layout_cache import LAYOUT_REUSE_MIN_NODES, LayoutCache, NodeBox, parse_plain
+from .metrics import Metrics, MetricsExporter
+from .prefetch import PrefetchWarmer
+from .roster import Roster, clean_display_name
+from .roster_events import JOIN, NOTICE_HINT, SELF, MemberRef, RosterEvent, parse_roster_event
+from .image_cache import ImageCache
+from .render_budget import DEFAULT_BUDGET, RenderBudgetExceeded, RenderCostModel, RenderDeadline, RenderProfile
+from .render_scheduler import RenderScheduler, RenderQueueFull, RenderTimeout
+from .snapshot import GroupSnapshot
+from .warm_start import WarmStartStore
+
 try:
     import graphviz
 except ImportError:
@@ -27,40 +49,42 @@ TRIGGER_KEYWORD_NETWORK = "#查关系网"
 TRIGGER_KEYWORD_KICK_MEMBER = "#踢人"
 TRIGGER_KEYWORD_KICK_DOWNLINE = "#踢关系网"
 TRIGGER_KEYWORD_HELP = "#帮助"
-
-IMAGE_FORMAT = 'png'
-# 【重构】默认的 dot 引擎参数，使用 ortho 优化线条
-GRAPH_ATTR_DOT = {
-    'rankdir': 'TB',
-    'dpi': '150',
-    'nodesep': '0.6',
-    'ranksep': '1.2',
-    'pad': '1.0,1.0',
-    'splines': 'ortho',  # 使用直角线，更整洁
-    'concentrate': 'false',
-}
-# 【重构】为 twopi 引擎定制的参数，解决高密度问题
-GRAPH_ATTR_TWOPI = {
-    'dpi': '150',
-    'pad': '1.5,1.5', # 更大的边距
-    'splines': 'spline',
-    'overlap': 'false', # 禁止节点重叠
-    'sep': '+25,25', # 强制增加节点间距
-}
-NODE_ATTR = {
-    'style': 'filled',
-    'shape': 'box',
-    'fontname': 'WenQuanYi Zen Hei',
-    'fontsize': '12',
-    'fixedsize': 'false',
-    'margin': '0.25,0.15',
-}
-EDGE_ATTR = {'arrowsize': '0.7'}
-MAX_NODES_TO_RENDER = 500
+TRIGGER_KEYWORD_PAGED = "#分页邀请关系"
+TRIGGER_KEYWORD_STATS = "#插件统计"
+TRIGGER_KEYWORD_CROSS_NETWORK = "#跨群关系网"
+TRIGGER_KEYWORD_GROUP_STATS = "#群统计"
+TRIGGER_KEYWORD_JOIN_HISTORY = "#邀请记录"
+LAYOUT_FORMAT = 'plain' # 只输出节点坐标的布局格式，用于缓存布局
+PINNED_RENDER_ENGINE = 'neato'
+PINNED_RENDER_ARGS = ('-n2',) # 按 pos 给定的坐标绘制，不再计算布局
+LAYOUT_PASS_TIMEOUT_SHARE = 0.8 # 先输出布局再按坐标绘制时，布局一步可用的时限占比，余下的留给绘制
+PAGED_MAX_PAGES = 10 # 分页模式单次最多发送的图片数
+IMAGE_CACHE_MEMORY_BYTES = 32 * 1024 * 1024 # 渲染结果内存缓存上限
+IMAGE_CACHE_DISK_MB = 256 # 渲染结果磁盘缓存上限（仅在配置了缓存目录时启用）
 RENDER_TIMEOUT = 90 # 适当延长超时以应对复杂图
+RENDER_WORKERS = 2 # 同时运行的 Graphviz 进程数
+RENDER_QUEUE_SIZE = 8 # 渲染队列上限，超出时直接拒绝新任务
 CACHE_DURATION = 60
-STAR_GRAPH_THRESHOLD_RATIO = 0.3
-STAR_GRAPH_THRESHOLD_ABSOLUTE = 15
+CACHE_STALE_DURATION = 600 # 过期后仍可先返回旧快照并后台刷新的时长
+CACHE_MAX_GROUPS = 200
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+CHATROOM_BATCH_SIZE = 20 # 单次 GetChatRoomInfo 请求携带的群ID上限，超出时分块并发请求
+KICK_BATCH_SIZE = 20 # 单次踢人请求携带的成员数
+KICK_CONCURRENCY = 2 # 同时在途的踢人请求数
+KICK_RATE_PER_MINUTE = 30 # 每分钟最多发起的踢人请求数（含重试）
+KICK_MAX_RETRIES = 3
+KICK_PROGRESS_INTERVAL = 10 # 批量踢人时两次进度通知的最小间隔（秒）
+METRICS_EXPORT_INTERVAL = 30 # 指标文件的写入间隔（秒）
+PREFETCH_INTERVAL = 45 # 后台预取的周期（秒），应小于 CACHE_DURATION
+PREFETCH_RECENT_WINDOW = 3600 # 最近这段时间内被查询过的群也会被后台预取（秒）
+HISTORY_DEFAULT_DAYS = 7 # #邀请记录 未指定天数时查询的时间范围
+MESSAGE_CHUNK_CHARS = 1500 # 单条文字消息的字符上限，较长的结果按行拆分为多条依次发送
+MESSAGE_MAX_CHUNKS = 10 # 单次结果最多发送的分段消息数，超出部分只给出省略的行数
+RENDER_SUMMARY_DELAY = 0.3 # 渲染在这段时间内未完成（未命中缓存）时先发送文字摘要（秒）
+TEXT_TREE_MAX_INDENT = 12 # 文字版邀请树的最大缩进层数，更深的层级以 [层数] 标注
+WARM_START_SAVE_INTERVAL = 300 # 群快照预热文件的定期保存间隔（秒），卸载插件时另外保存一次
+ROSTER_RECONCILE_INTERVAL = 600 # 由入群 / 退群通知保持最新的花名册，距上次完整拉取超过此时长（秒）后仍重新拉取核对
+ROSTER_EVENT_REFRESH_DELAY = 5 # 无法直接应用的通知合并到这段时间后统一刷新（秒）
 
 class GroupInsightPlugin(BasePlugin):
     
@@ -69,20 +93,149 @@ class GroupInsightPlugin(BasePlugin):
         self.logger = logging.getLogger("GroupInsightPlugin")
         self.API_BASE_URL = None
         self.API_KEY = None
-        self.ADMIN_USER_IDS = []
-        self.group_info_cache = {}
+        self.ADMIN_USER_IDS: frozenset = frozenset()
+        self.command_router = self._build_command_router()
+        self.group_info_cache = GroupInfoCache(ttl=CACHE_DURATION, stale_ttl=CACHE_STALE_DURATION,
+                                               max_entries=CACHE_MAX_GROUPS, max_bytes=CACHE_MAX_BYTES,
+                                               size_fn=GroupSnapshot.estimated_size, logger=self.logger)
+        self.api_client: Optional[WeChatPadClient] = None
+        self.render_scheduler: Optional[RenderScheduler] = None
+        self.image_cache = ImageCache(max_memory_bytes=IMAGE_CACHE_MEMORY_BYTES, logger=self.logger)
+        self.render_budget = DEFAULT_BUDGET
+        self.render_cost_model = RenderCostModel()
+        self.layout_cache: Optional[LayoutCache] = LayoutCache()
+        self.metrics = Metrics()
+        self.metrics_exporter: Optional[MetricsExporter] = None
+        self._executor_pending = 0 # 已提交到线程池但尚未开始执行的任务数
+        self._executor_running = 0
+        self._executor_lock = threading.Lock()
+        self.prefetch_warmer: Optional[PrefetchWarmer] = None
+        self._recent_groups: "OrderedDict[str, float]" = OrderedDict() # 群ID -> 最近一次被指令查询的时间
+        self._cross_group_index: Optional[Tuple[tuple, CrossGroupIndex]] = None # (参与合并的各群快照, 合并索引)
+        self.history: Optional[RosterHistory] = None
+        self._history_tasks: set = set() # 尚未完成的花名册历史写入任务
+        self.warm_start: Optional[WarmStartStore] = None
+        self._warm_start_task: Optional[asyncio.Task] = None
+        self._warm_start_saved: tuple = () # 上次保存时各群快照的 (群ID, 拉取时间)，未变化时跳过保存
+        self.roster_events_enabled = True
+        self.roster_reconcile_interval = ROSTER_RECONCILE_INTERVAL
+        self.roster_event_senders: frozenset = frozenset() # 除空发送者与群本身外，被视为系统通知发送者的ID
+        self._roster_event_lock = asyncio.Lock() # 同一时间只应用一条通知，避免两条通知基于同一个旧快照互相覆盖
+        self._event_refresh_groups: set = set() # 等待合并刷新的群ID
+        self._event_refresh_task: Optional[asyncio.Task] = None
         if graphviz is None:
             self.logger.warning("[GroupInsight] 'graphviz' 库或其系统依赖未找到。")
+        if analytics_numpy is None:
+            self.logger.warning("[GroupInsight] 'numpy' 未安装，#群统计 将使用较慢的纯 Python 实现，请按 requirements.txt 安装依赖。")
 
     # ... (initialize, _manual_register_handlers, _normalize_group_id, _clean_whitespace_and_special_chars 函数保持不变) ...
     async def initialize(self):
         self.logger.info("GroupInsight 插件正在进行异步初始化...")
         self.API_BASE_URL = self.config.get('api_base_url', '').strip()
         self.API_KEY = self.config.get('api_key', '').strip()
-        self.ADMIN_USER_IDS = self.config.get('admin_user_ids', [])
+        self.ADMIN_USER_IDS = frozenset(self.config.get('admin_user_ids', []))
+        self.group_info_cache = GroupInfoCache(
+            ttl=self.config.get('cache_ttl', CACHE_DURATION),
+            stale_ttl=self.config.get('cache_stale_ttl', CACHE_STALE_DURATION),
+            max_entries=self.config.get('cache_max_groups', CACHE_MAX_GROUPS),
+            max_bytes=CACHE_MAX_BYTES,
+            size_fn=GroupSnapshot.estimated_size,
+            logger=self.logger,
+        )
+        self.render_scheduler = RenderScheduler(
+            workers=self.config.get('render_workers', RENDER_WORKERS),
+            max_queue=self.config.get('render_queue_size', RENDER_QUEUE_SIZE),
+            timeout=RENDER_TIMEOUT,
+            logger=self.logger,
+        )
+        self.render_scheduler.start()
+        self.render_budget = self.config.get('render_budget', DEFAULT_BUDGET)
+        self.layout_cache = LayoutCache() if self.config.get('layout_reuse', True) else None
+        self.roster_events_enabled = bool(self.config.get('roster_events', True))
+        self.roster_reconcile_interval = self.config.get('roster_reconcile_interval', ROSTER_RECONCILE_INTERVAL)
+        self.roster_event_senders = frozenset(str(x) for x in self.config.get('roster_event_senders', []))
+        self.image_cache = ImageCache(
+            max_memory_bytes=IMAGE_CACHE_MEMORY_BYTES,
+            disk_dir=(self.config.get('image_cache_dir') or '').strip() or None,
+            max_disk_bytes=self.config.get('image_cache_disk_mb', IMAGE_CACHE_DISK_MB) * 1024 * 1024,
+            logger=self.logger,
+        )
+        if self.API_BASE_URL and self.API_KEY:
+            self.api_client = WeChatPadClient(self.API_BASE_URL, self.API_KEY, logger=self.logger, metrics=self.metrics)
+            await self.api_client.start()
+        self.metrics.register_collector(self._collect_runtime_metrics)
+        self.metrics_exporter = MetricsExporter(
+            self.metrics,
+            file_path=(self.config.get('metrics_file') or '').strip() or None,
+            port=self.config.get('metrics_port') or None,
+            interval=METRICS_EXPORT_INTERVAL,
+            logger=self.logger,
+        )
+        await self.metrics_exporter.start()
+        history_path = (self.config.get('history_db_path') or '').strip()
+        if history_path:
+            history = RosterHistory(history_path, logger=self.logger)
+            try:
+                await history.open()
+                self.history = history
+                self.logger.info(f"花名册历史记录已启用: {history_path}")
+            except Exception as e:
+                self.logger.error(f"打开花名册历史数据库 {history_path} 失败，历史记录功能已禁用: {e}")
+                await history.close()
+        if self.config.get('prefetch_enabled', False) and self.api_client is not None:
+            self.prefetch_warmer = PrefetchWarmer(
+                self._prefetch_targets, self._prefetch_refresh,
+                interval=self.config.get('prefetch_interval', PREFETCH_INTERVAL),
+                batch_size=CHATROOM_BATCH_SIZE,
+                logger=self.logger,
+            )
+            self.prefetch_warmer.start()
+            self.logger.info("后台预取已启动。")
+        warm_start_path = (self.config.get('warm_start_path') or '').strip()
+        if warm_start_path:
+            # 【新增】此处不读取文件，群第一次被查询时才从文件恢复（见 _restore_warm_snapshots）
+            self.warm_start = WarmStartStore(warm_start_path, logger=self.logger)
+            self._warm_start_task = asyncio.ensure_future(self._warm_start_loop())
+            self.logger.info(f"群快照预热已启用: {warm_start_path}")
         self._manual_register_handlers()
         self.logger.info("GroupInsight 插件初始化完成。")
 
+    async def destroy(self):
+        if self.prefetch_warmer is not None:
+            await self.prefetch_warmer.close()
+            self.logger.info(f"后台预取统计: {self.prefetch_warmer.stats()}")
+            self.prefetch_warmer = None
+        if self.metrics_exporter is not None:
+            await self.metrics_exporter.close()
+            self.metrics_exporter = None
+        if self.warm_start is not None:
+            self._warm_start_task.cancel()
+            await asyncio.gather(self._warm_start_task, return_exceptions=True)
+            await self._save_warm_start()
+            self.logger.info(f"群快照预热统计: {self.warm_start.stats()}")
+            await self.warm_start.close()
+            self.warm_start = None
+        if self._event_refresh_task is not None:
+            self._event_refresh_task.cancel()
+            await asyncio.gather(self._event_refresh_task, return_exceptions=True)
+            self._event_refresh_task = None
+        await self.group_info_cache.close()
+        self.logger.info(f"群信息缓存统计: {self.group_info_cache.stats()}")
+        if self.history is not None:
+            await asyncio.gather(*self._history_tasks, return_exceptions=True)
+            self.logger.info(f"花名册历史统计: {self.history.stats()}")
+            await self.history.close()
+            self.history = None
+        if self.render_scheduler is not None:
+            self.logger.info(f"渲染调度统计: {self.render_scheduler.stats()}")
+            self.logger.info(f"渲染结果缓存统计: {self.image_cache.stats()}")
+            await self.render_scheduler.close()
+            self.render_scheduler = None
+        if self.api_client is not None:
+            await self.api_client.close()
+            self.api_client = None
+        self.logger.info("GroupInsight 插件已卸载，API 连接池已关闭。")
+
     def _manual_register_handlers(self):
         container = self.ap.plugin_mgr.get_plugin(author='junhong', plugin_name='groupinsight')
         if container:
@@ -96,12 +249,51 @@ class GroupInsightPlugin(BasePlugin):
         return group_id
 
     def _clean_whitespace_and_special_chars(self, text: str) -> str:
-        if not isinstance(text, str): 
-            return ""
-        text = re.sub(r'[\u200B-\u200F\u202F\u205F\uFEFF\u00A0\u00AD\u2800]', '', text)
-        return text.strip()
+        return clean_display_name(text)
     
-    # ... (group_message_handler 和所有 _handle_... 函数保持不变) ...
+    # 【重构】指令路由：触发词与每条指令的语法在插件加载时编译一次，按表分发
+    def _build_command_router(self) -> CommandRouter:
+        def targets(match, current_group_id: str) -> Tuple[str, str]:
+            """语法中未给出的源群 / 目标群均默认为指令所在群。"""
+            groups = match.groupdict()
+            return (self._normalize_group_id(groups.get('fetch_id') or current_group_id),
+                    self._normalize_group_id(groups.get('send_id') or current_group_id))
+
+        return CommandRouter((
+            Route(TRIGGER_KEYWORD_HELP, 'help', exact_grammar(TRIGGER_KEYWORD_HELP),
+                  lambda ctx, m, sender_id, group_id: self._handle_help_command(ctx, group_id), None),
+            Route(TRIGGER_KEYWORD_STATS, 'stats', exact_grammar(TRIGGER_KEYWORD_STATS),
+                  lambda ctx, m, sender_id, group_id: self._handle_stats_command(ctx, sender_id, group_id), None),
+            Route(TRIGGER_KEYWORD, 'invite_tree', group_target_grammar(TRIGGER_KEYWORD),
+                  lambda ctx, m, sender_id, group_id: self._handle_invite_tree_command(ctx, *targets(m, group_id)),
+                  "指令格式错误"),
+            Route(TRIGGER_KEYWORD_PAGED, 'paged_invite_tree', group_target_grammar(TRIGGER_KEYWORD_PAGED),
+                  lambda ctx, m, sender_id, group_id: self._handle_paged_invite_tree_command(ctx, *targets(m, group_id)),
+                  "指令格式错误"),
+            Route(TRIGGER_KEYWORD_GROUP_STATS, 'group_stats', group_target_grammar(TRIGGER_KEYWORD_GROUP_STATS),
+                  lambda ctx, m, sender_id, group_id: self._handle_group_stats_command(ctx, *targets(m, group_id)),
+                  "指令格式错误"),
+            Route(TRIGGER_KEYWORD_NETWORK, 'network', member_target_grammar(TRIGGER_KEYWORD_NETWORK),
+                  lambda ctx, m, sender_id, group_id: self._handle_network_command(ctx, member_argument(m), *targets(m, group_id)),
+                  f"格式错误, 示例: {TRIGGER_KEYWORD_NETWORK} wxid_xxxx 或 {TRIGGER_KEYWORD_NETWORK} 昵称"),
+            Route(TRIGGER_KEYWORD_CROSS_NETWORK, 'cross_network',
+                  member_grammar(TRIGGER_KEYWORD_CROSS_NETWORK, r'(?:\s+到\s+(?P<send_id>' + GROUP_ID_REGEX + r'))?'),
+                  lambda ctx, m, sender_id, group_id: self._handle_cross_network_command(
+                      ctx, member_argument(m), self._normalize_group_id(m.group('send_id') or group_id)),
+                  f"格式错误, 示例: {TRIGGER_KEYWORD_CROSS_NETWORK} wxid_xxxx 或 {TRIGGER_KEYWORD_CROSS_NETWORK} 昵称"),
+            Route(TRIGGER_KEYWORD_JOIN_HISTORY, 'join_history',
+                  member_grammar(TRIGGER_KEYWORD_JOIN_HISTORY, r'(?:\s+(?P<days>\d{1,4}))?'),
+                  lambda ctx, m, sender_id, group_id: self._handle_join_history_command(
+                      ctx, member_argument(m), int(m.group('days') or HISTORY_DEFAULT_DAYS), self._normalize_group_id(group_id)),
+                  f"格式错误, 示例: {TRIGGER_KEYWORD_JOIN_HISTORY} wxid_xxxx 7"),
+            Route(TRIGGER_KEYWORD_KICK_MEMBER, 'kick_member', member_grammar(TRIGGER_KEYWORD_KICK_MEMBER),
+                  lambda ctx, m, sender_id, group_id: self._handle_kick_member_command(ctx, group_id, member_argument(m)),
+                  f"格式错误, 示例: {TRIGGER_KEYWORD_KICK_MEMBER} wxid_xxxx 或 {TRIGGER_KEYWORD_KICK_MEMBER} 完整昵称"),
+            Route(TRIGGER_KEYWORD_KICK_DOWNLINE, 'kick_downline', member_grammar(TRIGGER_KEYWORD_KICK_DOWNLINE),
+                  lambda ctx, m, sender_id, group_id: self._handle_kick_downline_command(ctx, group_id, member_argument(m)),
+                  f"格式错误, 示例: {TRIGGER_KEYWORD_KICK_DOWNLINE} wxid_xxxx 或 {TRIGGER_KEYWORD_KICK_DOWNLINE} 完整昵称"),
+        ))
+
     async def group_message_handler(self, ctx: EventContext):
         try:
             raw_msg = ctx.event.query.message_chain.get_plain_text().strip()
@@ -109,16 +301,20 @@ class GroupInsightPlugin(BasePlugin):
             try: 
                 raw_msg = ctx.event.text_message.strip()
             except Exception: return
-        
-        all_triggers = [TRIGGER_KEYWORD, TRIGGER_KEYWORD_NETWORK, TRIGGER_KEYWORD_KICK_MEMBER, TRIGGER_KEYWORD_KICK_DOWNLINE, TRIGGER_KEYWORD_HELP]
-        if not any(raw_msg.startswith(trigger) for trigger in all_triggers):
+
+        # 绝大多数群消息不是指令，在这里只经过一次首字符比较就返回
+        route = self.command_router.route(raw_msg)
+        if route is None:
+            # 【新增】入群 / 退群 / 移出通知：普通消息同样只多一次子串判断
+            if self.roster_events_enabled and NOTICE_HINT in raw_msg:
+                await self._handle_roster_notice(ctx, raw_msg)
             return
 
         sender_id = str(ctx.event.sender_id)
         current_group_id = str(ctx.event.query.launcher_id)
         
         is_admin = sender_id in self.ADMIN_USER_IDS or current_group_id in self.ADMIN_USER_IDS
-        if not self.ADMIN_USER_IDS or not is_admin: return
+        if not is_admin: return
         
         ctx.prevent_default()
         ctx.prevent_postorder()
@@ -126,198 +322,458 @@ class GroupInsightPlugin(BasePlugin):
             await ctx.reply(MessageChain([Plain("插件核心配置缺失，请联系机器人管理员。")]))
             return
 
-        GROUP_ID_REGEX = r'[\w\-\.]+(?:@chatroom)?'
-        MEMBER_ID_REGEX = r'[\w\-\.]+'
-        
+        self.metrics.inc('commands', command=route.name)
         try:
-            if raw_msg.strip() == TRIGGER_KEYWORD_HELP:
-                await self._handle_help_command(ctx, current_group_id)
-            elif raw_msg.startswith(TRIGGER_KEYWORD):
-                pattern_full = re.compile(r'^\s*' + re.escape(TRIGGER_KEYWORD) + r'\s+(?P<fetch_id>' + GROUP_ID_REGEX + r')\s+到\s+(?P<send_id>' + GROUP_ID_REGEX + r')\s*$')
-                pattern_fetch_only = re.compile(r'^\s*' + re.escape(TRIGGER_KEYWORD) + r'\s+(?P<fetch_id>' + GROUP_ID_REGEX + r')\s*$')
-                pattern_send_to_only = re.compile(r'^\s*' + re.escape(TRIGGER_KEYWORD) + r'到\s+(?P<send_id>' + GROUP_ID_REGEX + r')\s*$')
-                pattern_default = re.compile(r'^\s*' + re.escape(TRIGGER_KEYWORD) + r'\s*$')
-                if (match := pattern_full.match(raw_msg)):
-                    await self._handle_invite_tree_command(ctx, self._normalize_group_id(match.group('fetch_id')), self._normalize_group_id(match.group('send_id')))
-                elif (match := pattern_fetch_only.match(raw_msg)):
-                    await self._handle_invite_tree_command(ctx, self._normalize_group_id(match.group('fetch_id')), self._normalize_group_id(current_group_id))
-                elif (match := pattern_send_to_only.match(raw_msg)):
-                    await self._handle_invite_tree_command(ctx, self._normalize_group_id(current_group_id), self._normalize_group_id(match.group('send_id')))
-                elif pattern_default.match(raw_msg):
-                    await self._handle_invite_tree_command(ctx, self._normalize_group_id(current_group_id), self._normalize_group_id(current_group_id))
-                else:
-                    await self._send_error_message(ctx, current_group_id, raw_msg, "指令格式错误")
-
-            elif raw_msg.startswith(TRIGGER_KEYWORD_NETWORK):
-                base_pattern = r'^\s*' + re.escape(TRIGGER_KEYWORD_NETWORK) + r'\s+(?P<member_id>' + MEMBER_ID_REGEX + r')'
-                pattern_full = re.compile(base_pattern + r'\s+在\s+(?P<fetch_id>' + GROUP_ID_REGEX + r')\s+到\s+(?P<send_id>' + GROUP_ID_REGEX + r')\s*$')
-                pattern_fetch_only = re.compile(base_pattern + r'\s+在\s+(?P<fetch_id>' + GROUP_ID_REGEX + r')\s*$')
-                pattern_send_to_only = re.compile(base_pattern + r'\s+到\s+(?P<send_id>' + GROUP_ID_REGEX + r')\s*$')
-                pattern_default = re.compile(base_pattern + r'\s*$')
-
-                if (match := pattern_full.match(raw_msg)):
-                    await self._handle_network_command(ctx, match.group('member_id'), self._normalize_group_id(match.group('fetch_id')), self._normalize_group_id(match.group('send_id')))
-                elif (match := pattern_fetch_only.match(raw_msg)):
-                    await self._handle_network_command(ctx, match.group('member_id'), self._normalize_group_id(match.group('fetch_id')), self._normalize_group_id(current_group_id))
-                elif (match := pattern_send_to_only.match(raw_msg)):
-                    await self._handle_network_command(ctx, match.group('member_id'), self._normalize_group_id(current_group_id), self._normalize_group_id(match.group('send_id')))
-                elif (match := pattern_default.match(raw_msg)):
-                    await self._handle_network_command(ctx, match.group('member_id'), self._normalize_group_id(current_group_id), self._normalize_group_id(current_group_id))
-                else:
-                    await self._send_error_message(ctx, current_group_id, raw_msg, f"格式错误, 示例: {TRIGGER_KEYWORD_NETWORK} wxid_xxxx")
-
-            elif raw_msg.startswith(TRIGGER_KEYWORD_KICK_MEMBER):
-                pattern = re.compile(r'^\s*' + re.escape(TRIGGER_KEYWORD_KICK_MEMBER) + r'\s+(?P<member_id>' + MEMBER_ID_REGEX + r')\s*$')
-                if (match := pattern.match(raw_msg)):
-                    await self._handle_kick_member_command(ctx, current_group_id, match.group('member_id'))
-                else:
-                    await self._send_error_message(ctx, current_group_id, raw_msg, f"格式错误, 示例: {TRIGGER_KEYWORD_KICK_MEMBER} wxid_xxxx")
-            
-            elif raw_msg.startswith(TRIGGER_KEYWORD_KICK_DOWNLINE):
-                pattern = re.compile(r'^\s*' + re.escape(TRIGGER_KEYWORD_KICK_DOWNLINE) + r'\s+(?P<member_id>' + MEMBER_ID_REGEX + r')\s*$')
-                if (match := pattern.match(raw_msg)):
-                    await self._handle_kick_downline_command(ctx, current_group_id, match.group('member_id'))
-                else:
-                    await self._send_error_message(ctx, current_group_id, raw_msg, f"格式错误, 示例: {TRIGGER_KEYWORD_KICK_DOWNLINE} wxid_xxxx")
-
+            with self.metrics.span('command', command=route.name):
+                await self._dispatch_command(ctx, route, raw_msg, sender_id, current_group_id)
         except Exception as e:
             self.logger.error(f"指令处理时发生顶层异常: {e}\n{traceback.format_exc()}")
-    
+
+    async def _dispatch_command(self, ctx: EventContext, route: Route, raw_msg: str, sender_id: str, current_group_id: str):
+        match = route.parse(raw_msg)
+        if match is not None:
+            await route.handler(ctx, match, sender_id, current_group_id)
+        elif route.usage is not None:
+            await self._send_error_message(ctx, current_group_id, raw_msg, route.usage)
+
     async def _send_error_message(self, ctx: EventContext, group_id: str, raw_msg: str, reason: str):
         await self.host.send_active_message(ctx.event.query.adapter, "group", group_id, MessageChain([Plain(f"{reason}。输入 {TRIGGER_KEYWORD_HELP} 获取帮助。")]))
 
+    async def _send_text(self, ctx: EventContext, group_id: str, text: str):
+        await self.host.send_active_message(ctx.event.query.adapter, "group", group_id, MessageChain([Plain(text)]))
+
+    async def _send_image(self, ctx: EventContext, group_id: str, image_bytes: bytes, caption: Optional[str] = None):
+        with self.metrics.span('stage', stage='encode'):
+            img_base64 = base64.b64encode(image_bytes).decode()
+        with self.metrics.span('stage', stage='send'):
+            components = [Plain(caption)] if caption else []
+            await self.host.send_active_message(ctx.event.query.adapter, "group", group_id, MessageChain([*components, Image(base64=img_base64)]))
+
+    async def _send_text_tree(self, ctx: EventContext, group_id: str, graph: InviteGraph, title: str, plan: RenderPlan,
+                              leaver_names: Optional[Dict[str, str]] = None):
+        """【新增】关系图无法在渲染预算内完成时的兜底：按邀请树缩进输出文字版，分段发送。"""
+        if leaver_names is None:
+            leaver_names = await self._leaver_names(graph)
+        header = f"{title}：关系图无法在 {self.render_budget} 秒的渲染预算内完成，改为发送文字版邀请树（{self._format_now()} UTC+8）\n"
+        await self._send_chunked(ctx, group_id, itertools.chain([header], self._format_text_tree(graph, plan, leaver_names)))
+
+    async def _send_chunked(self, ctx: EventContext, group_id: str, lines: Iterable[str], max_chunks: int = MESSAGE_MAX_CHUNKS) -> int:
+        """
+        【新增】把按行生成的长结果拆分为不超过 MESSAGE_CHUNK_CHARS 的多条消息，攒满一段就发送一段，
+        lines 可以是生成器，后续行在前一段发送期间才继续生成。超过 max_chunks 段时只提示省略的行数。返回发送的段数。
+        """
+        chunks = self._chunk_lines(lines)
+        sent = 0
+        for chunk in chunks:
+            if sent >= max_chunks:
+                # 段内元素是硬切分后的片段、也可能一段含多行，按实际的换行统计省略的行数
+                omitted = sum(len("".join(rest).splitlines()) for rest in itertools.chain([chunk], chunks))
+                await self._send_text(ctx, group_id, f"...其余 {omitted} 行已省略")
+                break
+            await self._send_text(ctx, group_id, "".join(chunk).rstrip("\n"))
+            sent += 1
+        return sent
+
+    def _chunk_lines(self, lines: Iterable[str], limit: int = MESSAGE_CHUNK_CHARS) -> Iterator[List[str]]:
+        chunk, size = [], 0
+        for line in lines:
+            # 单行超长时硬切分，保证每段都不超过上限
+            pieces = [line[i:i + limit] for i in range(0, len(line), limit)] or [line]
+            for piece in pieces:
+                if chunk and size + len(piece) > limit:
+                    yield chunk
+                    chunk, size = [], 0
+                chunk.append(piece)
+                size += len(piece)
+        if chunk:
+            yield chunk
+
     async def _handle_invite_tree_command(self, ctx: EventContext, fetch_group_id: str, send_group_id: str):
-        image_path = None
         initiator_group_id = str(ctx.event.query.launcher_id)
         
         try:
-            group_info = await self._fetch_group_details(fetch_group_id)
-            if not group_info:
-                await self.host.send_active_message(
-                    ctx.event.query.adapter, "group", initiator_group_id, 
-                    MessageChain([Plain(f"获取群 '{fetch_group_id}' 信息失败。请检查群ID是否正确或API是否可用。")])
-                )
+            if graphviz is None:
+                await self._send_text(ctx, initiator_group_id, "错误：'graphviz' 库未安装或未找到，无法生成关系图。")
                 return
 
-            group_name = group_info.get('nickName', {}).get('str', fetch_group_id)
-            
-            await self.host.send_active_message(
-                ctx.event.query.adapter, "group", initiator_group_id, 
-                MessageChain([Plain(f"正在生成群 '{group_name}' ({fetch_group_id}) 的邀请关系图...")])
+            # 【重构】受理提示与拉取群信息同时进行，不再等提示发出后才开始拉取
+            snapshot, _ = await asyncio.gather(
+                self._fetch_group_snapshot(fetch_group_id),
+                self._send_text(ctx, initiator_group_id, f"正在生成群 ({fetch_group_id}) 的邀请关系图..."),
             )
-            
-            if graphviz is None:
-                await self.host.send_active_message(
-                    ctx.event.query.adapter, "group", initiator_group_id,
-                    MessageChain([Plain("错误：'graphviz' 库未安装或未找到，无法生成关系图。")])
-                )
+            if not snapshot:
+                await self._send_text(ctx, initiator_group_id, f"获取群 '{fetch_group_id}' 信息失败。请检查群ID是否正确或API是否可用。")
                 return
+
+            group_name = snapshot.name
+            graph = await self._get_graph(snapshot)
             
-            member_list = group_info.get('newChatroomData', {}).get('chatroom_member_list', [])
-            
-            if not member_list:
-                await self.host.send_active_message(
-                    ctx.event.query.adapter, "group", initiator_group_id, 
-                    MessageChain([Plain(f"群 '{group_name}' ({fetch_group_id}) 成员列表为空或获取失败。")])
-                )
+            if not graph.member_count:
+                await self._send_text(ctx, initiator_group_id, f"群 '{group_name}' ({fetch_group_id}) 成员列表为空或获取失败。")
                 return
             
-            if len(member_list) > MAX_NODES_TO_RENDER:
-                await self.host.send_active_message(
-                    ctx.event.query.adapter, "group", initiator_group_id,
-                    MessageChain([Plain(f"生成失败：群 '{group_name}' ({fetch_group_id}) 成员数量 ({len(member_list)}) 超过了最大渲染限制 ({MAX_NODES_TO_RENDER})。")])
-                )
+            plan = plan_render(graph)
+            if plan.node_count > MAX_NODES_LARGE_GRAPH:
+                await self._send_text(ctx, initiator_group_id, f"生成失败：群 '{group_name}' ({fetch_group_id}) 折叠后仍有 {plan.node_count} 个节点，超过了最大渲染限制 ({MAX_NODES_LARGE_GRAPH})。请使用 {TRIGGER_KEYWORD_PAGED} 按顶级邀请人分页生成。")
                 return
 
             filename_id = fetch_group_id.replace('@chatroom', '_')
-            image_path = await self._generate_invite_tree_image(member_list, filename_id, group_name, ctx)
-            
-            if not image_path:
-                await self.host.send_active_message(
-                    ctx.event.query.adapter, "group", initiator_group_id,
-                    MessageChain([Plain(f"生成群 '{group_name}' ({fetch_group_id}) 的关系图失败。可能原因：内部渲染错误或配置问题。详情请查看机器人后台日志。")])
-                )
+            render = asyncio.ensure_future(self._generate_invite_tree_image(graph, filename_id, group_name, ctx, plan))
+            try:
+                # 【新增】渲染未能很快完成（未命中缓存）时，先发送文字摘要，图片稍后单独发送
+                done, _ = await asyncio.wait({render}, timeout=RENDER_SUMMARY_DELAY)
+                if not done:
+                    await self._send_text(ctx, initiator_group_id, self._format_graph_summary(graph, group_name, plan))
+                image_bytes = await render
+            except RenderBudgetExceeded:
+                await self._send_text_tree(ctx, send_group_id, graph, f"群 '{group_name}' 的邀请关系", plan)
                 return
+            finally:
+                render.cancel()
             
-            with open(image_path, 'rb') as f:
-                img_base64 = base64.b64encode(f.read()).decode()
+            if not image_bytes:
+                await self._send_text(ctx, initiator_group_id, f"生成群 '{group_name}' ({fetch_group_id}) 的关系图失败。可能原因：内部渲染错误或配置问题。详情请查看机器人后台日志。")
+                return
             
-            await self.host.send_active_message(
-                ctx.event.query.adapter, "group", send_group_id, 
-                MessageChain([Image(base64=img_base64)])
-            )
+            await self._send_image(ctx, send_group_id, image_bytes, f"群 '{group_name}' 的邀请关系图（{self._format_now()} UTC+8）")
 
         except Exception as e:
             self.logger.error(f"处理邀请关系图命令时发生错误: {e}\n{traceback.format_exc()}")
             await self.host.send_active_message(
                 ctx.event.query.adapter, "group", initiator_group_id, 
-                MessageChain([Plain(f"处理命令时发生严重错误，请联系管理员。")])
+                MessageChain([Plain("处理命令时发生严重错误，请联系管理员。")])
             )
-        finally:
-            if image_path and os.path.exists(image_path):
-                try: 
-                    os.remove(image_path)
-                except OSError as e: 
-                    self.logger.error(f"清理临时文件 {image_path} 失败: {e}")
 
-    async def _handle_network_command(self, ctx: EventContext, member_id: str, fetch_group_id: str, send_group_id: str):
+    def _format_graph_summary(self, graph: InviteGraph, group_name: str, plan: RenderPlan) -> str:
+        m = graph.member_count
+        trees = sum(1 for v in range(len(graph)) if graph.tree_parent[v] == -1 and graph.children[v])
+        max_depth = max(graph.depth[:m], default=0)
+        collapsed = sum(plan.summaries.values())
+        text = (f"群 '{group_name}' 共 {m} 名成员，{trees} 棵邀请树，最大邀请深度 {max_depth}，"
+                f"已退群邀请人 {len(graph) - m} 名。")
+        if collapsed:
+            text += f"大图模式已折叠 {collapsed} 名无下级成员，"
+        return text + f"正在渲染 {plan.node_count} 个节点的关系图..."
+
+    def _format_text_tree(self, graph: InviteGraph, plan: RenderPlan, leaver_names: Dict[str, str]) -> Iterator[str]:
+        """按欧拉序输出计划中的节点，缩进表示邀请层级；折叠的无下级成员以摘要行表示。"""
+        visible = set(plan.nodes)
+        if plan.subtree_root is None:
+            order, base = graph.order, 0
+        else:
+            order = graph.order[graph.tin[plan.subtree_root]:graph.tout[plan.subtree_root]]
+            base = graph.depth[plan.subtree_root]
+        for v in order:
+            if v not in visible:
+                continue
+            level = graph.depth[v] - base
+            indent = "  " * min(level, TEXT_TREE_MAX_INDENT) + (f"[{level}] " if level > TEXT_TREE_MAX_INDENT else "")
+            if graph.is_member(v):
+                name = graph.names[v] or " "
+            else:
+                name = f"已退群: {leaver_names[graph.ids[v]]}" if graph.ids[v] in leaver_names else "已退群"
+            yield f"{indent}- {name} ({graph.ids[v]})\n"
+            if v in plan.summaries:
+                yield f"{indent}  - 另有 {plan.summaries[v]} 名成员 (均无下级)\n"
+        if -1 in plan.summaries:
+            yield f"- 另有 {plan.summaries[-1]} 名成员无邀请人且无下级\n"
+
+    async def _handle_paged_invite_tree_command(self, ctx: EventContext, fetch_group_id: str, send_group_id: str):
         initiator_group_id = str(ctx.event.query.launcher_id)
         try:
-            group_info = await self._fetch_group_details(fetch_group_id)
-            if not group_info:
-                await self.host.send_active_message(ctx.event.query.adapter, "group", initiator_group_id, MessageChain([Plain(f"获取群 '{fetch_group_id}' 信息失败。")]))
+            if graphviz is None:
+                await self._send_text(ctx, initiator_group_id, "错误：'graphviz' 库未安装或未找到，无法生成关系图。")
                 return
 
-            group_name = group_info.get('nickName', {}).get('str', fetch_group_id)
-            member_list = group_info.get('newChatroomData', {}).get('chatroom_member_list', [])
-            members_map = {m['user_name']: self._clean_whitespace_and_special_chars(m.get('nick_name', '') or m['user_name']) for m in member_list}
-            member_name = members_map.get(member_id, member_id)
+            snapshot, _ = await asyncio.gather(
+                self._fetch_group_snapshot(fetch_group_id),
+                self._send_text(ctx, initiator_group_id, f"正在按顶级邀请人分页生成群 ({fetch_group_id}) 的邀请关系图..."),
+            )
+            if not snapshot:
+                await self._send_text(ctx, initiator_group_id, f"获取群 '{fetch_group_id}' 信息失败。请检查群ID是否正确或API是否可用。")
+                return
+
+            group_name = snapshot.name
+            graph = await self._get_graph(snapshot)
+            top_inviters = sorted((v for v in range(len(graph)) if graph.tree_parent[v] == -1 and graph.children[v]),
+                                  key=lambda v: graph.subtree_size[v], reverse=True)
+            if not top_inviters:
+                await self._send_text(ctx, initiator_group_id, f"群 '{group_name}' ({fetch_group_id}) 中没有任何邀请关系。")
+                return
 
-            await self.host.send_active_message(ctx.event.query.adapter, "group", initiator_group_id, MessageChain([Plain(f"正在群 '{group_name}' ({fetch_group_id}) 中查询成员 '{member_name}' 的关系网络...")]))
+            pages = top_inviters[:PAGED_MAX_PAGES]
+            isolated = sum(1 for v in range(graph.member_count) if graph.tree_parent[v] == -1 and not graph.children[v])
+            notice = (f"群 '{group_name}' ({fetch_group_id}) 的邀请关系（{self._format_now()} UTC+8）：共 {len(top_inviters)} 棵邀请树，"
+                      f"本次发送最大的 {len(pages)} 棵。另有 {isolated} 名成员无任何邀请关系。")
+            filename_id = fetch_group_id.replace('@chatroom', '_')
+            _, leaver_names = await asyncio.gather(self._send_text(ctx, initiator_group_id, notice), self._leaver_names(graph))
+
+            async def render_page(page_no: int, root: int):
+                """完成一页的渲染，返回发送这一页的协程函数；发送留给调用方按页序执行。"""
+                root_name = graph.names[root] if graph.is_member(root) else f"已退群: {leaver_names.get(graph.ids[root], graph.ids[root])}"
+                page_title = f"{group_name}（{root_name} 的邀请树 {page_no}/{len(pages)}，{graph.subtree_size[root]} 人）"
+                plan = plan_render(graph, subtree_root=root)
+                if plan.node_count > MAX_NODES_LARGE_GRAPH:
+                    return functools.partial(self._send_text, ctx, initiator_group_id, f"第 {page_no} 页（{root_name}）折叠后仍有 {plan.node_count} 个节点，已跳过。")
+                try:
+                    image_bytes = await self._generate_invite_tree_image(graph, filename_id, page_title, ctx, plan, leaver_names)
+                except RenderBudgetExceeded:
+                    return functools.partial(self._send_text_tree, ctx, send_group_id, graph, page_title, plan, leaver_names)
+                if not image_bytes:
+                    return functools.partial(self._send_text, ctx, initiator_group_id, f"第 {page_no} 页（{root_name}）生成失败，详情请查看机器人后台日志。")
+                return functools.partial(self._send_image, ctx, send_group_id, image_bytes)
+
+            # 【重构】流水线：发送当前页的同时渲染下一页，同时在途的渲染不超过两页，不会挤满渲染队列
+            next_page = asyncio.ensure_future(render_page(1, pages[0]))
+            try:
+                for page_no in range(1, len(pages) + 1):
+                    current = next_page
+                    next_page = asyncio.ensure_future(render_page(page_no + 1, pages[page_no])) if page_no < len(pages) else None
+                    send_page = await current
+                    await send_page()
+            finally:
+                if next_page is not None:
+                    next_page.cancel()
+        except Exception as e:
+            self.logger.error(f"处理分页邀请关系图命令时发生错误: {e}\n{traceback.format_exc()}")
+            await self.host.send_active_message(ctx.event.query.adapter, "group", initiator_group_id, MessageChain([Plain("处理命令时发生严重错误，请联系管理员。")]))
 
-            if not member_list:
-                await self.host.send_active_message(ctx.event.query.adapter, "group", initiator_group_id, MessageChain([Plain(f"群 '{group_name}' ({fetch_group_id}) 成员列表为空。")]))
+    async def _handle_network_command(self, ctx: EventContext, member_id: str, fetch_group_id: str, send_group_id: str):
+        initiator_group_id = str(ctx.event.query.launcher_id)
+        try:
+            # 【重构】受理提示与拉取群信息并发进行；提示中暂用成员ID，昵称要等花名册返回后才知道
+            snapshot, _ = await asyncio.gather(
+                self._fetch_group_snapshot(fetch_group_id),
+                self._send_text(ctx, initiator_group_id, f"正在群 ({fetch_group_id}) 中查询成员 '{member_id}' 的关系网络..."),
+            )
+            if not snapshot:
+                await self._send_text(ctx, initiator_group_id, f"获取群 '{fetch_group_id}' 信息失败。")
                 return
-                
-            if member_id not in members_map:
-                await self.host.send_active_message(ctx.event.query.adapter, "group", initiator_group_id, MessageChain([Plain(f"成员 '{member_id}' 不在群 '{group_name}' ({fetch_group_id}) 中。")]))
+
+            group_name = snapshot.name
+            roster = snapshot.roster
+            if not roster.member_count:
+                await self._send_text(ctx, initiator_group_id, f"群 '{group_name}' ({fetch_group_id}) 成员列表为空。")
                 return
 
-            parent_map, children_map = self._build_invite_relationship(member_list)
-            network_data = self._get_member_direct_network(member_id, parent_map, children_map, members_map)
+            member_id = await self._resolve_member(ctx, initiator_group_id, member_id, [snapshot])
+            if member_id is None: return
+            member_name = roster.display_name(member_id)
+            if member_id not in roster:
+                await self._send_text(ctx, initiator_group_id, f"成员 '{member_id}' 不在群 '{group_name}' ({fetch_group_id}) 中。")
+                return
+
+            graph = await self._get_graph(snapshot)
+            v = graph.index[member_id]
+            records, former = await asyncio.gather(
+                self._history_records(fetch_group_id, [member_id, *(graph.ids[u] for u in graph.upstream(v) if not graph.is_member(u))]),
+                self._former_invitees(fetch_group_id, member_id),
+            )
+            leaver_names = {wxid: record.nickname for wxid, record in records.items() if wxid != member_id and record.nickname}
+            network_data = self._get_member_direct_network(member_id, graph, leaver_names)
             if network_data is None: return
 
             upstream, downstream = network_data
-            display_name = members_map.get(member_id, member_id)
-            parts = [f"群 '{group_name}' ({fetch_group_id}) 内成员 '{display_name} ({member_id})' 的邀请关系网络如下：\n"]
-            parts.append("\n--- 上级邀请链 ---\n")
-            parts.append(" -> ".join(upstream) + "\n" if upstream else "该成员是顶级邀请人（始祖人）或其上级已退群。\n")
-            parts.append(f"\n--- 直接邀请的下级 (共 {len(downstream)} 位) ---\n")
-            if downstream:
-                for wxid, nickname in downstream.items():
-                    parts.append(f"- {nickname} ({wxid})\n")
-            else:
-                parts.append("该成员没有直接邀请任何下级成员。\n")
-            await self.host.send_active_message(ctx.event.query.adapter, "group", send_group_id, MessageChain([Plain("".join(parts))]))
+
+            def lines():
+                yield f"群 '{group_name}' ({fetch_group_id}) 内成员 '{member_name} ({member_id})' 的邀请关系网络如下：\n"
+                if member_id in records:
+                    yield self._format_join_time(records[member_id]) + "\n"
+                yield "\n--- 上级邀请链 ---\n"
+                yield " -> ".join(upstream) + "\n" if upstream else "该成员是顶级邀请人（始祖人）或其上级已退群。\n"
+                yield f"\n--- 直接邀请的下级 (共 {len(downstream)} 位) ---\n"
+                if downstream:
+                    for wxid, nickname in downstream.items():
+                        yield f"- {nickname} ({wxid})\n"
+                else:
+                    yield "该成员没有直接邀请任何下级成员。\n"
+                if former:
+                    yield f"\n--- 已退群的直接下级 (共 {len(former)} 位) ---\n"
+                    for record in former:
+                        yield f"- {record.nickname} ({record.wxid})，{self._format_time(record.left_at)} 退群\n"
+
+            await self._send_chunked(ctx, send_group_id, lines())
         except Exception as e:
             self.logger.error(f"处理 #查关系网 命令时发生错误: {e}\n{traceback.format_exc()}")
-            await self.host.send_active_message(ctx.event.query.adapter, "group", initiator_group_id, MessageChain([Plain(f"处理命令时发生未知错误。")]))
+            await self.host.send_active_message(ctx.event.query.adapter, "group", initiator_group_id, MessageChain([Plain("处理命令时发生未知错误。")]))
+
+    async def _handle_join_history_command(self, ctx: EventContext, member_id: str, days: int, group_id: str):
+        if self.history is None:
+            await self.host.send_active_message(ctx.event.query.adapter, "group", group_id, MessageChain([Plain("未启用花名册历史记录，请在插件配置中设置历史数据库路径。")]))
+            return
+        try:
+            snapshot = await self._fetch_group_snapshot(group_id)
+            if snapshot is not None:
+                member_id = await self._resolve_member(ctx, group_id, member_id, [snapshot])
+                if member_id is None: return
+            events = await self.history.joined_via(group_id, member_id, time.time() - days * 86400)
+            records = await self.history.lookup_members(group_id, [member_id])
+            member_name = records[member_id].nickname if member_id in records else member_id
+            lines = [f"近 {days} 天经 '{member_name} ({member_id})' 邀请进群的成员 (共 {len(events)} 位)：\n"]
+            for event in events:
+                line = f"- {event.nickname} ({event.wxid})，{self._format_time(event.at)} 入群"
+                if event.left_at is not None:
+                    line += f"，{self._format_time(event.left_at)} 已退群"
+                lines.append(line + "\n")
+            if not events:
+                lines.append("无记录。仅统计插件开始记录该群之后的入群。\n")
+            await self._send_chunked(ctx, group_id, lines)
+        except Exception as e:
+            self.logger.error(f"处理 #邀请记录 命令时发生错误: {e}\n{traceback.format_exc()}")
+            await self.host.send_active_message(ctx.event.query.adapter, "group", group_id, MessageChain([Plain("处理命令时发生未知错误。")]))
+
+    async def _handle_group_stats_command(self, ctx: EventContext, fetch_group_id: str, send_group_id: str):
+        initiator_group_id = str(ctx.event.query.launcher_id)
+        try:
+            snapshot = await self._fetch_group_snapshot(fetch_group_id)
+            if not snapshot:
+                await self.host.send_active_message(ctx.event.query.adapter, "group", initiator_group_id, MessageChain([Plain(f"获取群 '{fetch_group_id}' 信息失败。请检查群ID是否正确或API是否可用。")]))
+                return
+            graph = await self._get_graph(snapshot)
+            if not graph.member_count:
+                await self.host.send_active_message(ctx.event.query.adapter, "group", initiator_group_id, MessageChain([Plain(f"群 '{snapshot.name}' ({fetch_group_id}) 成员列表为空。")]))
+                return
+            stats = await self._run_blocking('analytics', compute_group_stats, graph)
+            await self._send_chunked(ctx, send_group_id, self._format_group_stats(snapshot, graph, stats).splitlines(keepends=True))
+        except Exception as e:
+            self.logger.error(f"处理 #群统计 命令时发生错误: {e}\n{traceback.format_exc()}")
+            await self.host.send_active_message(ctx.event.query.adapter, "group", initiator_group_id, MessageChain([Plain("处理命令时发生未知错误。")]))
+
+    async def get_group_stats(self, group_id: str) -> Optional[GroupStats]:
+        """计算群邀请关系的统计指标（不涉及 Graphviz），获取群信息失败时返回 None。"""
+        snapshot = await self._fetch_group_snapshot(group_id)
+        if not snapshot:
+            return None
+        return await self._run_blocking('analytics', compute_group_stats, await self._get_graph(snapshot))
+
+    def _format_group_stats(self, snapshot: GroupSnapshot, graph: InviteGraph, stats: GroupStats) -> str:
+        m = stats.member_count
+
+        def pct(count: int) -> str:
+            return f"{count / m:.1%}" if m else "0%"
+
+        def label(v: int) -> str:
+            return f"{graph.names[v]} ({graph.ids[v]})" if graph.is_member(v) else f"已退群({graph.ids[v]})"
+
+        parts = [f"群 '{snapshot.name}' ({snapshot.group_id}) 的邀请关系统计（{self._format_now()} UTC+8）：\n"]
+        parts.append("\n--- 概况 ---\n")
+        parts.append(f"在群成员 {m} 人，邀请树 {stats.tree_count} 棵，最大邀请深度 {stats.max_depth}\n")
+        parts.append(f"无邀请人 {stats.no_inviter_count} 人 ({pct(stats.no_inviter_count)})，其中孤立成员 {stats.isolated_count} 人\n")
+        parts.append(f"邀请人已退群 {stats.inviter_left_count} 人 ({pct(stats.inviter_left_count)})，涉及已退群邀请人 {stats.leaver_inviter_count} 人\n")
+        parts.append(f"邀请环 {stats.cycle_count} 个（涉及 {stats.cycle_member_count} 人）\n")
+        star = "，关系图将使用放射状布局" if stats.star_ratio >= STAR_GRAPH_THRESHOLD_RATIO and stats.top_direct and stats.top_direct[0][1] >= STAR_GRAPH_THRESHOLD_ABSOLUTE else ""
+        parts.append(f"星型系数 {stats.star_ratio:.2f}{star}\n")
+
+        parts.append("\n--- 下级规模（邀请过人的成员） ---\n")
+        parts.append(f"最大 {stats.max_downline} 人，平均 {stats.mean_downline:.1f} 人，P90 {stats.p90_downline} 人\n")
+
+        parts.append("\n--- 邀请深度分布 ---\n")
+        for depth, count in enumerate(stats.depth_histogram):
+            parts.append(f"第 {depth} 层：{count} 人 ({pct(count)})\n")
+
+        parts.append("\n--- 直接邀请最多 ---\n")
+        for rank, (v, count) in enumerate(stats.top_direct, start=1):
+            parts.append(f"{rank}. {label(v)}：{count} 人\n")
+        parts.append("\n--- 全部下级最多 ---\n")
+        for rank, (v, count) in enumerate(stats.top_downline, start=1):
+            parts.append(f"{rank}. {label(v)}：{count} 人\n")
+        return "".join(parts).rstrip()
+
+    async def _handle_cross_network_command(self, ctx: EventContext, member_id: str, send_group_id: str):
+        initiator_group_id = str(ctx.event.query.launcher_id)
+        try:
+            group_ids = self._managed_group_ids(initiator_group_id)
+            snapshots, _ = await asyncio.gather(
+                self._fetch_group_snapshots(group_ids),
+                self._send_text(ctx, initiator_group_id, f"正在 {len(group_ids)} 个管理群中查询成员 '{member_id}' 的关系网..."),
+            )
+            # 昵称在所有管理群中检索；快照已在缓存中，下面的查询不会再次请求 API
+            member_id = await self._resolve_member(ctx, initiator_group_id, member_id,
+                                                   [snap for snap in snapshots.values() if snap is not None])
+            if member_id is None: return
+            report = await self.get_cross_group_network(member_id, group_ids)
+            if report is None:
+                await self.host.send_active_message(ctx.event.query.adapter, "group", initiator_group_id, MessageChain([Plain(f"获取 {len(group_ids)} 个管理群的信息全部失败。")]))
+                return
+            if not report.appearances:
+                await self.host.send_active_message(ctx.event.query.adapter, "group", initiator_group_id, MessageChain([Plain(f"成员 '{member_id}' 不在任何管理群中（共查询 {len(group_ids)} 个群）。")]))
+                return
+
+            parts = [f"成员 '{report.display_name} ({member_id})' 在 {len(report.appearances)}/{len(group_ids)} 个管理群中的关系网如下：\n"]
+            parts.append("\n--- 所在群 ---\n")
+            for a in report.appearances:
+                if not a.is_member:
+                    status = "已退群，其邀请的成员仍在群内"
+                elif a.inviter is None:
+                    status = "无邀请人"
+                elif a.inviter_name:
+                    status = f"由 {a.inviter_name} ({a.inviter}) 邀请"
+                else:
+                    status = f"由已退群的 {a.inviter} 邀请"
+                parts.append(f"- {a.group_name} ({a.group_id})：{status}；直接下级 {a.direct_count} 人，全部下级 {a.downline_count} 人\n")
+
+            parts.append("\n--- 跨群汇总 ---\n")
+            total = f"全部下级（跨群去重）共 {len(report.downline)} 人"
+            if report.downline_by_group:
+                names = {a.group_id: a.group_name for a in report.appearances}
+                parts.append(total + "，分布如下：\n")
+                for gid, count in sorted(report.downline_by_group.items(), key=lambda item: -item[1]):
+                    parts.append(f"- {names.get(gid, gid)}：{count} 人\n")
+            else:
+                parts.append(total + "。\n")
+            await self._send_chunked(ctx, send_group_id, parts)
+        except Exception as e:
+            self.logger.error(f"处理 #跨群关系网 命令时发生错误: {e}\n{traceback.format_exc()}")
+            await self.host.send_active_message(ctx.event.query.adapter, "group", initiator_group_id, MessageChain([Plain("处理命令时发生未知错误。")]))
+
+    async def get_cross_group_network(self, member_id: str, group_ids: Optional[List[str]] = None) -> Optional[CrossGroupReport]:
+        """
+        跨群查询某个成员：并发批量获取所有管理群的花名册，合并为以 wxid 为键的全局邀请图，
+        返回其所在的群、各群中的邀请人，以及跨群去重后的全部下级。所有群均获取失败时返回 None。
+        """
+        group_ids = group_ids if group_ids is not None else self._managed_group_ids()
+        snapshots = await self._fetch_group_snapshots(group_ids)
+        available = {gid: snap for gid, snap in snapshots.items() if snap is not None}
+        if not available:
+            return None
+        graphs = dict(zip(available, await asyncio.gather(*(self._get_graph(snap) for snap in available.values()))))
+
+        # 各群快照都未被刷新替换时复用上次合并的索引
+        identity = tuple(available.values())
+        cached = self._cross_group_index
+        if cached is not None and len(cached[0]) == len(identity) and all(a is b for a, b in zip(cached[0], identity)):
+            index = cached[1]
+        else:
+            index = await self._run_blocking('cross_group', CrossGroupIndex, graphs)
+            self._cross_group_index = (identity, index)
+        return await self._run_blocking('cross_group_query', index.report, member_id)
+
+    def _managed_group_ids(self, *extra: str) -> List[str]:
+        """管理群：配置的预取群与作为管理群写入 admin_user_ids 的群，外加调用方指定的群（如指令所在群）。"""
+        configured = [*self.config.get('prefetch_group_ids', []),
+                      *sorted(uid for uid in self.ADMIN_USER_IDS if uid.endswith('@chatroom')), *extra]
+        return list(dict.fromkeys(self._normalize_group_id(gid.strip()) for gid in configured if gid and gid.strip()))
 
     async def _handle_kick_member_command(self, ctx: EventContext, group_id: str, member_id: str):
         try:
             group_id = self._normalize_group_id(group_id)
-            await self.host.send_active_message(ctx.event.query.adapter, "group", group_id, MessageChain([Plain(f"正在尝试踢出成员 '{member_id}'...")]))
-            group_info = await self._fetch_group_details(group_id)
-            if not group_info: return
+            snapshot, _ = await asyncio.gather(
+                self._fetch_group_snapshot(group_id),
+                self._send_text(ctx, group_id, f"正在尝试踢出成员 '{member_id}'..."),
+            )
+            if not snapshot: return
 
-            member_list = group_info.get('newChatroomData', {}).get('chatroom_member_list', [])
-            if not any(m['user_name'] == member_id for m in member_list):
+            roster = snapshot.roster
+            member_id = await self._resolve_member(ctx, group_id, member_id, [snapshot], exact_only=True)
+            if member_id is None: return
+            if member_id not in roster:
                 await self.host.send_active_message(ctx.event.query.adapter, "group", group_id, MessageChain([Plain(f"成员 '{member_id}' 不在本群。")]))
                 return
 
-            name = self._get_member_display_name(member_list, member_id)
+            name = roster.display_name(member_id)
             success, message = await self._kick_chatroom_members(group_id, [member_id])
             if success:
+                self.group_info_cache.invalidate(group_id)
                 await self.host.send_active_message(ctx.event.query.adapter, "group", group_id, MessageChain([Plain(f"✅ 成员 '{name} ({member_id})' 已被移出群聊。")]))
             else:
                 await self.host.send_active_message(ctx.event.query.adapter, "group", group_id, MessageChain([Plain(f"❌ 未能踢出成员 '{name}'。原因: {message}")]))
@@ -327,41 +783,194 @@ class GroupInsightPlugin(BasePlugin):
     async def _handle_kick_downline_command(self, ctx: EventContext, group_id: str, member_id: str):
         try:
             group_id = self._normalize_group_id(group_id)
-            await self.host.send_active_message(ctx.event.query.adapter, "group", group_id, MessageChain([Plain(f"正在查询成员 '{member_id}' 的完整关系网并准备批量踢出...")]))
-            group_info = await self._fetch_group_details(group_id)
-            if not group_info: return
-            
-            member_list = group_info.get('newChatroomData', {}).get('chatroom_member_list', [])
-            members_map = {m['user_name']: (m.get('nick_name') or m['user_name']) for m in member_list}
+            # 高危操作前强制刷新，避免按过期花名册踢人；刷新与受理提示并发进行
+            snapshot, _ = await asyncio.gather(
+                self._fetch_group_snapshot(group_id, force_refresh=True),
+                self._send_text(ctx, group_id, f"正在查询成员 '{member_id}' 的完整关系网并准备批量踢出..."),
+            )
+            if not snapshot: return
             
-            if member_id not in members_map:
+            roster = snapshot.roster
+            member_id = await self._resolve_member(ctx, group_id, member_id, [snapshot], exact_only=True)
+            if member_id is None: return
+            if member_id not in roster:
                 await self.host.send_active_message(ctx.event.query.adapter, "group", group_id, MessageChain([Plain(f"目标成员 '{member_id}' 不在本群。")]))
                 return
             
-            parent_map, children_map = self._build_invite_relationship(member_list)
-            downstream_map = self._get_recursive_downstream(member_id, parent_map, children_map, members_map)
+            downstream_map = self._get_recursive_downstream(member_id, await self._get_graph(snapshot))
             if downstream_map is None: return
 
-            to_kick = list(downstream_map.keys())
-            to_kick.insert(0, member_id)
+            if not downstream_map:
+                await self.host.send_active_message(ctx.event.query.adapter, "group", group_id, MessageChain([Plain(f"成员 '{roster.display_name(member_id)}' 没有可一同踢出的下级。")]))
+                return
 
-            if len(to_kick) <= 1:
-                await self.host.send_active_message(ctx.event.query.adapter, "group", group_id, MessageChain([Plain(f"成员 '{members_map.get(member_id, member_id)}' 没有可一同踢出的下级。")]))
+            to_kick, skipped = [], {}
+            for wxid in [member_id, *downstream_map.keys()]:
+                if wxid in self.ADMIN_USER_IDS:
+                    skipped[wxid] = "管理员"
+                else:
+                    to_kick.append(wxid)
+            if not to_kick:
+                await self.host.send_active_message(ctx.event.query.adapter, "group", group_id, MessageChain([Plain("关系网中的成员均为管理员，已取消操作。")]))
                 return
 
-            names = [f"{members_map.get(wxid, wxid)} ({wxid})" for wxid in to_kick]
-            kick_list_str = "\n - ".join(names)
-            await self.host.send_active_message(ctx.event.query.adapter, "group", group_id, MessageChain([Plain(f"⚠️ 高危操作警告 ⚠️\n即将踢出以下 {len(names)} 名成员：\n - {kick_list_str}\n\n操作将在5秒后执行，此操作不可逆！")]))
-            await asyncio.sleep(5)
+            skipped_note = f"另有 {len(skipped)} 名管理员将被跳过。" if skipped else ""
+            # 【重构】倒计时从警告发出时开始，完整名单在倒计时期间分段发送，不再拼成一条超长消息
+            countdown = asyncio.ensure_future(asyncio.sleep(5))
+            try:
+                await self._send_text(ctx, group_id, f"⚠️ 高危操作警告 ⚠️\n即将踢出 {len(to_kick)} 名成员，名单如下。{skipped_note}\n\n操作将在5秒后执行，此操作不可逆！")
+                await self._send_chunked(ctx, group_id, self._format_member_lines(roster, to_kick))
+                await countdown
+            finally:
+                countdown.cancel()
 
-            success, message = await self._kick_chatroom_members(group_id, to_kick)
-            if success:
-                await self.host.send_active_message(ctx.event.query.adapter, "group", group_id, MessageChain([Plain(f"✅ 操作完成：已成功踢出 {len(names)} 名成员。")]))
-            else:
-                await self.host.send_active_message(ctx.event.query.adapter, "group", group_id, MessageChain([Plain(f"❌ 踢出操作失败。原因: {message}")]))
+            engine = KickEngine(
+                lambda batch: self._send_kick_batch(group_id, batch),
+                batch_size=self.config.get('kick_batch_size', KICK_BATCH_SIZE),
+                concurrency=self.config.get('kick_concurrency', KICK_CONCURRENCY),
+                rate_per_minute=self.config.get('kick_rate_per_minute', KICK_RATE_PER_MINUTE),
+                max_retries=KICK_MAX_RETRIES,
+                logger=self.logger,
+            )
+            last_progress = time.monotonic()
+
+            async def on_progress(report: KickReport):
+                nonlocal last_progress
+                now = time.monotonic()
+                if now - last_progress < KICK_PROGRESS_INTERVAL or report.processed >= report.total:
+                    return
+                last_progress = now
+                await self.host.send_active_message(ctx.event.query.adapter, "group", group_id, MessageChain([Plain(
+                    f"⏳ 踢出进度：{report.processed}/{report.total}（成功 {len(report.removed)}，失败 {len(report.failed)}）")]))
+
+            try:
+                report = await engine.run(to_kick, skipped=skipped, on_progress=on_progress)
+            finally:
+                # 无论成败花名册都已变化，下次查询重新拉取
+                self.group_info_cache.invalidate(group_id)
+            await self._send_chunked(ctx, group_id, self._format_kick_report(roster, report))
         except Exception as e:
             self.logger.error(f"处理踢关系网命令时发生错误: {e}\n{traceback.format_exc()}")
+
+    def _format_member_lines(self, roster: Roster, wxids: Iterable[str]) -> Iterator[str]:
+        for wxid in wxids:
+            yield f" - {roster.display_name(wxid)} ({wxid})\n"
+
+    def _format_kick_report(self, roster: Roster, report: KickReport) -> Iterator[str]:
+        incomplete = report.failed or report.unconfirmed or report.not_attempted
+        icon = "✅" if not incomplete else ("⚠️" if report.removed else "❌")
+        yield (f"{icon} 操作完成（耗时 {report.elapsed:.1f} 秒，共请求 {report.requests} 次）：\n"
+               f"成功踢出 {len(report.removed)} 人，失败 {len(report.failed)} 人，跳过 {len(report.skipped)} 人。\n")
+        if report.unconfirmed:
+            yield f"另有 {len(report.unconfirmed)} 人的请求超时，可能已被移出，请稍后查询确认。\n"
+        if report.aborted is not None:
+            yield f"踢人接口不可用（{report.aborted}），已中止，{len(report.not_attempted)} 人未尝试。\n"
+        if report.failed:
+            yield "\n--- 踢出失败 ---\n"
+            for wxid, reason in report.failed.items():
+                yield f" - {roster.display_name(wxid)} ({wxid})：{reason}\n"
+        if report.unconfirmed:
+            yield "\n--- 未确认 ---\n"
+            for wxid, reason in report.unconfirmed.items():
+                yield f" - {roster.display_name(wxid)} ({wxid})：{reason}\n"
+        if report.not_attempted:
+            yield "\n--- 未尝试 ---\n"
+            for wxid in report.not_attempted:
+                yield f" - {roster.display_name(wxid)} ({wxid})\n"
+        if report.skipped:
+            yield "\n--- 已跳过 ---\n"
+            for wxid, reason in report.skipped.items():
+                yield f" - {roster.display_name(wxid)} ({wxid})：{reason}\n"
             
+    async def _handle_stats_command(self, ctx: EventContext, sender_id: str, group_id: str):
+        # 统计信息只对管理员个人开放，管理群中的普通成员无权查看
+        if sender_id not in self.ADMIN_USER_IDS:
+            return
+        await self.host.send_active_message(ctx.event.query.adapter, "group", group_id, MessageChain([Plain(self._format_stats_summary())]))
+
+    def _collect_runtime_metrics(self) -> Dict[str, float]:
+        gauges = {f"group_cache_{k}": v for k, v in self.group_info_cache.stats().items()}
+        gauges.update({f"image_cache_{k}": v for k, v in self.image_cache.stats().items()})
+        if self.render_scheduler is not None:
+            gauges.update({f"render_{k}": v for k, v in self.render_scheduler.stats().items()})
+        if self.prefetch_warmer is not None:
+            gauges.update({f"prefetch_{k}": v for k, v in self.prefetch_warmer.stats().items()})
+        gauges.update({f"render_cost_{k.replace('-', '_')}": v for k, v in self.render_cost_model.stats().items()})
+        if self.layout_cache is not None:
+            gauges.update({f"layout_cache_{k}": v for k, v in self.layout_cache.stats().items()})
+        if self.history is not None:
+            gauges.update({f"history_{k}": v for k, v in self.history.stats().items()})
+            gauges['history_pending'] = len(self._history_tasks)
+        if self.api_client is not None:
+            gauges.update({f"api_{k}": v for k, v in self.api_client.stats().items()})
+        if self.warm_start is not None:
+            gauges.update({f"warm_start_{k}": v for k, v in self.warm_start.stats().items()})
+        gauges['executor_pending'] = self._executor_pending
+        gauges['executor_running'] = self._executor_running
+        return gauges
+
+    def _format_stats_summary(self) -> str:
+        gauges = self.metrics.collect_gauges()
+        uptime = int(time.time() - self.metrics.started_at)
+        parts = [f"==== GroupInsight 运行统计 ====\n已运行 {uptime // 3600} 小时 {uptime % 3600 // 60} 分钟\n"]
+
+        parts.append("\n--- 指令耗时 (次数 / 平均 / p50 / p95) ---\n")
+        commands = self.metrics.histogram_summary('command')
+        for key, s in sorted(commands.items()):
+            parts.append(f"{dict(key).get('command')}: {s['count']} / {s['avg']:.2f}s / {s['p50']:.2f}s / {s['p95']:.2f}s\n")
+        if not commands:
+            parts.append("暂无数据\n")
+
+        parts.append("\n--- 阶段耗时 (次数 / 平均 / p95) ---\n")
+        for key, s in sorted(self.metrics.histogram_summary('stage').items()):
+            labels = dict(key)
+            variant = labels.get('profile') or labels.get('engine')
+            name = labels.get('stage') + (f"({variant})" if variant else "")
+            parts.append(f"{name}: {s['count']} / {s['avg'] * 1000:.0f}ms / {s['p95'] * 1000:.0f}ms\n")
+        for key, s in sorted(self.metrics.histogram_summary('api_request').items()):
+            parts.append(f"API {dict(key).get('endpoint')}: {s['count']} / {s['avg'] * 1000:.0f}ms / {s['p95'] * 1000:.0f}ms\n")
+
+        api_errors = self.metrics.counter_series('api_errors')
+        parts.append("\n--- API 错误 ---\n")
+        if api_errors:
+            for key, count in sorted(api_errors.items()):
+                labels = dict(key)
+                parts.append(f"{labels.get('endpoint')} [{labels.get('kind')}]: {count:g}\n")
+        else:
+            parts.append("无\n")
+        if self.api_client is not None:
+            for breaker in self.api_client.breakers.values():
+                if breaker.state == 'open':
+                    parts.append(f"{breaker.name}: 熔断中，约 {breaker.retry_after():.0f} 秒后探测（累计熔断 {breaker.opened} 次）\n")
+                elif breaker.state == 'half_open':
+                    parts.append(f"{breaker.name}: 半开探测中\n")
+                elif breaker.opened:
+                    parts.append(f"{breaker.name}: 已恢复（累计熔断 {breaker.opened} 次，拒绝 {breaker.rejected} 次）\n")
+
+        parts.append("\n--- 缓存与队列 ---\n")
+        parts.append(f"群信息缓存: {gauges.get('group_cache_entries', 0):g} 个群，命中率 {gauges.get('group_cache_hit_rate', 0):.0%}\n")
+        image_lookups = gauges.get('image_cache_memory_hits', 0) + gauges.get('image_cache_disk_hits', 0) + gauges.get('image_cache_misses', 0)
+        image_hits = gauges.get('image_cache_memory_hits', 0) + gauges.get('image_cache_disk_hits', 0)
+        parts.append(f"渲染结果缓存: 命中率 {image_hits / image_lookups if image_lookups else 0:.0%}\n")
+        if self.layout_cache is not None:
+            parts.append(f"布局复用: {gauges.get('layout_cache_entries', 0):g} 张图，增量绘制 {gauges.get('layout_cache_reused', 0):g} 次，"
+                         f"变化过多重新布局 {gauges.get('layout_cache_relayouts', 0):g} 次\n")
+        roster_events = self.metrics.counter_series('roster_events')
+        if roster_events:
+            results: Dict[str, float] = {}
+            for key, count in roster_events.items():
+                result = dict(key).get('result')
+                results[result] = results.get(result, 0) + count
+            parts.append(f"成员变动通知: 直接应用 {results.get('applied', 0):g} 条，转为刷新 {results.get('refresh', 0):g} 条，"
+                         f"非系统通知转为刷新 {results.get('untrusted', 0):g} 条，忽略 {results.get('uncached', 0) + results.get('unchanged', 0):g} 条\n")
+        if self.warm_start is not None:
+            parts.append(f"启动预热: 已恢复 {gauges.get('warm_start_restored', 0):g} 个群，待恢复 {gauges.get('warm_start_pending', 0):g} 个，"
+                         f"上次保存 {gauges.get('warm_start_saved_groups', 0):g} 个群\n")
+        parts.append(f"渲染: 进行中 {gauges.get('render_in_flight', 0):g}，排队 {gauges.get('render_queue_depth', 0):g}，"
+                     f"超时 {gauges.get('render_timeouts', 0):g}，拒绝 {gauges.get('render_rejected', 0):g}\n")
+        parts.append(f"线程池: 执行中 {gauges.get('executor_running', 0):g}，排队 {gauges.get('executor_pending', 0):g}")
+        return "".join(parts)
+
     async def _handle_help_command(self, ctx: EventContext, group_id: str):
         help_message = f"""==== GroupInsight 插件 ====
 > By: 俊宏 | v1.1.0 
@@ -372,249 +981,608 @@ class GroupInsightPlugin(BasePlugin):
    {TRIGGER_KEYWORD}到 <目标群ID>
    {TRIGGER_KEYWORD} <群ID> 到 <目标群ID>
 
-2️⃣ 查询关系网络 
+2️⃣ 查询关系网络 (成员ID 也可以是昵称，含空格的昵称请加引号)
    {TRIGGER_KEYWORD_NETWORK} <成员ID>
    {TRIGGER_KEYWORD_NETWORK} <成员ID> 在 <数据源群ID>
    {TRIGGER_KEYWORD_NETWORK} <成员ID> 到 <目标群ID>
    {TRIGGER_KEYWORD_NETWORK} <成员ID> 在 <源群ID> 到 <目标群ID>
 
-3️⃣ 踢出指定成员
+3️⃣ 踢出指定成员 (昵称须完整)
    {TRIGGER_KEYWORD_KICK_MEMBER} <成员ID>
 
 4️⃣ 踢出关系网 (⚠️高危)
    {TRIGGER_KEYWORD_KICK_DOWNLINE} <成员ID>
+
+5️⃣ 分页生成邀请关系图 (适合超大群)
+   {TRIGGER_KEYWORD_PAGED}
+   {TRIGGER_KEYWORD_PAGED} <群ID>
+   {TRIGGER_KEYWORD_PAGED}到 <目标群ID>
+   {TRIGGER_KEYWORD_PAGED} <群ID> 到 <目标群ID>
+
+6️⃣ 插件运行统计 (仅管理员)
+   {TRIGGER_KEYWORD_STATS}
+
+7️⃣ 跨群查询关系网 (所有管理群)
+   {TRIGGER_KEYWORD_CROSS_NETWORK} <成员ID>
+   {TRIGGER_KEYWORD_CROSS_NETWORK} <成员ID> 到 <目标群ID>
+
+8️⃣ 群邀请统计 (不生成图片)
+   {TRIGGER_KEYWORD_GROUP_STATS}
+   {TRIGGER_KEYWORD_GROUP_STATS} <群ID>
+   {TRIGGER_KEYWORD_GROUP_STATS}到 <目标群ID>
+   {TRIGGER_KEYWORD_GROUP_STATS} <群ID> 到 <目标群ID>
+
+9️⃣ 邀请入群记录 (需开启历史记录)
+   {TRIGGER_KEYWORD_JOIN_HISTORY} <成员ID>
+   {TRIGGER_KEYWORD_JOIN_HISTORY} <成员ID> <天数>
 """
         await self.host.send_active_message(ctx.event.query.adapter, "group", group_id, MessageChain([Plain(help_message)]))
     
-    # ... (其他辅助函数 _get_member_display_name, _fetch_group_details,等保持不变) ...
-    def _get_member_display_name(self, member_list: List[Dict[str, Any]], wxid: str) -> str:
-        for member in member_list:
-            if member and member.get('user_name') == wxid:
-                return self._clean_whitespace_and_special_chars(member.get('nick_name', '') or wxid)
-        return wxid
-
-    async def _fetch_group_details(self, group_id: str) -> Optional[Dict[str, Any]]:
+    # ... (其他辅助函数 _fetch_group_snapshot,等保持不变) ...
+    async def _fetch_group_snapshot(self, group_id: str, force_refresh: bool = False) -> Optional[GroupSnapshot]:
         normalized_id = self._normalize_group_id(group_id)
-        if normalized_id in self.group_info_cache:
-            timestamp, data = self.group_info_cache[normalized_id]
-            if time.time() - timestamp < CACHE_DURATION:
-                return data
-
-        url = f"{self.API_BASE_URL}/group/GetChatRoomInfo?key={self.API_KEY}"
-        payload = {"ChatRoomWxIdList": [normalized_id]}
-        loop = asyncio.get_running_loop()
-        
+        self._touch_recent_groups([normalized_id])
+        await self._restore_warm_snapshots([normalized_id])
+        return await self.group_info_cache.get(
+            normalized_id, lambda: self._load_group_snapshot(normalized_id), force_refresh=force_refresh
+        )
+
+    async def _fetch_group_snapshots(self, group_ids: List[str], force_refresh: bool = False) -> Dict[str, Optional[GroupSnapshot]]:
+        """批量获取多个群的快照：命中缓存的直接返回，其余合并为尽量少的 GetChatRoomInfo 请求。"""
+        normalized_ids = [self._normalize_group_id(gid) for gid in group_ids if gid]
+        self._touch_recent_groups(normalized_ids)
+        await self._restore_warm_snapshots(normalized_ids)
+        return await self.group_info_cache.get_many(normalized_ids, self._load_group_snapshots, force_refresh=force_refresh)
+
+    async def _restore_warm_snapshots(self, normalized_ids: List[str]):
+        """
+        【新增】尚未进入缓存的群先从预热文件恢复上次的快照，并按已过期写入缓存：
+        本次查询直接使用旧快照（stale-while-revalidate），同时由缓存在后台重新拉取。
+        """
+        if self.warm_start is None:
+            return
+        missing = [gid for gid in normalized_ids if gid not in self.group_info_cache]
+        if not missing:
+            return
+        snapshots = await self.warm_start.take(missing)
+        stale_at = time.time() - self.group_info_cache.ttl
+        for gid, snapshot in snapshots.items():
+            if gid not in self.group_info_cache:
+                self.group_info_cache.put(gid, snapshot, fetched_at=stale_at)
+
+    async def _warm_start_loop(self):
+        while True:
+            await asyncio.sleep(WARM_START_SAVE_INTERVAL)
+            await self._save_warm_start()
+
+    async def _save_warm_start(self):
+        snapshots = self.group_info_cache.values()
+        signature = tuple((s.group_id, s.fetched_at) for s in snapshots)
+        if signature == self._warm_start_saved:
+            return
+        with self.metrics.span('warm_start_save'):
+            count = await self.warm_start.save(snapshots)
+        if count is not None:
+            self._warm_start_saved = signature
+            self.logger.debug(f"群快照预热文件已保存: {count} 个群")
+
+    def _touch_recent_groups(self, normalized_ids: List[str]):
+        now = time.time()
+        for gid in normalized_ids:
+            self._recent_groups[gid] = now
+            self._recent_groups.move_to_end(gid)
+        while len(self._recent_groups) > CACHE_MAX_GROUPS:
+            self._recent_groups.popitem(last=False)
+
+    def _prefetch_targets(self) -> List[str]:
+        """预取目标：配置的群、作为管理群写入 admin_user_ids 的群，以及最近被查询过的群。"""
+        targets = self._managed_group_ids()
+        cutoff = time.time() - PREFETCH_RECENT_WINDOW
+        targets.extend(gid for gid, used_at in reversed(self._recent_groups.items()) if used_at >= cutoff)
+        return targets
+
+    async def _prefetch_refresh(self, normalized_ids: List[str]):
+        """刷新到下一轮预取前会过期的群，并预先构建邀请关系索引。"""
+        cache = self.group_info_cache
+        interval = self.prefetch_warmer.interval if self.prefetch_warmer else PREFETCH_INTERVAL
+        due = [gid for gid in normalized_ids if (fresh_for := cache.fresh_for(gid)) is None or fresh_for <= interval]
+        if not due:
+            return
+        with self.metrics.span('prefetch'):
+            snapshots = await cache.refresh_many(due, self._load_group_snapshots)
+            for snapshot in snapshots.values():
+                if snapshot is not None:
+                    await self._get_graph(snapshot)
+        self.metrics.inc('prefetch_groups', len(due))
+
+    async def _handle_roster_notice(self, ctx: EventContext, raw_msg: str):
+        """
+        【新增】把入群 / 退群 / 移出通知直接应用到已缓存的花名册，省去一次完整拉取。
+        通知中的成员无法唯一确定时（纯文本通知只有昵称、邀请人是机器人自己等），合并到稍后的一次后台刷新。
+        只有平台的系统通知（见 _is_notice_sender）才会直接修改花名册；其他发送者发出的同样文字
+        只触发一次刷新，以 API 返回的成员列表为准，群成员无法借此伪造他人退群。
+        """
+        event = parse_roster_event(raw_msg)
+        if event is None:
+            return
         try:
-            response = await loop.run_in_executor(
-                None, 
-                lambda: requests.post(url, json=payload, timeout=15)
-            )
-            response.raise_for_status()
-            data = response.json()
-            
-            if data.get("Code") == 200 and data.get("Data", {}).get("contactCount", 0) > 0:
-                group_data = data["Data"]["contactList"][0]
-                self.group_info_cache[normalized_id] = (time.time(), group_data)
-                return group_data
-            
-            self.logger.error(f"API 请求群组 {normalized_id} 返回错误: {data}")
+            group_id = self._normalize_group_id(str(ctx.event.query.launcher_id))
+            sender_id = str(ctx.event.sender_id)
+        except AttributeError:
+            return
+        async with self._roster_event_lock:
+            snapshot = self.group_info_cache.peek(group_id)
+            if snapshot is None:
+                # 未缓存的群下次查询时本来就会完整拉取
+                result = 'uncached'
+            elif not self._is_notice_sender(sender_id, group_id):
+                result = 'untrusted'
+            else:
+                result = await self._apply_roster_event(snapshot, event)
+        if result in ('refresh', 'untrusted'):
+            self._schedule_event_refresh(group_id)
+        self.metrics.inc('roster_events', kind=event.kind, result=result)
+        self.logger.debug(f"群 {group_id} 成员变动通知 [{event.kind}]: {result}")
+
+    def _is_notice_sender(self, sender_id: str, group_id: str) -> bool:
+        """系统通知没有成员发送者：适配器给出的发送者为空或为群本身；其他平台账号可通过 roster_event_senders 配置。"""
+        if sender_id in ('', 'None', group_id, group_id[:-len('@chatroom')]):
+            return True
+        return sender_id in self.roster_event_senders
+
+    async def _apply_roster_event(self, snapshot: GroupSnapshot, event: RosterEvent) -> str:
+        search_index = await self._get_search_index(snapshot)
+        roster = snapshot.roster
+
+        def resolve(ref: MemberRef) -> Optional[str]:
+            if ref.wxid is not None:
+                return ref.wxid
+            if ref is SELF or not ref.name:
+                return None
+            hits = search_index.search(ref.name, limit=2)
+            return hits[0].wxid if len(hits) == 1 and hits[0].kind == EXACT else None
+
+        if event.kind == JOIN:
+            if any(ref.wxid is None for ref in event.members) or event.inviter is None:
+                return 'refresh'
+            inviter_id = resolve(event.inviter)
+            if inviter_id is None:
+                return 'refresh'
+            joined = [(ref.wxid, ref.name, inviter_id) for ref in event.members
+                      if ref.wxid not in roster or roster.inviter[roster.index[ref.wxid]] < 0]
+            left: List[str] = []
+        else:
+            left = [resolve(ref) for ref in event.members]
+            if not left or None in left:
+                return 'refresh'
+            left = [wxid for wxid in left if wxid in roster]
+            joined = []
+        if not joined and not left:
+            return 'unchanged'
+
+        def build() -> Tuple[Roster, MemberSearchIndex]:
+            updated = roster.with_changes(joined, left)
+            return updated, MemberSearchIndex(updated)
+
+        updated, updated_index = await self._run_blocking('roster_event', build)
+        if self.group_info_cache.peek(snapshot.group_id) is not snapshot:
+            # 构建期间缓存已被一次完整拉取替换，无法判断其是否已包含本次变动，改为再刷新一次
+            return 'refresh'
+        # 邀请关系索引不做原地修补（插入 / 删除节点会改变欧拉序下标），由新快照在首次使用时重建
+        updated_snapshot = GroupSnapshot(snapshot.group_id, updated, search_index=updated_index,
+                                         reconciled_at=snapshot.reconciled_at)
+        # 以上次完整拉取的时间写入，并把新鲜期延长为核对间隔：期间的查询直接使用增量更新的花名册
+        self.group_info_cache.put(snapshot.group_id, updated_snapshot, fetched_at=snapshot.reconciled_at,
+                                  ttl=max(self.roster_reconcile_interval, self.group_info_cache.ttl))
+        self._record_history([updated_snapshot])
+        return 'applied'
+
+    def _schedule_event_refresh(self, group_id: str):
+        self._event_refresh_groups.add(group_id)
+        if self._event_refresh_task is None or self._event_refresh_task.done():
+            self._event_refresh_task = asyncio.ensure_future(self._event_refresh_later())
+
+    async def _event_refresh_later(self):
+        await asyncio.sleep(ROSTER_EVENT_REFRESH_DELAY)
+        group_ids = list(self._event_refresh_groups)
+        self._event_refresh_groups.clear()
+        if group_ids and self.api_client is not None:
+            await self.group_info_cache.refresh_many(group_ids, self._load_group_snapshots)
+
+    async def _load_group_snapshot(self, normalized_id: str) -> Optional[GroupSnapshot]:
+        group_data = await self._request_group_details(normalized_id)
+        if not group_data:
             return None
+        roster, search_index = await self._run_blocking('roster', self._build_roster, normalized_id, group_data)
+        snapshot = GroupSnapshot(normalized_id, roster, search_index=search_index)
+        self._record_history([snapshot])
+        return snapshot
+
+    async def _load_group_snapshots(self, normalized_ids: List[str]) -> Dict[str, GroupSnapshot]:
+        groups = await self._request_groups_details(normalized_ids)
+        rosters = await self._run_blocking(
+            'roster', lambda: {gid: self._build_roster(gid, data) for gid, data in groups.items()}
+        )
+        snapshots = {gid: GroupSnapshot(gid, roster, search_index=search_index)
+                     for gid, (roster, search_index) in rosters.items()}
+        self._record_history(list(snapshots.values()))
+        return snapshots
+
+    @staticmethod
+    def _build_roster(group_id: str, group_data: Dict[str, Any]) -> Tuple[Roster, MemberSearchIndex]:
+        """在线程池中执行：花名册与昵称检索索引随每次拉取一起构建。"""
+        roster = Roster.from_group_data(group_id, group_data)
+        return roster, MemberSearchIndex(roster)
+
+    def _record_history(self, snapshots: List[GroupSnapshot]):
+        """在后台把新拉取的花名册写入历史库，不阻塞指令；花名册未变化的群在 RosterHistory 内直接跳过。"""
+        if self.history is None:
+            return
+        for snapshot in snapshots:
+            task = asyncio.ensure_future(self._record_snapshot(snapshot))
+            self._history_tasks.add(task)
+            task.add_done_callback(self._history_tasks.discard)
+
+    async def _record_snapshot(self, snapshot: GroupSnapshot):
+        try:
+            with self.metrics.span('stage', stage='history'):
+                diff = await self.history.record(snapshot.roster, snapshot.fetched_at)
+            if diff and (diff.joined or diff.left or diff.renamed):
+                self.logger.info(f"群 {snapshot.group_id} 成员变化：入群 {diff.joined}，退群 {diff.left}，改名 {diff.renamed}")
         except Exception as e:
-            self.logger.error(f"获取群 {normalized_id} 信息时出错: {e}")
-            return None
+            self.logger.error(f"写入群 {snapshot.group_id} 的花名册历史时出错: {e}")
+
+    async def _history_records(self, group_id: str, wxids: List[str]) -> Dict[str, MemberRecord]:
+        if self.history is None:
+            return {}
+        try:
+            return await self.history.lookup_members(group_id, wxids)
+        except Exception as e:
+            self.logger.error(f"查询群 {group_id} 的花名册历史时出错: {e}")
+            return {}
+
+    async def _former_invitees(self, group_id: str, inviter: str) -> List[MemberRecord]:
+        if self.history is None:
+            return []
+        try:
+            return await self.history.former_invitees(group_id, inviter)
+        except Exception as e:
+            self.logger.error(f"查询群 {group_id} 的花名册历史时出错: {e}")
+            return []
+
+    async def _leaver_names(self, graph: InviteGraph) -> Dict[str, str]:
+        """图中已退群邀请人的 wxid -> 退群前的昵称（仅历史库中有记录的）。"""
+        records = await self._history_records(graph.roster.group_id, graph.ids[graph.member_count:])
+        return {wxid: record.nickname for wxid, record in records.items() if record.nickname}
+
+    async def _request_group_details(self, normalized_id: str) -> Optional[Dict[str, Any]]:
+        return (await self._request_group_chunk([normalized_id])).get(normalized_id)
+
+    async def _request_groups_details(self, normalized_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        chunks = [normalized_ids[i:i + CHATROOM_BATCH_SIZE] for i in range(0, len(normalized_ids), CHATROOM_BATCH_SIZE)]
+        results = await asyncio.gather(*(self._request_group_chunk(chunk) for chunk in chunks))
+        merged = {}
+        for result in results:
+            merged.update(result)
+        return merged
+
+    async def _request_group_chunk(self, normalized_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        try:
+            with self.metrics.span('stage', stage='fetch'):
+                data = await self.api_client.get_chatroom_info(normalized_ids)
+            
+            if data.get("Code") != 200 or data.get("Data", {}).get("contactCount", 0) <= 0:
+                self.metrics.inc('api_errors', endpoint='GetChatRoomInfo', kind='business')
+                self.logger.error(f"API 请求群组 {normalized_ids} 返回错误: {data}")
+                return {}
+
+            contact_list = data["Data"].get("contactList") or []
+            groups = {}
+            for index, contact in enumerate(contact_list):
+                if not isinstance(contact, dict): continue
+                chatroom_id = (contact.get('userName') or {}).get('str')
+                if not chatroom_id and len(contact_list) == len(normalized_ids):
+                    chatroom_id = normalized_ids[index]
+                if chatroom_id in normalized_ids:
+                    groups[chatroom_id] = contact
+            missing = set(normalized_ids) - groups.keys()
+            if missing:
+                self.logger.warning(f"API 未返回以下群组的信息: {sorted(missing)}")
+            return groups
+        except WeChatPadCircuitOpen as e:
+            self.logger.warning(f"跳过获取群 {normalized_ids} 信息: {e}")
+            return {}
+        except Exception as e:
+            self.logger.error(f"获取群 {normalized_ids} 信息时出错: {e}")
+            return {}
     
     async def _kick_chatroom_members(self, group_id: str, member_ids: List[str]) -> Tuple[bool, str]:
-        url = f"{self.API_BASE_URL}/group/SendDelDelChatRoomMember?key={self.API_KEY}"
-        payload = {
-            "ChatRoomName": self._normalize_group_id(group_id),
-            "UserList": member_ids
-        }
-        loop = asyncio.get_running_loop()
         try:
-            response = await loop.run_in_executor(
-                None,
-                lambda: requests.post(url, json=payload, timeout=20)
-            )
-            response.raise_for_status()
-            data = response.json()
-            if data.get("Code") == 200:
-                return True, "操作成功"
-            else:
-                error_message = data.get("Text", "未知API错误")
-                return False, error_message
+            return await self._send_kick_batch(group_id, member_ids)
+        except KickTransportError as e:
+            return False, str(e)
+
+    async def _send_kick_batch(self, group_id: str, member_ids: List[str]) -> Tuple[bool, str]:
+        """KickEngine 的发送回调：接口的业务答复返回 (是否成功, 原因)，请求未得到答复时抛出 KickTransportError 及其子类。"""
+        try:
+            data = await self.api_client.del_chatroom_members(self._normalize_group_id(group_id), member_ids)
+        except WeChatPadCircuitOpen as e:
+            self.logger.warning(f"跳过踢人请求: {e}")
+            raise KickUnavailable("API 暂不可用（熔断中），请稍后再试") from e
+        except WeChatPadTimeout as e:
+            self.logger.warning(f"踢人请求超时: {e}")
+            raise KickTimeout("请求超时，无法确认是否已移出") from e
         except Exception as e:
             self.logger.error(f"调用踢人API时出错: {e}")
-            return False, "网络请求失败或API异常"
+            raise KickTransportError("网络请求失败或API异常") from e
+        if data.get("Code") == 200:
+            return True, "操作成功"
+        self.metrics.inc('api_errors', endpoint='SendDelDelChatRoomMember', kind='business')
+        return False, data.get("Text", "未知API错误")
 
-    def _build_invite_relationship(self, member_list: List[Dict[str, Any]]) -> Tuple[Dict[str, str], Dict[str, List[str]]]:
-        parent_map, children_map = {}, defaultdict(list)
-        for member in member_list:
-            if not isinstance(member, dict): continue
-            
-            inviter = member.get('unknow')
-            invitee = member.get('user_name')
-
-            if isinstance(inviter, str) and inviter.strip() and isinstance(invitee, str) and invitee.strip():
-                parent_map[invitee] = inviter
-                children_map[inviter].append(invitee)
-                
-        return parent_map, children_map
-    
-    def _get_member_direct_network(self, member_id: str, parent_map: Dict, children_map: Dict, members_map: Dict) -> Optional[Tuple[List[str], Dict[str, str]]]:
+    async def _get_graph(self, snapshot: GroupSnapshot) -> InviteGraph:
+        """快照的邀请关系索引；首次使用时在线程池中构建，避免大群阻塞事件循环。"""
+        if snapshot.has_graph:
+            return snapshot.graph
+        return await self._run_blocking('graph', lambda: snapshot.graph)
+
+    async def _get_search_index(self, snapshot: GroupSnapshot) -> MemberSearchIndex:
+        """快照的昵称检索索引；拉取时已预先构建，从预热文件恢复的快照在首次使用时于线程池中构建。"""
+        if snapshot.has_search_index:
+            return snapshot.search_index
+        return await self._run_blocking('search_index', lambda: snapshot.search_index)
+
+    async def search_members(self, query: str, group_ids: Optional[List[str]] = None) -> List[SearchHit]:
+        """按 wxid 或昵称（精确、前缀、子串、模糊）查找在群成员；group_ids 为空时在所有已缓存的群中查找。"""
+        if group_ids is None:
+            snapshots = self.group_info_cache.values()
+        else:
+            snapshots = [snap for snap in (await self._fetch_group_snapshots(group_ids)).values() if snap is not None]
+        return await self._search_snapshots(query, snapshots)
+
+    async def _search_snapshots(self, query: str, snapshots: List[GroupSnapshot]) -> List[SearchHit]:
+        indexes = [await self._get_search_index(snap) for snap in snapshots]
+        with self.metrics.span('stage', stage='member_search'):
+            return search_groups(indexes, query)
+
+    async def _resolve_member(self, ctx: EventContext, reply_group_id: str, query: str, snapshots: List[GroupSnapshot],
+                              exact_only: bool = False) -> Optional[str]:
+        """
+        【新增】把指令中的成员参数解析为 wxid。参数本身是某个群中的 wxid 时直接使用，否则按昵称检索：
+        唯一匹配时返回该成员；多人匹配时回复候选列表并返回 None。exact_only（踢人类高危指令）要求昵称完全一致。
+        没有任何匹配时原样返回，由各指令按 wxid 处理并给出原有的提示。
+        """
+        if any(query in snap.roster.index for snap in snapshots):
+            return query
+        hits = await self._search_snapshots(query, snapshots)
+        if not hits:
+            return query
+        if len(hits) == 1 and (hits[0].kind == EXACT or not exact_only):
+            return hits[0].wxid
+        if hits[0].kind == EXACT:
+            header = f"昵称为 '{query}' 的成员有 {len(hits)} 位，请改用 wxid 重新发送指令："
+        elif exact_only:
+            header = f"没有昵称完全为 '{query}' 的成员，此指令需要完整昵称或 wxid。可能是："
+        else:
+            header = f"'{query}' 匹配到多位成员，请使用更完整的昵称或 wxid 重新发送指令："
+        lines = [header + "\n", *(f"- {hit.name} ({hit.wxid})\n" for hit in hits)]
+        if len(hits) >= MAX_HITS:
+            lines.append(f"（仅列出最相近的 {MAX_HITS} 位）\n")
+        await self._send_chunked(ctx, reply_group_id, lines)
+        return None
+
+    async def _run_blocking(self, stage: str, func, *args):
+        """在默认线程池中执行 CPU 密集的步骤，并记录排队与执行耗时。"""
+        submitted = time.perf_counter()
+        with self._executor_lock:
+            self._executor_pending += 1
+
+        def run():
+            started = time.perf_counter()
+            with self._executor_lock:
+                self._executor_pending -= 1
+                self._executor_running += 1
+            try:
+                return func(*args), started
+            finally:
+                with self._executor_lock:
+                    self._executor_running -= 1
+
+        result, started = await asyncio.get_running_loop().run_in_executor(None, run)
+        self.metrics.observe('executor_wait', started - submitted, stage=stage)
+        self.metrics.observe('stage', time.perf_counter() - started, stage=stage)
+        return result
+
+    def _get_member_direct_network(self, member_id: str, graph: InviteGraph,
+                                   leaver_names: Optional[Dict[str, str]] = None) -> Optional[Tuple[List[str], Dict[str, str]]]:
         try:
-            upstream_path, current, visited = [], member_id, {member_id}
-            max_depth = 50
-            for _ in range(max_depth):
-                inviter = parent_map.get(current)
-                if not inviter: break
-                if inviter in visited:
-                    upstream_path.insert(0, f"⚠️循环于: {inviter}")
-                    break
-                display_name = members_map.get(inviter, f"已退群({inviter[:12]}...)")
-                upstream_path.insert(0, f"{display_name} ({inviter})")
-                visited.add(inviter)
-                current = inviter
-            else:
-                 upstream_path.insert(0, "⚠️路径过深")
+            v = graph.index[member_id]
+            upstream_path = []
+            cycle_inviter = graph.cycle_entry(v)
+            if cycle_inviter is not None:
+                upstream_path.append(f"⚠️循环于: {graph.ids[cycle_inviter]}")
+            for u in graph.upstream(v):
+                inviter = graph.ids[u]
+                if graph.is_member(u):
+                    display_name = graph.names[u]
+                elif leaver_names and inviter in leaver_names:
+                    display_name = f"已退群: {leaver_names[inviter]}"
+                else:
+                    display_name = f"已退群({inviter[:12]}...)"
+                upstream_path.append(f"{display_name} ({inviter})")
 
-            downstream_map = {}
-            for child in children_map.get(member_id, []):
-                if child in members_map:
-                    downstream_map[child] = members_map[child]
-            
+            downstream_map = {graph.ids[c]: graph.names[c] for c in graph.invitees(v) if graph.is_member(c)}
             return upstream_path, downstream_map
         except Exception as e:
             self.logger.error(f"查询直接关系网时发生异常: {e}")
             return None
 
-    def _get_recursive_downstream(self, member_id: str, parent_map: Dict, children_map: Dict, members_map: Dict) -> Optional[Dict[str, str]]:
+    def _get_recursive_downstream(self, member_id: str, graph: InviteGraph) -> Optional[Dict[str, str]]:
         try:
-            downstream_map, queue, visited = {}, deque([member_id]), {member_id}
-            max_nodes = 500
-            count = 0
-            while queue:
-                if count > max_nodes: break
-                current_node = queue.popleft()
-                count += 1
-                for child in children_map.get(current_node, []):
-                    if child in visited: continue
-                    if parent_map.get(child) != current_node: continue
-                    if child in members_map:
-                        visited.add(child)
-                        downstream_map[child] = members_map[child]
-                        queue.append(child)
-            return downstream_map
+            v = graph.index[member_id]
+            # 邀请环在被查询的成员处断开，与花名册顺序无关
+            return {graph.ids[u]: graph.names[u] for u in graph.full_downline(v) if graph.is_member(u)}
         except Exception as e:
             self.logger.error(f"递归查询下游时发生异常: {e}")
             return None
     
-    async def _generate_invite_tree_image(self, member_list: list, filename_id: str, group_name: str, ctx: EventContext) -> Optional[str]:
-        loop = asyncio.get_running_loop()
+    async def _generate_invite_tree_image(self, graph: InviteGraph, filename_id: str, group_name: str, ctx: EventContext,
+                                          plan: Optional[RenderPlan] = None, leaver_names: Optional[Dict[str, str]] = None) -> Optional[bytes]:
+        """
+        【重构】按渲染预算自适应选择画质：从默认档位开始依次尝试，跳过预估耗时超出剩余预算的档位，
+        某一档超时则降级到下一档。所有档位都失败时抛出 RenderBudgetExceeded，由调用方改发文字版邀请树。
+        render_budget 配置为 0 时只尝试默认档位，时限为 RENDER_TIMEOUT。
+        """
         try:
-            render_task = loop.run_in_executor(None, self._render_graph, member_list, filename_id, group_name)
-            return await asyncio.wait_for(render_task, timeout=RENDER_TIMEOUT)
-        except asyncio.TimeoutError:
-            self.logger.error(f"渲染图片超时（超过 {RENDER_TIMEOUT} 秒）")
+            plan = plan or plan_render(graph)
+            if leaver_names is None:
+                leaver_names = await self._leaver_names(graph)
+            ladder = render_ladder(graph, plan)
+            if not self.render_budget:
+                ladder = ladder[:1]
+            deadline = RenderDeadline(self.render_budget)
+            # 花名册与渲染参数均未变化时直接复用之前的结果（任一档位均可，优先画质高的）；并发的相同请求也共享同一次渲染
+            render_keys = [render_cache_key(graph, group_name, plan, profile.engine, profile.graph_attrs, profile.fmt, leaver_names)
+                           for profile in ladder]
+            cached_key, cached = await self.image_cache.get_first(render_keys)
+            if cached is not None:
+                self.logger.info(f"群 {filename_id} 的邀请关系图命中渲染缓存（{ladder[render_keys.index(cached_key)].name}）")
+                return cached
+
+            work = RenderCostModel.work(plan.node_count, plan_edge_count(graph, plan))
+            # 【新增】较大的图缓存节点坐标，花名册小幅变化时只为新节点找位置，跳过整张图的布局
+            # 分页时以子树根的 wxid 区分各页：节点下标随花名册变化，不能用作跨快照的键
+            layout_key = (filename_id, graph.ids[plan.subtree_root] if plan.subtree_root is not None else None)
+            topology = None
+            if self.layout_cache is not None and plan.node_count >= LAYOUT_REUSE_MIN_NODES:
+                topology = plan_topology(graph, plan)
+            for profile, render_key in zip(ladder, render_keys):
+                positions = self.layout_cache.lookup(layout_key, profile.name, *topology) if topology else None
+                timeout = RENDER_TIMEOUT
+                if self.render_budget and positions is None:
+                    estimate = self.render_cost_model.estimate(profile, work)
+                    remaining = deadline.remaining
+                    if not self.render_cost_model.fits(estimate, remaining):
+                        self.metrics.inc('render_attempts', profile=profile.name, outcome='skipped')
+                        self.logger.info(f"群 {filename_id} 的关系图以 {profile.name} 渲染预计需 {estimate:.1f} 秒，超出剩余预算 {remaining:.1f} 秒，跳过")
+                        continue
+                    timeout = self.render_cost_model.attempt_timeout(estimate, remaining, RENDER_TIMEOUT)
+
+                observer = functools.partial(self._observe_render, profile, work)
+                try:
+                    with self.metrics.span('stage', stage='render', engine=profile.engine, profile=profile.name):
+                        image_bytes = await self._render_profile(graph, filename_id, group_name, plan, leaver_names, profile,
+                                                                 render_key, timeout, observer, layout_key, topology, positions)
+                except RenderTimeout:
+                    self.metrics.inc('render_attempts', profile=profile.name, outcome='timeout')
+                    if not self.render_budget:
+                        raise
+                    self.logger.warning(f"群 {filename_id} 的关系图以 {profile.name} 渲染超过 {timeout:.0f} 秒，降级重试")
+                    continue
+                if image_bytes is None:
+                    return None
+                self.metrics.inc('render_attempts', profile=profile.name, outcome='ok')
+                await self.image_cache.put(render_key, image_bytes)
+                return image_bytes
+            self.metrics.inc('render_text_fallbacks')
+            raise RenderBudgetExceeded(f"群 {filename_id} 的关系图在 {self.render_budget} 秒预算内无法完成")
+        except RenderBudgetExceeded:
+            raise
+        except RenderTimeout:
+            self.logger.error(f"渲染图片超时（超过 {RENDER_TIMEOUT} 秒），Graphviz 进程已终止")
             await self.host.send_active_message(ctx.event.query.adapter, "group", ctx.event.query.launcher_id, MessageChain([Plain("生成关系图超时，可能群成员过多或服务器负载过高。")]))
             return None
+        except RenderQueueFull:
+            self.logger.warning(f"渲染队列已满，拒绝群 {filename_id} 的渲染请求")
+            await self.host.send_active_message(ctx.event.query.adapter, "group", ctx.event.query.launcher_id, MessageChain([Plain("当前渲染任务过多，请稍后再试。")]))
+            return None
         except Exception as e:
             self.logger.error(f"渲染 Graphviz 图片时发生未知异常: {e}")
             return None
 
-    def _render_graph(self, member_list: list, group_id: str, group_name: str) -> Optional[str]:
-        if graphviz is None:
-            return None
-
-        try:
-            cleaned_member_list = [m for m in member_list if m and isinstance(m, dict) and m.get('user_name')]
-            if not cleaned_member_list:
-                self.logger.warning(f"渲染中止：群 {group_id} 清理后的成员列表为空。")
-                return None
-            
-            if len(cleaned_member_list) > MAX_NODES_TO_RENDER:
-                self.logger.warning(f"渲染中止：群成员数量 ({len(cleaned_member_list)}) 超过最大渲染限制 ({MAX_NODES_TO_RENDER})。")
+    async def _render_profile(self, graph: InviteGraph, filename_id: str, group_name: str, plan: RenderPlan,
+                              leaver_names: Dict[str, str], profile: RenderProfile, render_key: str, timeout: float, observer,
+                              layout_key: Tuple, topology: Optional[Tuple[List[str], Dict[str, Optional[str]]]],
+                              positions: Optional[Dict[str, NodeBox]]) -> Optional[bytes]:
+        """
+        【新增】以指定档位渲染一张图。topology 为空（未开启布局复用或图较小）时照常由原引擎一次完成；
+        否则先让原引擎只输出 plain 布局并缓存节点坐标，再由 neato -n2 按坐标绘制。
+        positions 不为空表示已有可复用的布局（只为新节点找了位置），直接按坐标绘制，不再计算布局。
+        两步渲染时 timeout 由两步共用，observer 收到两步的合计耗时，与代价模型按单次渲染规划的预算一致。
+        """
+        started = time.monotonic()
+        layout_seconds: Optional[float] = None
+        if topology is not None and positions is None:
+            dot = await self._run_blocking('dot', self._build_invite_digraph, graph, filename_id, group_name, plan,
+                                           leaver_names, profile.engine, profile.graph_attrs)
+            if dot is None:
                 return None
 
-            members_map = {m['user_name']: self._clean_whitespace_and_special_chars(m.get('nick_name', '') or m['user_name']) for m in cleaned_member_list}
-            all_in_group = set(members_map.keys())
-            parent_map, children_map = self._build_invite_relationship(cleaned_member_list)
-            
-            all_ids_in_graph = all_in_group.union(children_map.keys()).union(parent_map.values())
-            if not all_ids_in_graph:
-                self.logger.warning(f"无法为群 {group_id} 确定任何图节点，渲染中止。")
-                return None
+            def observe_layout(seconds: float, timed_out: bool):
+                nonlocal layout_seconds
+                layout_seconds = seconds
+                if timed_out:
+                    observer(seconds, True)
 
-            # --- 【重构】引擎选择与图属性设置 ---
-            engine = 'dot'
-            graph_attrs = GRAPH_ATTR_DOT.copy()
-            max_inviter = None
-            if children_map:
-                max_inviter = max(children_map, key=lambda k: len(children_map[k]))
-                max_invite_count = len(children_map[max_inviter])
-                group_size = len(cleaned_member_list)
-                
-                if (max_invite_count >= STAR_GRAPH_THRESHOLD_ABSOLUTE and 
-                   (max_invite_count / group_size) >= STAR_GRAPH_THRESHOLD_RATIO):
-                    engine = 'twopi'
-                    graph_attrs = GRAPH_ATTR_TWOPI.copy()
-                    graph_attrs['root'] = max_inviter
-            
-            self.logger.info(f"为群 {group_id} 选择的渲染引擎: {engine}")
-            
-            # --- 【重构】创建扁平、稳健的图 ---
-            dot = graphviz.Digraph(f'invite_tree_{group_id}', engine=engine)
-            
-            # 设置图、节点、边的全局属性
-            dot.attr('graph', **graph_attrs)
-            dot.attr('node', **NODE_ATTR)
-            dot.attr('edge', **EDGE_ATTR)
-
-            # 使用 graph 的 label 属性设置标题，这是最稳健的方式
-            tz_utc_8 = timezone(timedelta(hours=8), name='Asia/Shanghai')
-            current_date = datetime.now(tz_utc_8).strftime("%Y年%m月%d日 %H:%M:%S")
-            title_text = f"{html.escape(group_name)} 的群成员邀请关系图表\n{current_date} (UTC+8)"
-            dot.attr(label=title_text, labelloc='t', fontsize='20', fontname='WenQuanYi Zen Hei')
-
-            # --- 节点与边的创建 ---
-            root_nodes_set = {uid for uid in all_in_group if uid not in parent_map}
-            for wxid in sorted(list(all_ids_in_graph)):
-                is_leaver = wxid not in all_in_group
-                nickname = members_map.get(wxid, '')
-                
-                label_parts = []
-                color = "grey88" # 默认颜色
-                if is_leaver:
-                    label_parts.append("已退群")
-                else:
-                    label_parts.append(html.escape(nickname or " "))
-                    color = "lightblue"
-                    if wxid in root_nodes_set:
-                        color = "lightgreen"
-
-                label_parts.append(wxid)
-                # 使用 r"\n" 来确保在 DOT 源码中是字面上的换行符
-                label = r"\n".join(label_parts)
-                dot.node(wxid, label=label, fillcolor=color)
-                
-            for inviter, invitee_list in children_map.items():
-                for invitee in invitee_list:
-                    if inviter in all_ids_in_graph and invitee in all_ids_in_graph:
-                        dot.edge(inviter, invitee)
-            
-            # --- 【重构】调试与渲染 ---
-            self.logger.debug(f"为群 {group_id} 生成的 DOT 源代码:\n{dot.source}")
-            
-            output_path = os.path.join(os.getcwd(), f'invite_tree_{group_id}_{int(time.time() * 1000)}')
-            
-            rendered_path = dot.render(output_path, format=IMAGE_FORMAT, view=False, cleanup=True)
-            if not os.path.exists(rendered_path):
-                self.logger.error("Graphviz 渲染后文件不存在！请检查系统是否已安装Graphviz及相关字体，并查看Graphviz的错误输出。")
+            layout = await self.render_scheduler.render(f"{render_key}:{LAYOUT_FORMAT}", dot.source, dot.engine, LAYOUT_FORMAT,
+                                                        timeout=timeout * LAYOUT_PASS_TIMEOUT_SHARE, observer=observe_layout)
+            positions = parse_plain(layout)
+            if all(name in positions for name in topology[0]):
+                self.layout_cache.store(layout_key, profile.name, positions)
+                self.metrics.inc('layout_reuse', outcome='full')
+            else:
+                self.logger.warning(f"群 {filename_id} 的布局输出缺少部分节点坐标，本次不复用布局")
+                positions = None
+                topology = None
+                layout_seconds = None
+        elif positions is not None:
+            self.metrics.inc('layout_reuse', outcome='incremental')
+            self.logger.info(f"群 {filename_id} 的关系图复用已有布局（{profile.name}），跳过布局计算")
+
+        if positions is None:
+            dot = await self._run_blocking('dot', self._build_invite_digraph, graph, filename_id, group_name, plan,
+                                           leaver_names, profile.engine, profile.graph_attrs)
+            if dot is None:
                 return None
-            
-            return rendered_path
-        
-        except Exception as e:
-            self.logger.error(f"渲染 Graphviz 图形时发生严重错误: {e}\n{traceback.format_exc()}")
-            if 'dot' in locals() and hasattr(dot, 'source'):
-                self.logger.error(f"导致错误的 DOT 源代码是:\n{dot.source}")
+            return await self.render_scheduler.render(render_key, dot.source, dot.engine, profile.fmt,
+                                                      timeout=max(1.0, timeout - (time.monotonic() - started)), observer=observer)
+
+        graph_attrs = dict(profile.graph_attrs)
+        if graph_attrs.get('splines') == 'ortho':
+            # 按给定坐标绘制时 ortho 走线开销与完整布局相当，改用折线
+            graph_attrs['splines'] = 'polyline'
+        dot = await self._run_blocking('dot', self._build_invite_digraph, graph, filename_id, group_name, plan,
+                                       leaver_names, PINNED_RENDER_ENGINE, graph_attrs, positions)
+        if dot is None:
             return None
+        pinned_observer = None
+        if layout_seconds is not None:
+            # 本次刚完成布局：两步合计计入代价模型；复用已有布局时的绘制耗时与完整布局不可比，不计入
+            pinned_observer = lambda seconds, timed_out: observer(layout_seconds + seconds, timed_out)
+        return await self.render_scheduler.render(render_key, dot.source, PINNED_RENDER_ENGINE, profile.fmt,
+                                                  timeout=max(1.0, timeout - (time.monotonic() - started)),
+                                                  observer=pinned_observer, args=PINNED_RENDER_ARGS)
+
+    def _observe_render(self, profile: RenderProfile, work: float, seconds: float, timed_out: bool):
+        self.render_cost_model.observe(profile, work, seconds, timed_out)
+        self.metrics.observe('render_layout', seconds, profile=profile.name)
+
+    def _build_invite_digraph(self, graph: InviteGraph, group_id: str, group_name: str, plan: RenderPlan,
+                              leaver_names: Optional[Dict[str, str]] = None, engine: Optional[str] = None,
+                              graph_attrs: Optional[Dict[str, str]] = None,
+                              positions: Optional[Dict[str, NodeBox]] = None) -> Optional['graphviz.Digraph']:
+        return build_invite_digraph(graph, group_id, group_name, plan, leaver_names, engine, graph_attrs, positions, self.logger)
+
+    def _format_now(self) -> str:
+        tz_utc_8 = timezone(timedelta(hours=8), name='Asia/Shanghai')
+        return datetime.now(tz_utc_8).strftime("%Y年%m月%d日 %H:%M:%S")
+
+    def _format_time(self, timestamp: float) -> str:
+        tz_utc_8 = timezone(timedelta(hours=8), name='Asia/Shanghai')
+        return datetime.fromtimestamp(timestamp, tz_utc_8).strftime("%Y年%m月%d日 %H:%M")
+
+    def _format_join_time(self, record: MemberRecord) -> str:
+        if record.joined_at is not None:
+            return f"入群时间：{self._format_time(record.joined_at)} (UTC+8)"
+        return f"入群时间：早于 {self._format_time(record.first_seen)} (UTC+8，开始记录前已在群)"
+
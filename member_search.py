@@ -0,0 +1,148 @@
+# plugins/GroupInsight/member_search.py
+
+import re
+from bisect import bisect_left
+from itertools import islice
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+
+from .roster import Roster, clean_display_name
+
+NGRAM = 2                    # 模糊匹配使用的 n 元组长度，中文昵称以二元组效果最好
+FUZZY_MIN_SIMILARITY = 0.5   # 模糊匹配的最低 Dice 相似度
+MAX_HITS = 10                # 单次查询最多返回的候选数
+MAX_CANDIDATES = 256         # 每类匹配最多检查的候选数，避免极短的查询在大群中退化为全表扫描
+
+WXID = 'wxid'
+EXACT = 'exact'
+PREFIX = 'prefix'
+SUBSTRING = 'substring'
+FUZZY = 'fuzzy'
+MATCH_RANK = {WXID: 0, EXACT: 1, PREFIX: 2, SUBSTRING: 3, FUZZY: 4}
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_name(text: str) -> str:
+    """检索用的昵称键：去除不可见字符与所有空白后做大小写折叠。"""
+    return _WHITESPACE_RE.sub('', clean_display_name(text)).casefold()
+
+
+def _grams(key: str) -> List[str]:
+    return [key[i:i + NGRAM] for i in range(len(key) - NGRAM + 1)]
+
+
+class SearchHit(NamedTuple):
+    group_id: str
+    wxid: str
+    name: str
+    kind: str      # WXID / EXACT / PREFIX / SUBSTRING / FUZZY
+    score: float   # 同一匹配类型内的排序依据，越大越靠前
+
+
+class MemberSearchIndex:
+    """
+    单个群在群成员的昵称索引，随花名册快照构建一次：
+    - 精确：归一化昵称 -> 成员下标；
+    - 前缀：按归一化昵称排序的数组，二分查找定位区间；
+    - 子串与模糊：二元组倒排表。子串取各二元组倒排表的交集后逐个确认；
+      模糊按共有二元组数计算 Dice 相似度，只检查至少共有一个二元组的成员。
+    查询只返回最优的一类匹配（精确优先于前缀，以此类推）。每类匹配最多检查 MAX_CANDIDATES 个候选，
+    模糊匹配优先使用较短的倒排表，因此极常见的字词在大群中也不会退化为全表扫描，代价是此时结果可能不完整。
+    """
+
+    __slots__ = ('roster', 'keys', '_exact', '_sorted', '_sorted_keys', '_grams')
+
+    def __init__(self, roster: Roster):
+        self.roster = roster
+        keys = [normalize_name(roster.names[i]) for i in range(roster.member_count)]
+        self.keys = keys
+        exact: Dict[str, List[int]] = {}
+        grams: Dict[str, List[int]] = {}
+        for i, key in enumerate(keys):
+            if not key:
+                continue
+            exact.setdefault(key, []).append(i)
+            for gram in dict.fromkeys(_grams(key)):
+                grams.setdefault(gram, []).append(i)
+        self._exact = exact
+        self._sorted: List[Tuple[str, int]] = sorted((key, i) for i, key in enumerate(keys) if key)
+        self._sorted_keys = [key for key, _ in self._sorted]
+        self._grams = grams
+
+    def search(self, query: str, limit: int = MAX_HITS) -> List[SearchHit]:
+        roster = self.roster
+        if query in roster:
+            return [SearchHit(roster.group_id, query, roster.display_name(query), WXID, 1.0)]
+        q = normalize_name(query)
+        if not q:
+            return []
+        scored = self._best_matches(q)
+        if not scored:
+            return []
+        kind, matches = scored
+        matches.sort(key=lambda m: (-m[1], self.keys[m[0]], m[0]))
+        return [SearchHit(roster.group_id, roster.ids[i], roster.names[i], kind, score) for i, score in matches[:limit]]
+
+    def _best_matches(self, q: str):
+        exact = self._exact.get(q)
+        if exact:
+            return EXACT, [(i, 1.0) for i in exact]
+
+        # 同一前缀下按字典序排列，较短的昵称靠前，截断时保留的正是得分最高的一批
+        start = bisect_left(self._sorted_keys, q)
+        prefix = []
+        for key, i in islice(self._sorted, start, start + MAX_CANDIDATES):
+            if not key.startswith(q):
+                break
+            prefix.append((i, len(q) / len(key)))
+        if prefix:
+            return PREFIX, prefix
+
+        q_grams = list(dict.fromkeys(_grams(q)))
+        if not q_grams:
+            # 单字查询没有二元组，退化为逐个检查（仍只涉及非空昵称）
+            substring = list(islice(((i, 1 / len(key)) for key, i in self._sorted if q in key), MAX_CANDIDATES))
+            return (SUBSTRING, substring) if substring else None
+
+        postings = sorted((self._grams.get(gram, ()) for gram in q_grams), key=len)
+        if postings[0]:
+            keys = self.keys
+            substring = list(islice(((i, len(q) / len(keys[i])) for i in postings[0] if q in keys[i]), MAX_CANDIDATES))
+            if substring:
+                return SUBSTRING, substring
+
+        # 从最短的倒排表开始累计候选，候选数达到上限后不再加入更常见的二元组
+        candidates: Dict[int, None] = {}
+        for posting in postings:
+            if candidates and len(candidates) + len(posting) > MAX_CANDIDATES:
+                break
+            candidates.update(dict.fromkeys(posting[:MAX_CANDIDATES]))
+        q_set = set(q_grams)
+        fuzzy = []
+        for i in candidates:
+            key_set = set(_grams(self.keys[i]))
+            score = 2 * len(q_set & key_set) / (len(q_set) + len(key_set))
+            if score >= FUZZY_MIN_SIMILARITY:
+                fuzzy.append((i, score))
+        return (FUZZY, fuzzy) if fuzzy else None
+
+    def estimated_size(self) -> int:
+        # 键字符串、排序数组与倒排表，按成员数粗略估算
+        return len(self.keys) * 160
+
+
+def search_groups(indexes: Iterable[MemberSearchIndex], query: str, limit: int = MAX_HITS) -> List[SearchHit]:
+    """在多个群中查询，只保留所有群中最优的一类匹配；同一 wxid 出现在多个群时保留得分最高的一条。"""
+    best_rank = None
+    hits: Dict[str, SearchHit] = {}
+    for index in indexes:
+        for hit in index.search(query, limit):
+            rank = MATCH_RANK[hit.kind]
+            if best_rank is None or rank < best_rank:
+                best_rank, hits = rank, {}
+            if rank == best_rank and (hit.wxid not in hits or hit.score > hits[hit.wxid].score):
+                hits[hit.wxid] = hit
+            # 每个群的结果只含同一类匹配，遇到更差的类型即可跳过该群余下结果
+            if rank > best_rank:
+                break
+    return sorted(hits.values(), key=lambda h: (-h.score, h.name, h.wxid))[:limit]
@@ -0,0 +1,214 @@
+# plugins/GroupInsight/metrics.py
+
+import asyncio
+import logging
+import os
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from aiohttp import web
+
+METRIC_PREFIX = "groupinsight_"
+# 直方图桶上界（秒），覆盖从内存操作到 Graphviz 超时的整个量级
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+RECENT_WINDOW = 200  # 每个序列保留最近多少个样本用于摘要中的分位数
+DEFAULT_EXPORT_INTERVAL = 30  # 写入指标文件的间隔（秒）
+
+LabelKey = Tuple[Tuple[str, str], ...]
+Collector = Callable[[], Dict[str, float]]
+
+
+def _label_key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class _Histogram:
+    __slots__ = ('counts', 'sum', 'count', 'recent')
+
+    def __init__(self, bucket_count: int):
+        self.counts = [0] * (bucket_count + 1)  # 最后一格为 +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.recent: Deque[float] = deque(maxlen=RECENT_WINDOW)
+
+
+class Metrics:
+    """
+    进程内的轻量指标注册表：计数器、直方图，以及在导出时才求值的采集函数（用于缓存命中率、队列深度等瞬时值）。
+    所有操作都在事件循环线程中进行，不加锁；导出为 Prometheus 文本格式。
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, _Histogram]] = {}
+        self._collectors: List[Collector] = []
+        self.started_at = time.time()
+
+    def inc(self, name: str, value: float = 1, **labels):
+        series = self._counters.setdefault(name, {})
+        key = _label_key(labels)
+        series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels):
+        series = self._histograms.setdefault(name, {})
+        key = _label_key(labels)
+        hist = series.get(key)
+        if hist is None:
+            hist = series[key] = _Histogram(len(self.buckets))
+        hist.counts[bisect_left(self.buckets, seconds)] += 1
+        hist.sum += seconds
+        hist.count += 1
+        hist.recent.append(seconds)
+
+    @contextmanager
+    def span(self, name: str, **labels):
+        """计时上下文：退出时把耗时记入名为 name 的直方图；抛出异常时额外记一次 <name>_errors。"""
+        started = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.inc(f"{name}_errors", **labels)
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def register_collector(self, collector: Collector):
+        self._collectors.append(collector)
+
+    def collect_gauges(self) -> Dict[str, float]:
+        gauges: Dict[str, float] = {}
+        for collector in self._collectors:
+            try:
+                gauges.update(collector())
+            except Exception:
+                continue
+        return gauges
+
+    def counter_value(self, name: str, **labels) -> float:
+        return self._counters.get(name, {}).get(_label_key(labels), 0)
+
+    def counter_series(self, name: str) -> Dict[LabelKey, float]:
+        return dict(self._counters.get(name, {}))
+
+    def histogram_summary(self, name: str) -> Dict[LabelKey, Dict[str, float]]:
+        """每个序列的样本数、平均值与最近样本的 p50 / p95（秒）。"""
+        result = {}
+        for key, hist in self._histograms.get(name, {}).items():
+            recent = sorted(hist.recent)
+            result[key] = {
+                'count': hist.count,
+                'avg': hist.sum / hist.count if hist.count else 0.0,
+                'p50': recent[int(0.5 * (len(recent) - 1))] if recent else 0.0,
+                'p95': recent[int(0.95 * (len(recent) - 1))] if recent else 0.0,
+            }
+        return result
+
+    def render_prometheus(self) -> str:
+        lines: List[str] = []
+        for name, series in sorted(self._counters.items()):
+            full = f"{METRIC_PREFIX}{name}_total"
+            lines.append(f"# TYPE {full} counter")
+            for key, value in sorted(series.items()):
+                lines.append(f"{full}{_format_labels(key)} {value:g}")
+
+        for name, series in sorted(self._histograms.items()):
+            full = f"{METRIC_PREFIX}{name}_seconds"
+            lines.append(f"# TYPE {full} histogram")
+            for key, hist in sorted(series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, hist.counts):
+                    cumulative += count
+                    lines.append(f"{full}_bucket{_format_labels(key, ('le', f'{bound:g}'))} {cumulative}")
+                lines.append(f"{full}_bucket{_format_labels(key, ('le', '+Inf'))} {hist.count}")
+                lines.append(f"{full}_sum{_format_labels(key)} {hist.sum:.6f}")
+                lines.append(f"{full}_count{_format_labels(key)} {hist.count}")
+
+        gauges = self.collect_gauges()
+        gauges['uptime_seconds'] = time.time() - self.started_at
+        for name, value in sorted(gauges.items()):
+            full = f"{METRIC_PREFIX}{name}"
+            lines.append(f"# TYPE {full} gauge")
+            lines.append(f"{full} {float(value):g}")
+        return "\n".join(lines) + "\n"
+
+
+class MetricsExporter:
+    """
+    把指标以 Prometheus 文本格式对外暴露：定期原子写入文件（供 node_exporter textfile 采集），
+    和/或在本机端口上提供 /metrics HTTP 接口。两者都未配置时不做任何事。
+    """
+
+    def __init__(self, metrics: Metrics, file_path: Optional[str] = None, port: Optional[int] = None,
+                 interval: float = DEFAULT_EXPORT_INTERVAL, host: str = '127.0.0.1',
+                 logger: Optional[logging.Logger] = None):
+        self.metrics = metrics
+        self.file_path = file_path or None
+        self.port = port or None
+        self.interval = interval
+        self.host = host
+        self.logger = logger or logging.getLogger("GroupInsightPlugin")
+        self._task: Optional[asyncio.Task] = None
+        self._runner = None
+
+    async def start(self):
+        if self.file_path and self._task is None:
+            self._task = asyncio.ensure_future(self._write_loop())
+        if self.port and self._runner is None:
+            app = web.Application()
+            app.router.add_get('/metrics', self._handle_metrics)
+            self._runner = web.AppRunner(app, access_log=None)
+            await self._runner.setup()
+            try:
+                await web.TCPSite(self._runner, self.host, self.port).start()
+                self.logger.info(f"指标接口已启动: http://{self.host}:{self.port}/metrics")
+            except OSError as e:
+                self.logger.error(f"指标接口端口 {self.port} 启动失败: {e}")
+                await self._runner.cleanup()
+                self._runner = None
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+            await self.write_file()
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def write_file(self):
+        if not self.file_path:
+            return
+        try:
+            await asyncio.to_thread(self._write_atomic, self.metrics.render_prometheus())
+        except OSError as e:
+            self.logger.error(f"写入指标文件 {self.file_path} 失败: {e}")
+
+    def _write_atomic(self, text: str):
+        tmp_path = f"{self.file_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, self.file_path)
+
+    async def _write_loop(self):
+        while True:
+            await self.write_file()
+            await asyncio.sleep(self.interval)
+
+    async def _handle_metrics(self, request: web.Request) -> web.Response:
+        return web.Response(text=self.metrics.render_prometheus(), content_type='text/plain', charset='utf-8')
@@ -0,0 +1,89 @@
+# plugins/GroupInsight/prefetch.py
+
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+DEFAULT_INTERVAL = 45     # 每轮预取的周期（秒），应小于群信息缓存的 TTL
+DEFAULT_BATCH_SIZE = 20   # 每次预取请求携带的群数
+DEFAULT_JITTER = 0.2      # 各批次间隔的随机抖动比例
+INITIAL_DELAY = 5         # 插件启动后首轮预取前的等待（秒），避开启动时的其他初始化
+
+TargetProvider = Callable[[], List[str]]
+BatchRefresher = Callable[[List[str]], Awaitable[None]]
+
+
+class PrefetchWarmer:
+    """
+    后台预取器：周期性刷新一组群的花名册，使指令几乎总能命中新鲜快照。
+    每一轮把目标群切成若干批，批次之间按 interval / 批次数 均匀错开并加入随机抖动，
+    避免所有群在同一时刻集中请求 API。目标列表每轮重新获取，随配置和近期使用情况变化。
+    """
+
+    def __init__(self, targets: TargetProvider, refresher: BatchRefresher, interval: float = DEFAULT_INTERVAL,
+                 batch_size: int = DEFAULT_BATCH_SIZE, jitter: float = DEFAULT_JITTER,
+                 logger: Optional[logging.Logger] = None):
+        self.targets = targets
+        self.refresher = refresher
+        self.interval = max(1.0, interval)
+        self.batch_size = max(1, batch_size)
+        self.jitter = max(0.0, jitter)
+        self.logger = logger or logging.getLogger("GroupInsightPlugin")
+        self._task: Optional[asyncio.Task] = None
+        self.rounds = 0
+        self.batches = 0
+        self.failures = 0
+        self.last_round_at: Optional[float] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        if self.running:
+            return
+        self._task = asyncio.ensure_future(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        await asyncio.sleep(INITIAL_DELAY * random.uniform(0.5, 1.5))
+        while True:
+            started = time.monotonic()
+            await self.run_round()
+            # 本轮耗时已计入周期，下一轮从 interval 的起点开始
+            await asyncio.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+
+    async def run_round(self):
+        group_ids = list(dict.fromkeys(self.targets()))
+        if not group_ids:
+            return
+        batches = [group_ids[i:i + self.batch_size] for i in range(0, len(group_ids), self.batch_size)]
+        spacing = self.interval / len(batches)
+        for n, batch in enumerate(batches):
+            if n:
+                await asyncio.sleep(spacing * random.uniform(1 - self.jitter, 1 + self.jitter))
+            try:
+                await self.refresher(batch)
+                self.batches += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failures += 1
+                self.logger.error(f"后台预取群 {batch} 时出错: {e}")
+        self.rounds += 1
+        self.last_round_at = time.time()
+        self.logger.debug(f"后台预取第 {self.rounds} 轮完成：{len(group_ids)} 个群，{len(batches)} 批")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'rounds': self.rounds,
+            'batches': self.batches,
+            'failures': self.failures,
+        }
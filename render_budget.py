@@ -0,0 +1,113 @@
+# plugins/GroupInsight/render_budget.py
+
+import time
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from .render_scheduler import RenderError
+
+DEFAULT_BUDGET = 60          # 一次关系图渲染（含所有降级尝试）的目标耗时上限（秒）
+BASE_OVERHEAD = 0.3          # 启动 Graphviz 进程等与规模无关的固定开销（秒）
+SAFETY_FACTOR = 0.8          # 预估耗时需不超过剩余预算的这一比例，才会尝试该档位
+OVERRUN_FACTOR = 2.5         # 单次尝试的超时 = 预估耗时 × 此倍数（且不超过剩余预算）
+MIN_ATTEMPT_SECONDS = 3.0    # 单次尝试的最短超时，避免预估过低时刚启动就被终止
+EWMA_ALPHA = 0.3             # 历史耗时对系数的更新权重
+TIMEOUT_PENALTY = 2.0        # 超时后按“实际耗时至少为时限的这一倍数”上调系数，避免下次以略长的时限重蹈覆辙
+JPEG_PIXEL_THRESHOLD = 20_000_000  # 预估像素数超过此值时输出 JPEG（或在允许时输出 SVG），编码更快、体积更小
+
+# 档位名 -> (耗时随规模增长的幂次, 初始系数)。耗时 ≈ BASE_OVERHEAD + 系数 × (节点数 + 边数) ^ 幂次；
+# 初始系数只是保守的先验，实际渲染后按观测值滑动更新。
+COST_PRIORS: Dict[str, Tuple[float, float]] = {
+    'dot-ortho': (2.0, 1e-4),
+    'dot-polyline': (1.5, 8e-4),
+    'dot-line': (1.3, 1e-3),
+    'twopi': (1.2, 2e-3),
+    'twopi-line': (1.15, 1.5e-3),
+    'sfdp': (1.1, 4e-4),
+    'sfdp-fast': (1.05, 2e-4),
+}
+DEFAULT_PRIOR = (1.5, 1e-3)
+
+
+class RenderBudgetExceeded(RenderError):
+    """所有图片档位都无法在时间预算内完成，调用方应改为发送文字版邀请树。"""
+
+
+class RenderProfile(NamedTuple):
+    """一个渲染档位：引擎、完整的图属性与输出格式。同一张图的各档位按画质从高到低排列。"""
+    name: str
+    engine: str
+    graph_attrs: Dict[str, str]
+    fmt: str
+
+
+def choose_format(node_count: int, graph_attrs: Dict[str, str], vector_ok: bool = False) -> str:
+    """
+    按预估像素数选择输出格式：小图用 PNG（文字清晰），超大图用 JPEG；
+    vector_ok 时超大图改用 SVG，省去光栅化且缩放不失真。群聊图片消息无法承载 SVG，插件内发送的图不开启。
+    """
+    dpi = float(graph_attrs.get('dpi', 96))
+    # 每个节点连同间距约占 1.5 英寸见方
+    pixels = node_count * (dpi * 1.5) ** 2
+    if pixels <= JPEG_PIXEL_THRESHOLD:
+        return 'png'
+    return 'svg' if vector_ok else 'jpg'
+
+
+class RenderCostModel:
+    """
+    按档位学习渲染耗时：cost = BASE_OVERHEAD + coef × work ^ exponent，work 为节点数与边数之和。
+    每次渲染完成后用实际耗时反推系数并做指数滑动平均；超时只说明实际耗时不低于超时时间，
+    因此只会把系数向上修正（并乘以 TIMEOUT_PENALTY），不会因为被提前终止而低估。
+    """
+
+    def __init__(self, alpha: float = EWMA_ALPHA):
+        self.alpha = alpha
+        self.coef: Dict[str, float] = {}
+        self.samples: Dict[str, int] = {}
+
+    @staticmethod
+    def work(node_count: int, edge_count: int) -> float:
+        return float(max(1, node_count + edge_count))
+
+    def _prior(self, name: str) -> Tuple[float, float]:
+        return COST_PRIORS.get(name, DEFAULT_PRIOR)
+
+    def estimate(self, profile: RenderProfile, work: float) -> float:
+        exponent, prior = self._prior(profile.name)
+        return BASE_OVERHEAD + self.coef.get(profile.name, prior) * work ** exponent
+
+    def observe(self, profile: RenderProfile, work: float, seconds: float, timed_out: bool = False):
+        exponent, prior = self._prior(profile.name)
+        sample = max(seconds - BASE_OVERHEAD, 0.01) / work ** exponent
+        current = self.coef.get(profile.name, prior)
+        if timed_out:
+            updated = max(current, sample * TIMEOUT_PENALTY)
+        elif profile.name in self.coef:
+            updated = (1 - self.alpha) * current + self.alpha * sample
+        else:
+            updated = sample
+        self.coef[profile.name] = updated
+        self.samples[profile.name] = self.samples.get(profile.name, 0) + 1
+
+    def attempt_timeout(self, estimate: float, remaining: float, cap: float) -> float:
+        return min(remaining, cap, max(estimate * OVERRUN_FACTOR, MIN_ATTEMPT_SECONDS))
+
+    def fits(self, estimate: float, remaining: float) -> bool:
+        return estimate <= remaining * SAFETY_FACTOR
+
+    def stats(self) -> Dict[str, float]:
+        return {f"{name}_coef": coef for name, coef in self.coef.items()}
+
+
+class RenderDeadline:
+    """一次渲染请求的总预算，跨所有降级尝试共享。"""
+
+    __slots__ = ('budget', 'started')
+
+    def __init__(self, budget: float, started: Optional[float] = None):
+        self.budget = budget
+        self.started = started if started is not None else time.monotonic()
+
+    @property
+    def remaining(self) -> float:
+        return max(0.0, self.budget - (time.monotonic() - self.started))
@@ -0,0 +1,204 @@
+# plugins/GroupInsight/render_scheduler.py
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+DEFAULT_WORKERS = 2
+DEFAULT_MAX_QUEUE = 8
+DEFAULT_TIMEOUT = 90
+TIMING_WINDOW = 100  # 统计最近多少个任务的排队/渲染耗时
+
+
+class RenderError(Exception):
+    """Graphviz 进程异常退出或未输出数据。"""
+
+
+class RenderTimeout(RenderError):
+    """渲染超过时限，Graphviz 进程已被终止。"""
+
+
+class RenderQueueFull(RenderError):
+    """渲染队列已满，新任务被拒绝。"""
+
+
+# 渲染成功或超时后的回调：(Graphviz 实际运行耗时, 是否超时)，不含排队时间
+RenderObserver = Callable[[float, bool], None]
+
+
+class _RenderJob:
+    __slots__ = ('key', 'source', 'engine', 'fmt', 'args', 'future', 'enqueued_at', 'timeout', 'observer')
+
+    def __init__(self, key: str, source: str, engine: str, fmt: str, future: asyncio.Future,
+                 timeout: float, observer: Optional[RenderObserver] = None, args: Tuple[str, ...] = ()):
+        self.key = key
+        self.source = source
+        self.engine = engine
+        self.fmt = fmt
+        self.args = args
+        self.future = future
+        self.enqueued_at = time.monotonic()
+        self.timeout = timeout
+        self.observer = observer
+
+
+class RenderScheduler:
+    """
+    专用的 Graphviz 渲染调度器：固定数量的 worker 协程消费有界队列，每个任务在独立的
+    Graphviz 子进程中执行，超时后直接 kill 子进程而不是任其在后台继续占用 CPU。
+    相同 key（同一个群 + 同一份花名册）的在途任务会被合并，只渲染一次。
+    """
+
+    def __init__(self, workers: int = DEFAULT_WORKERS, max_queue: int = DEFAULT_MAX_QUEUE,
+                 timeout: float = DEFAULT_TIMEOUT, logger: Optional[logging.Logger] = None):
+        self.worker_count = max(1, workers)
+        self.timeout = timeout
+        self.logger = logger or logging.getLogger("GroupInsightPlugin")
+        self._queue: "asyncio.Queue[_RenderJob]" = asyncio.Queue(maxsize=max(1, max_queue))
+        self._jobs: Dict[str, _RenderJob] = {}
+        self._workers: list = []
+        self._processes: set = set()
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self.deduplicated = 0
+        self.wait_times: Deque[float] = deque(maxlen=TIMING_WINDOW)
+        self.render_times: Deque[float] = deque(maxlen=TIMING_WINDOW)
+
+    def start(self):
+        if self._workers:
+            return
+        self._workers = [asyncio.ensure_future(self._worker(i)) for i in range(self.worker_count)]
+
+    async def close(self):
+        for worker in self._workers:
+            worker.cancel()
+        for proc in list(self._processes):
+            self._kill(proc)
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        for job in self._jobs.values():
+            if not job.future.done():
+                job.future.set_exception(RenderError("渲染调度器已关闭"))
+        self._jobs.clear()
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    async def render(self, key: str, source: str, engine: str, fmt: str, timeout: Optional[float] = None,
+                     observer: Optional[RenderObserver] = None, args: Tuple[str, ...] = ()) -> bytes:
+        """
+        提交渲染任务并等待结果；相同 key 的在途任务共享结果，队列满时抛出 RenderQueueFull。
+        timeout 为本任务的 Graphviz 运行时限（默认使用调度器的时限），observer 在任务结束后收到实际运行耗时，
+        args 为附加的命令行参数（如 neato 的 -n2）。
+        """
+        job = self._jobs.get(key)
+        if job is not None:
+            self.deduplicated += 1
+            return await asyncio.shield(job.future)
+
+        if not self._workers:
+            self.start()
+        future = asyncio.get_running_loop().create_future()
+        job = _RenderJob(key, source, engine, fmt, future, timeout or self.timeout, observer, args)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise RenderQueueFull(f"渲染队列已满（{self._queue.maxsize}）")
+        self._jobs[key] = job
+        future.add_done_callback(lambda _f, k=key: self._jobs.pop(k, None))
+        return await asyncio.shield(future)
+
+    async def _worker(self, worker_id: int):
+        while True:
+            job = await self._queue.get()
+            wait_time = time.monotonic() - job.enqueued_at
+            self.wait_times.append(wait_time)
+            self.in_flight += 1
+            started = time.monotonic()
+            timed_out = succeeded = False
+            try:
+                result = await self._run_graphviz(job)
+                if not job.future.done():
+                    job.future.set_result(result)
+                self.completed += 1
+                succeeded = True
+            except asyncio.CancelledError:
+                if not job.future.done():
+                    job.future.set_exception(RenderError("渲染任务被取消"))
+                raise
+            except Exception as e:
+                self.failed += 1
+                if isinstance(e, RenderTimeout):
+                    self.timeouts += 1
+                    timed_out = True
+                if not job.future.done():
+                    job.future.set_exception(e)
+            finally:
+                render_time = time.monotonic() - started
+                self.render_times.append(render_time)
+                self.in_flight -= 1
+                self._queue.task_done()
+                # 其他错误（进程崩溃等）的耗时不反映布局成本，不回调
+                if job.observer is not None and (succeeded or timed_out):
+                    try:
+                        job.observer(render_time, timed_out)
+                    except Exception as e:
+                        self.logger.error(f"渲染任务 {job.key} 的耗时回调出错: {e}")
+                self.logger.info(f"渲染任务 {job.key} ({job.engine}) 完成：排队 {wait_time:.2f}s，渲染 {render_time:.2f}s，"
+                                 f"当前队列深度 {self.queue_depth}")
+
+    async def _run_graphviz(self, job: _RenderJob) -> bytes:
+        proc = await asyncio.create_subprocess_exec(
+            job.engine, *job.args, f'-T{job.fmt}',
+            stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+        )
+        self._processes.add(proc)
+        try:
+            stdout, stderr = await asyncio.wait_for(proc.communicate(job.source.encode('utf-8')), timeout=job.timeout)
+        except asyncio.TimeoutError:
+            self._kill(proc)
+            await proc.wait()
+            raise RenderTimeout(f"渲染超过 {job.timeout:.0f} 秒，已终止 {job.engine} 进程")
+        except asyncio.CancelledError:
+            self._kill(proc)
+            raise
+        finally:
+            self._processes.discard(proc)
+
+        if proc.returncode != 0:
+            raise RenderError(f"{job.engine} 退出码 {proc.returncode}: {stderr.decode('utf-8', 'replace').strip()}")
+        if not stdout:
+            raise RenderError(f"{job.engine} 未输出任何数据")
+        return stdout
+
+    @staticmethod
+    def _kill(proc):
+        if proc.returncode is None:
+            try:
+                proc.kill()
+            except ProcessLookupError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        def avg(values) -> float:
+            return sum(values) / len(values) if values else 0.0
+        return {
+            'workers': self.worker_count,
+            'queue_depth': self.queue_depth,
+            'in_flight': self.in_flight,
+            'completed': self.completed,
+            'failed': self.failed,
+            'timeouts': self.timeouts,
+            'rejected': self.rejected,
+            'deduplicated': self.deduplicated,
+            'avg_wait_seconds': avg(self.wait_times),
+            'avg_render_seconds': avg(self.render_times),
+            'max_render_seconds': max(self.render_times, default=0.0),
+        }
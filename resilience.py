@@ -0,0 +1,146 @@
+# plugins/GroupInsight/resilience.py
+
+import random
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, NamedTuple, Optional, Tuple
+
+CLOSED = 'closed'
+HALF_OPEN = 'half_open'
+OPEN = 'open'
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}  # 导出为指标时的数值
+
+DEFAULT_WINDOW = 30.0            # 统计失败率的滑动窗口（秒）
+DEFAULT_MIN_CALLS = 5            # 窗口内至少有这么多次调用才会判断是否熔断
+DEFAULT_FAILURE_RATE = 0.5       # 窗口内失败（含慢调用）比例达到此值即熔断
+DEFAULT_OPEN_SECONDS = 10.0      # 熔断后到首次半开探测的等待（秒）
+MAX_OPEN_SECONDS = 120.0         # 半开探测连续失败时等待时间翻倍，最多到此值
+DEFAULT_SLOW_CALL_SECONDS = 8.0  # 成功但慢于此值的调用也计为失败
+
+StateListener = Callable[[str, str, str], None]  # (熔断器名, 原状态, 新状态)
+
+
+class CircuitOpenError(Exception):
+    """熔断器处于打开状态（或半开探测名额已被占用），调用被直接拒绝。"""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} 熔断中，约 {retry_after:.0f} 秒后恢复探测")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    按滑动时间窗口内的失败率熔断的断路器：
+    - closed：正常放行，记录每次调用结果；窗口内调用数不少于 min_calls 且失败率达到阈值时打开；
+    - open：直接拒绝，open_seconds 后转为半开；
+    - half_open：只放行一个探测请求，成功则关闭并清空窗口，失败则重新打开且等待时间翻倍。
+    只在事件循环线程中使用，不加锁。
+    """
+
+    def __init__(self, name: str, window: float = DEFAULT_WINDOW, min_calls: int = DEFAULT_MIN_CALLS,
+                 failure_rate: float = DEFAULT_FAILURE_RATE, open_seconds: float = DEFAULT_OPEN_SECONDS,
+                 max_open_seconds: float = MAX_OPEN_SECONDS, slow_call_seconds: float = DEFAULT_SLOW_CALL_SECONDS,
+                 on_state_change: Optional[StateListener] = None, clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.window = window
+        self.min_calls = max(1, min_calls)
+        self.failure_rate = failure_rate
+        self.open_seconds = open_seconds
+        self.max_open_seconds = max(open_seconds, max_open_seconds)
+        self.slow_call_seconds = slow_call_seconds
+        self.on_state_change = on_state_change
+        self.clock = clock
+        self.state = CLOSED
+        self._outcomes: Deque[Tuple[float, bool]] = deque()  # (时间, 是否失败)
+        self._failures = 0
+        self._opened_at = 0.0
+        self._open_for = open_seconds
+        self._probe_in_flight = False
+        self.rejected = 0
+        self.opened = 0
+
+    def before_call(self):
+        """调用前检查，被拒绝时抛出 CircuitOpenError；放行后必须以 record() 或 release() 结束。"""
+        if self.state == OPEN:
+            wait = self._opened_at + self._open_for - self.clock()
+            if wait > 0:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, wait)
+            self._transition(HALF_OPEN)
+        if self.state == HALF_OPEN:
+            if self._probe_in_flight:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, self.open_seconds)
+            self._probe_in_flight = True
+
+    def record(self, ok: bool, seconds: float = 0.0):
+        failed = not ok or seconds >= self.slow_call_seconds
+        if self.state == HALF_OPEN:
+            self._probe_in_flight = False
+            if failed:
+                self._open_for = min(self._open_for * 2, self.max_open_seconds)
+                self._open()
+            else:
+                self._open_for = self.open_seconds
+                self._outcomes.clear()
+                self._failures = 0
+                self._transition(CLOSED)
+            return
+        if self.state == OPEN:
+            # 熔断前已发出的请求，结果不再影响状态
+            return
+        now = self.clock()
+        self._outcomes.append((now, failed))
+        self._failures += failed
+        self._trim(now)
+        if len(self._outcomes) >= self.min_calls and self.failure_ratio() >= self.failure_rate:
+            self._open()
+
+    def release(self):
+        """放行的调用未产生结果（如被取消）时归还半开探测名额，不计入统计。"""
+        if self.state == HALF_OPEN:
+            self._probe_in_flight = False
+
+    def failure_ratio(self) -> float:
+        self._trim(self.clock())
+        return self._failures / len(self._outcomes) if self._outcomes else 0.0
+
+    def retry_after(self) -> float:
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self._opened_at + self._open_for - self.clock())
+
+    def _trim(self, now: float):
+        cutoff = now - self.window
+        while self._outcomes and self._outcomes[0][0] < cutoff:
+            _, failed = self._outcomes.popleft()
+            self._failures -= failed
+
+    def _open(self):
+        self._opened_at = self.clock()
+        self.opened += 1
+        self._transition(OPEN)
+
+    def _transition(self, state: str):
+        old, self.state = self.state, state
+        if old != state and self.on_state_change is not None:
+            self.on_state_change(self.name, old, state)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            'state': STATE_VALUES[self.state],
+            'failure_rate': self.failure_ratio(),
+            'rejected': self.rejected,
+            'opened': self.opened,
+        }
+
+
+class RetryPolicy(NamedTuple):
+    """幂等请求的重试策略：指数退避 + 全抖动（每次等待在 [0, min(max_delay, base_delay × 2^n)] 内随机）。"""
+    attempts: int = 3
+    base_delay: float = 0.2
+    max_delay: float = 2.0
+
+    def delay(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
@@ -0,0 +1,149 @@
+# plugins/GroupInsight/roster.py
+
+import hashlib
+import re
+import sys
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# 微信昵称中常见的零宽字符、不换行空格、软连字符、盲文空白等
+_INVISIBLE_CHARS_RE = re.compile(r'[\u200B-\u200F\u202F\u205F\uFEFF\u00A0\u00AD\u2800]')
+
+
+def clean_display_name(text: Any) -> str:
+    if not isinstance(text, str):
+        return ""
+    return _INVISIBLE_CHARS_RE.sub('', text).strip()
+
+
+class Roster:
+    """
+    紧凑的群花名册，每次拉取时由 API 返回的 chatroom_member_list 构建一次，之后不再保留原始数据。
+
+    以并行数组存储：下标 [0, member_count) 为在群成员，其后为被引用但已不在群内的邀请人。
+    - ids: 驻留 (interned) 后的 wxid；names: 预先清洗的显示名（已退群者为空串）；
+    - inviter: 邀请人下标（-1 表示无），array('i')；index: wxid -> 下标。
+    """
+
+    __slots__ = ('group_id', 'group_name', 'ids', 'names', 'inviter', 'member_count', 'index', '_fingerprint')
+
+    def __init__(self, group_id: str, group_name: str, ids: List[str], names: List[str],
+                 inviter: array, member_count: int, index: Optional[Dict[str, int]] = None,
+                 fingerprint: Optional[str] = None):
+        self.group_id = group_id
+        self.group_name = group_name
+        self.ids = ids
+        self.names = names
+        self.inviter = inviter
+        self.member_count = member_count
+        self.index: Dict[str, int] = index if index is not None else {wxid: i for i, wxid in enumerate(ids)}
+        self._fingerprint: Optional[str] = fingerprint
+
+    @classmethod
+    def from_member_list(cls, group_id: str, group_name: str, member_list: List[Dict[str, Any]]) -> 'Roster':
+        ids: List[str] = []
+        index: Dict[str, int] = {}
+        names: List[str] = []
+        inviter_ids: List[Optional[str]] = []
+        for member in member_list:
+            if not isinstance(member, dict):
+                continue
+            wxid = member.get('user_name')
+            if not isinstance(wxid, str) or not wxid.strip() or wxid in index:
+                continue
+            wxid = sys.intern(wxid)
+            index[wxid] = len(ids)
+            ids.append(wxid)
+            names.append(clean_display_name(member.get('nick_name', '') or wxid))
+            inviter = member.get('unknow')
+            inviter_ids.append(inviter if isinstance(inviter, str) and inviter.strip() else None)
+        return cls._assemble(group_id, group_name, ids, index, names, inviter_ids)
+
+    @classmethod
+    def _assemble(cls, group_id: str, group_name: str, ids: List[str], index: Dict[str, int], names: List[str],
+                  inviter_ids: List[Optional[str]]) -> 'Roster':
+        """ids / names / inviter_ids 为在群成员；被引用但不在群内的邀请人追加在其后。"""
+        member_count = len(ids)
+        inviter = array('i', [-1]) * member_count
+        for i, inviter_id in enumerate(inviter_ids):
+            if inviter_id is None:
+                continue
+            j = index.get(inviter_id)
+            if j is None:
+                j = index[inviter_id] = len(ids)
+                ids.append(sys.intern(inviter_id))
+                names.append('')
+                inviter.append(-1)
+            inviter[i] = j
+        return cls(group_id, group_name, ids, names, inviter, member_count, index)
+
+    @classmethod
+    def from_group_data(cls, group_id: str, group_data: Dict[str, Any]) -> 'Roster':
+        group_name = (group_data.get('nickName') or {}).get('str') or group_id
+        member_list = (group_data.get('newChatroomData') or {}).get('chatroom_member_list') or []
+        return cls.from_member_list(group_id, group_name, member_list)
+
+    def with_changes(self, joined: Iterable[Tuple[str, str, Optional[str]]] = (), left: Iterable[str] = ()) -> 'Roster':
+        """
+        【新增】返回应用了入群 / 退群增量的新花名册，原对象不变（快照、邀请关系索引与缓存键都依赖其不可变）。
+        joined 为 (wxid, 昵称, 邀请人wxid)，已在群的成员只在原邀请人缺失时补上邀请人；
+        退群成员若仍是在群成员的邀请人，按惯例作为昵称为空的已退群邀请人保留。
+        """
+        left = set(left)
+        ids: List[str] = []
+        index: Dict[str, int] = {}
+        names: List[str] = []
+        inviter_ids: List[Optional[str]] = []
+        for i in range(self.member_count):
+            wxid = self.ids[i]
+            if wxid in left:
+                continue
+            index[wxid] = len(ids)
+            ids.append(wxid)
+            names.append(self.names[i])
+            p = self.inviter[i]
+            inviter_ids.append(self.ids[p] if p >= 0 else None)
+        for wxid, name, inviter_id in joined:
+            i = index.get(wxid)
+            if i is not None:
+                if inviter_ids[i] is None:
+                    inviter_ids[i] = inviter_id
+                continue
+            wxid = sys.intern(wxid)
+            index[wxid] = len(ids)
+            ids.append(wxid)
+            names.append(clean_display_name(name or wxid))
+            inviter_ids.append(inviter_id)
+        return self._assemble(self.group_id, self.group_name, ids, index, names, inviter_ids)
+
+    def __len__(self) -> int:
+        return self.member_count
+
+    def __contains__(self, wxid: str) -> bool:
+        i = self.index.get(wxid)
+        return i is not None and i < self.member_count
+
+    def is_member(self, i: int) -> bool:
+        return i < self.member_count
+
+    def display_name(self, wxid: str) -> str:
+        i = self.index.get(wxid)
+        if i is not None and i < self.member_count:
+            return self.names[i]
+        return wxid
+
+    def fingerprint(self) -> str:
+        """成员、清洗后的昵称与邀请关系的内容哈希；花名册未变化时保持不变。"""
+        if self._fingerprint is None:
+            h = hashlib.sha1()
+            h.update(str(self.member_count).encode())
+            for wxid, name, p in zip(self.ids, self.names, self.inviter):
+                h.update(f"\x1e{wxid}\x1f{name}\x1f{p}".encode('utf-8'))
+            self._fingerprint = h.hexdigest()
+        return self._fingerprint
+
+    def estimated_size(self) -> int:
+        size = sys.getsizeof(self.ids) + sys.getsizeof(self.names) + sys.getsizeof(self.inviter) + sys.getsizeof(self.index)
+        size += sum(sys.getsizeof(wxid) for wxid in self.ids)
+        size += sum(sys.getsizeof(name) for name in self.names)
+        return size
@@ -0,0 +1,92 @@
+# plugins/GroupInsight/roster_events.py
+
+import re
+import xml.etree.ElementTree as ET
+from typing import Dict, List, NamedTuple, Optional
+
+JOIN = 'join'
+LEAVE = 'leave'
+NOTICE_HINT = '群聊'  # 所有入群 / 退群 / 移出通知都包含该词，普通消息先用它做一次子串判断
+NAME_SEPARATOR = '、'
+
+_Q = r'["“]([^"”]+)["”]'
+_SELF = '你'
+_INVITE = re.compile(rf'^(?:{_Q}|{_SELF})邀请(?:{_Q}|{_SELF})加入了群聊')
+_QR_JOIN = re.compile(rf'^{_Q}通过扫描(?:{_Q}|{_SELF})分享的二维码加入群聊')
+_KICK = re.compile(rf'^(?:{_Q}|{_SELF})将{_Q}移出了群聊')
+_LEAVE = re.compile(rf'^{_Q}(?:已)?退出了?群聊')
+_PLACEHOLDER = re.compile(r'^\$(\w+)\$$')
+
+
+class MemberRef(NamedTuple):
+    """通知中提到的成员；纯文本通知只有昵称（wxid 为 None），系统消息模板中两者都有。"""
+    wxid: Optional[str]
+    name: str
+
+
+SELF = MemberRef(None, '')  # 通知中的“你”，即机器人自己，wxid 未知
+
+
+class RosterEvent(NamedTuple):
+    kind: str                       # JOIN / LEAVE（主动退群与被移出均为 LEAVE）
+    members: List[MemberRef]
+    inviter: Optional[MemberRef]    # 仅 JOIN：邀请人或二维码分享者
+
+
+def parse_roster_event(text: str) -> Optional[RosterEvent]:
+    """
+    解析微信群的入群 / 退群 / 移出通知，不是这类通知时返回 None。支持两种形式：
+    - 纯文本：`"A"邀请"B、C"加入了群聊`、`"B"通过扫描"A"分享的二维码加入群聊`、`"A"将"B"移出了群聊`、`"B"退出了群聊`；
+    - 系统消息模板 XML（sysmsgtemplate）：模板文字相同，引号内为 $占位符$，link_list 中给出各占位符对应成员的 wxid 与昵称。
+    """
+    text = text.strip()
+    links: Dict[str, List[MemberRef]] = {}
+    if text.startswith('<'):
+        parsed = _parse_template(text)
+        if parsed is None:
+            return None
+        text, links = parsed
+
+    def refs(group: Optional[str]) -> List[MemberRef]:
+        if group is None:
+            return [SELF]
+        placeholder = _PLACEHOLDER.match(group)
+        if placeholder is not None:
+            return links.get(placeholder.group(1), [])
+        return [MemberRef(None, name.strip()) for name in group.split(NAME_SEPARATOR) if name.strip()]
+
+    match = _INVITE.match(text)
+    if match is not None:
+        inviter = refs(match.group(1))
+        return RosterEvent(JOIN, refs(match.group(2)), inviter[0] if inviter else None)
+    match = _QR_JOIN.match(text)
+    if match is not None:
+        inviter = refs(match.group(2))
+        return RosterEvent(JOIN, refs(match.group(1)), inviter[0] if inviter else None)
+    match = _KICK.match(text)
+    if match is not None:
+        return RosterEvent(LEAVE, refs(match.group(2)), None)
+    match = _LEAVE.match(text)
+    if match is not None:
+        return RosterEvent(LEAVE, refs(match.group(1)), None)
+    return None
+
+
+def _parse_template(text: str):
+    """解析 sysmsgtemplate，返回 (模板文字, {占位符: 成员列表})；不是该类消息或格式不符时返回 None。"""
+    start = text.find('<sysmsg')
+    if start < 0:
+        return None
+    try:
+        root = ET.fromstring(text[start:])
+    except ET.ParseError:
+        return None
+    template = root.findtext('.//content_template/template')
+    if not template:
+        return None
+    links = {}
+    for link in root.iterfind('.//content_template/link_list/link'):
+        members = [MemberRef((m.findtext('username') or '').strip() or None, (m.findtext('nickname') or '').strip())
+                   for m in link.iterfind('.//memberlist/member')]
+        links[link.get('name', '')] = members
+    return template.strip(), links
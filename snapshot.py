@@ -0,0 +1,63 @@
+# plugins/GroupInsight/snapshot.py
+
+import time
+from typing import Optional
+
+from .invite_graph import InviteGraph
+from .member_search import MemberSearchIndex
+from .roster import Roster
+
+
+class GroupSnapshot:
+    """
+    一次 GetChatRoomInfo 拉取结果的快照，作为缓存的值。只保留紧凑的 Roster，不保留原始 API 数据；
+    邀请关系索引 (InviteGraph) 与昵称检索索引 (MemberSearchIndex) 在首次使用时构建（拉取时可预先传入），
+    之后随快照一起缓存，直到快照被刷新替换。
+    fetched_at 为花名册内容对应的时间；reconciled_at 为最近一次完整拉取的时间，
+    由入群 / 退群通知增量更新得到的快照沿用被更新快照的 reconciled_at。
+    """
+
+    __slots__ = ('group_id', 'roster', 'fetched_at', 'reconciled_at', '_graph', '_search_index')
+
+    def __init__(self, group_id: str, roster: Roster, fetched_at: Optional[float] = None,
+                 graph: Optional[InviteGraph] = None, search_index: Optional[MemberSearchIndex] = None,
+                 reconciled_at: Optional[float] = None):
+        self.group_id = group_id
+        self.roster = roster
+        self.fetched_at = fetched_at if fetched_at is not None else time.time()
+        self.reconciled_at = reconciled_at if reconciled_at is not None else self.fetched_at
+        self._graph: Optional[InviteGraph] = graph
+        self._search_index: Optional[MemberSearchIndex] = search_index
+
+    @property
+    def name(self) -> str:
+        return self.roster.group_name
+
+    @property
+    def has_graph(self) -> bool:
+        return self._graph is not None
+
+    @property
+    def graph(self) -> InviteGraph:
+        if self._graph is None:
+            self._graph = InviteGraph(self.roster)
+        return self._graph
+
+    @property
+    def has_search_index(self) -> bool:
+        return self._search_index is not None
+
+    @property
+    def search_index(self) -> MemberSearchIndex:
+        if self._search_index is None:
+            self._search_index = MemberSearchIndex(self.roster)
+        return self._search_index
+
+    def estimated_size(self) -> int:
+        size = self.roster.estimated_size()
+        if self._search_index is not None:
+            size += self._search_index.estimated_size()
+        if self._graph is not None:
+            # 索引数组约为花名册本身的数倍，按节点数粗略估算
+            size += len(self.roster.ids) * 64
+        return size
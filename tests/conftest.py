@@ -0,0 +1,11 @@
+# plugins/GroupInsight/tests/conftest.py
+
+import os
+import sys
+
+# 测试按顶层模块导入插件的各个文件；未安装 LangBot 时注入与基准测试相同的 pkg.* 替身，使插件包本身也能被导入
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import langbot_stubs  # noqa: E402
+
+langbot_stubs.install()
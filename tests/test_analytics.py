@@ -0,0 +1,34 @@
+# plugins/GroupInsight/tests/test_analytics.py
+
+import importlib
+import os
+import sys
+import unittest
+
+from benchmarks.synthetic import SHAPES, generate_member_list
+
+# 插件模块使用相对导入，需以包的形式导入（与 benchmarks/run.py 相同）
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(PLUGIN_DIR))
+_package = os.path.basename(PLUGIN_DIR)
+analytics = importlib.import_module(f"{_package}.analytics")
+graph_render = importlib.import_module(f"{_package}.graph_render")
+InviteGraph = importlib.import_module(f"{_package}.invite_graph").InviteGraph
+Roster = importlib.import_module(f"{_package}.roster").Roster
+
+
+class StarRatioTest(unittest.TestCase):
+
+    def test_star_ratio_matches_render_heuristic_for_whole_group(self):
+        for shape in SHAPES:
+            for size in (30, 3000):
+                with self.subTest(shape=shape, size=size):
+                    graph = InviteGraph(Roster.from_member_list('g@chatroom', 'G', generate_member_list(size, shape)))
+                    plan = graph_render.plan_render(graph)
+                    hub = max(plan.nodes, key=lambda v: len(graph.children[v]))
+                    expected = len(graph.children[hub]) / (len(plan.nodes) + sum(plan.summaries.values()))
+                    self.assertAlmostEqual(analytics.compute_group_stats(graph).star_ratio, expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
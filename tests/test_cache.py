@@ -0,0 +1,31 @@
+# plugins/GroupInsight/tests/test_cache.py
+
+import asyncio
+import unittest
+
+from cache import GroupInfoCache
+
+
+class GroupInfoCacheCloseTest(unittest.TestCase):
+
+    def test_close_resolves_pending_batch_loads(self):
+        async def scenario():
+            cache = GroupInfoCache()
+
+            async def slow_loader(keys):
+                await asyncio.sleep(60)
+                return {}
+
+            waiting = asyncio.ensure_future(cache.get_many(['a', 'b'], slow_loader))
+            await asyncio.sleep(0)
+            await asyncio.sleep(0)
+            await cache.close()
+            return await asyncio.wait_for(waiting, 1), cache.stats()['inflight']
+
+        results, inflight = asyncio.run(scenario())
+        self.assertEqual(results, {'a': None, 'b': None})
+        self.assertEqual(inflight, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+# plugins/GroupInsight/tests/test_invite_graph.py
+
+import importlib
+import os
+import sys
+import unittest
+
+# invite_graph 使用相对导入，需以包的形式导入（与 benchmarks/run.py 相同）
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(PLUGIN_DIR))
+_package = os.path.basename(PLUGIN_DIR)
+InviteGraph = importlib.import_module(f"{_package}.invite_graph").InviteGraph
+Roster = importlib.import_module(f"{_package}.roster").Roster
+
+
+def build(members):
+    member_list = [{'user_name': wxid, 'nick_name': wxid, 'unknow': inviter} for wxid, inviter in members]
+    return InviteGraph(Roster.from_member_list('g@chatroom', 'G', member_list))
+
+
+def downline(graph, wxid):
+    return sorted(graph.ids[u] for u in graph.full_downline(graph.index[wxid]))
+
+
+def invitees(graph, wxid):
+    return sorted(graph.ids[u] for u in graph.invitees(graph.index[wxid]))
+
+
+class InviteCycleTest(unittest.TestCase):
+
+    def test_downline_of_cycle_member_does_not_depend_on_roster_order(self):
+        members = [('a', 'b'), ('b', 'a'), ('c', 'b'), ('d', 'a')]
+        for order in (members, members[::-1]):
+            graph = build(order)
+            self.assertEqual(downline(graph, 'a'), ['b', 'c', 'd'])
+            self.assertEqual(downline(graph, 'b'), ['a', 'c', 'd'])
+            self.assertEqual(invitees(graph, 'a'), ['b', 'd'])
+            self.assertEqual(invitees(graph, 'b'), ['a', 'c'])
+
+    def test_downline_outside_cycles_matches_tree(self):
+        graph = build([('a', None), ('b', 'a'), ('c', 'b'), ('d', 'x')])
+        self.assertEqual(downline(graph, 'a'), ['b', 'c'])
+        self.assertEqual(downline(graph, 'c'), [])
+        self.assertEqual(invitees(graph, 'x'), ['d'])
+
+
+if __name__ == '__main__':
+    unittest.main()
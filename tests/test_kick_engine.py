@@ -0,0 +1,78 @@
+# plugins/GroupInsight/tests/test_kick_engine.py
+
+import asyncio
+import unittest
+from unittest import mock
+
+from kick_engine import KickEngine, KickTimeout, KickTransportError, KickUnavailable
+
+
+def run_engine(sender, member_ids, **kwargs):
+    engine = KickEngine(sender, rate_per_minute=0, **{'batch_size': 4, 'concurrency': 1, 'max_retries': 2, **kwargs})
+    # 退避等待与本测试无关，直接跳过
+    with mock.patch('asyncio.sleep', new=mock.AsyncMock()):
+        return asyncio.run(engine.run(member_ids))
+
+
+class KickEngineTest(unittest.TestCase):
+
+    def test_rejected_batch_is_split_down_to_the_failing_member(self):
+        calls = []
+
+        async def sender(batch):
+            calls.append(list(batch))
+            return 'bad' not in batch, "不在群内"
+
+        report = run_engine(sender, ['a', 'b', 'bad', 'c', 'd'], max_retries=0)
+        self.assertEqual(sorted(report.removed), ['a', 'b', 'c', 'd'])
+        self.assertEqual(report.failed, {'bad': "不在群内"})
+        self.assertEqual(calls[0], ['a', 'b', 'bad', 'c'])
+        self.assertIn(['bad'], calls)
+
+    def test_transport_errors_are_retried_without_splitting(self):
+        attempts = []
+
+        async def sender(batch):
+            attempts.append(list(batch))
+            if len(attempts) < 3:
+                raise KickTransportError("网络请求失败")
+            return True, "操作成功"
+
+        report = run_engine(sender, ['a', 'b', 'c'])
+        self.assertEqual(report.removed, ['a', 'b', 'c'])
+        self.assertEqual(attempts, [['a', 'b', 'c']] * 3)
+        self.assertEqual(report.retries, 2)
+
+    def test_exhausted_transport_errors_fail_without_splitting(self):
+        async def sender(batch):
+            raise KickTransportError("网络请求失败")
+
+        report = run_engine(sender, ['a', 'b'])
+        self.assertEqual(report.failed, {'a': "网络请求失败", 'b': "网络请求失败"})
+        self.assertEqual(report.requests, 3)
+
+    def test_timed_out_batch_is_reported_unconfirmed(self):
+        async def sender(batch):
+            raise KickTimeout("请求超时")
+
+        report = run_engine(sender, ['a', 'b'])
+        self.assertEqual(report.unconfirmed, {'a': "请求超时", 'b': "请求超时"})
+        self.assertEqual(report.failed, {})
+
+    def test_open_circuit_aborts_and_leaves_the_rest_not_attempted(self):
+        calls = []
+
+        async def sender(batch):
+            calls.append(list(batch))
+            raise KickUnavailable("熔断中")
+
+        report = run_engine(sender, [f"m{i}" for i in range(10)])
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(report.aborted, "熔断中")
+        self.assertEqual(sorted(report.not_attempted), sorted(f"m{i}" for i in range(10)))
+        self.assertEqual(report.failed, {})
+        self.assertEqual(report.processed, report.total)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,253 @@
+# plugins/GroupInsight/warm_start.py
+
+import asyncio
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .invite_graph import InviteGraph
+from .roster import Roster
+from .snapshot import GroupSnapshot
+
+MAGIC = b'GIWS'
+FORMAT_VERSION = 1
+_PREAMBLE = struct.Struct('<4sII')  # 魔数、格式版本、头部 JSON 的字节数
+DEFAULT_MAX_AGE = 24 * 3600         # 拉取时间早于此（秒）的快照在启动时直接丢弃
+STRING_SEPARATOR = '\x00'           # wxid 与清洗后的昵称中不会出现的分隔符
+GRAPH_ARRAYS = ('tree_parent', 'depth', 'root', 'subtree_size', 'tin', 'tout', 'order')
+
+Sections = Dict[str, Tuple[int, int]]  # 段名 -> (相对数据区起点的偏移, 字节数)
+
+
+class WarmStartStore:
+    """
+    群快照的启动预热文件：保存时把缓存中各群的 Roster（及已构建的 InviteGraph 索引数组）写成一个文件，
+    重启后按需恢复，使第一次查询不必等待 API 与建图。
+
+    文件布局：魔数 + 版本 + 头部长度，JSON 头部（每个群的元数据与各段偏移），之后是原始数据段：
+    wxid / 昵称以 NUL 连接的 UTF-8，其余均为 array('i') 的原始字节。读取时只解析头部并 mmap 整个文件，
+    某个群第一次被查询时才从对应的段恢复（array.frombytes 为一次内存拷贝），其余群不占用内存。
+    尚未恢复的群在下次保存时按原始字节原样写回，不会因为重启后没被查询而丢失。
+    """
+
+    def __init__(self, path: str, max_age: float = DEFAULT_MAX_AGE, logger: Optional[logging.Logger] = None):
+        self.path = path
+        self.max_age = max_age
+        self.logger = logger or logging.getLogger("GroupInsightPlugin")
+        self._lock = asyncio.Lock()
+        self._loaded = False
+        self._file = None
+        self._mm: Optional[mmap.mmap] = None
+        self._data_start = 0
+        self._pending: Dict[str, Dict[str, Any]] = {}  # 尚未恢复的群ID -> 头部中的元数据
+        self.restored = 0
+        self.saves = 0
+        self.saved_groups = 0
+        self.save_failures = 0
+        self.last_save_seconds = 0.0
+        self.last_saved_at: Optional[float] = None
+
+    def __contains__(self, group_id: str) -> bool:
+        return group_id in self._pending
+
+    async def take(self, group_ids: Iterable[str]) -> Dict[str, GroupSnapshot]:
+        """恢复并移出给定群的快照；文件中没有的群忽略。首次调用时才读取文件头部。"""
+        async with self._lock:
+            await self._ensure_loaded()
+            entries = {gid: self._pending.pop(gid) for gid in dict.fromkeys(group_ids) if gid in self._pending}
+            if not entries:
+                return {}
+            snapshots = await asyncio.to_thread(self._restore_many, entries)
+            if not self._pending:
+                self._close_map()
+        self.restored += len(snapshots)
+        return snapshots
+
+    async def save(self, snapshots: Iterable[GroupSnapshot]) -> Optional[int]:
+        """把给定快照与尚未恢复的旧快照写入新文件（先写临时文件再替换），返回写入的群数，失败时返回 None。"""
+        async with self._lock:
+            await self._ensure_loaded()
+            snapshots = list(snapshots)
+            current = {s.group_id for s in snapshots}
+            for gid in [gid for gid in self._pending if gid in current]:
+                del self._pending[gid]
+            started = time.perf_counter()
+            try:
+                count, pending = await asyncio.to_thread(self._write, snapshots)
+            except (OSError, ValueError) as e:
+                self.save_failures += 1
+                self.logger.error(f"保存群快照预热文件 {self.path} 失败: {e}")
+                if self._mm is None:
+                    self._pending.clear()
+                return None
+            self._pending = pending
+            self.saves += 1
+            self.saved_groups = count
+            self.last_save_seconds = time.perf_counter() - started
+            self.last_saved_at = time.time()
+            return count
+
+    async def close(self):
+        async with self._lock:
+            self._close_map()
+            self._pending.clear()
+
+    async def _ensure_loaded(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            loaded = await asyncio.to_thread(self._open)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"读取群快照预热文件 {self.path} 失败，本次启动不预热: {e}")
+            return
+        if loaded:
+            self.logger.info(f"已读取群快照预热文件 {self.path}：{len(self._pending)} 个群可在首次查询时直接使用")
+
+    def _open(self) -> bool:
+        f = open(self.path, 'rb')
+        try:
+            preamble = f.read(_PREAMBLE.size)
+            if len(preamble) < _PREAMBLE.size:
+                raise ValueError("文件不完整")
+            magic, version, header_len = _PREAMBLE.unpack(preamble)
+            if magic != MAGIC or version != FORMAT_VERSION:
+                self.logger.info(f"群快照预热文件 {self.path} 的格式版本不匹配，已忽略")
+                f.close()
+                return False
+            header = json.loads(f.read(header_len).decode('utf-8'))
+            if header.get('byteorder') != sys.byteorder or header.get('itemsize') != array('i').itemsize:
+                self.logger.info(f"群快照预热文件 {self.path} 由不同字节序或整数宽度的平台写入，已忽略")
+                f.close()
+                return False
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            f.close()
+            raise
+        cutoff = time.time() - self.max_age
+        self._file, self._mm = f, mm
+        self._data_start = _PREAMBLE.size + header_len
+        self._pending = {g['group_id']: g for g in header.get('groups', []) if g.get('fetched_at', 0) >= cutoff}
+        if not self._pending:
+            self._close_map()
+        return bool(self._pending)
+
+    def _close_map(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _section(self, entry: Dict[str, Any], name: str) -> memoryview:
+        offset, length = entry['sections'][name]
+        start = self._data_start + offset
+        return memoryview(self._mm)[start:start + length]
+
+    def _restore_many(self, entries: Dict[str, Dict[str, Any]]) -> Dict[str, GroupSnapshot]:
+        snapshots = {}
+        for gid, entry in entries.items():
+            try:
+                snapshots[gid] = self._restore(entry)
+            except (KeyError, ValueError, IndexError, TypeError) as e:
+                self.logger.warning(f"恢复群 {gid} 的预热快照失败，将重新拉取: {e}")
+        return snapshots
+
+    def _restore(self, entry: Dict[str, Any]) -> GroupSnapshot:
+        def ints(name: str) -> array:
+            values = array('i')
+            values.frombytes(self._section(entry, name))
+            return values
+
+        inviter = ints('inviter')
+
+        def strings(name: str) -> List[str]:
+            # 节点数取自邀请人数组：只有一个昵称且为空串时，拼接结果同样是空串
+            text = self._section(entry, name).tobytes().decode('utf-8')
+            return text.split(STRING_SEPARATOR) if inviter else []
+
+        ids = [sys.intern(wxid) for wxid in strings('ids')]
+        names = strings('names')
+        if not (len(ids) == len(names) == len(inviter)):
+            raise ValueError("各段长度不一致")
+        roster = Roster(entry['group_id'], entry['group_name'], ids, names, inviter, entry['member_count'],
+                        fingerprint=entry.get('fingerprint'))
+        graph = None
+        if 'order' in entry['sections']:
+            graph = InviteGraph.from_arrays(roster, {name: ints(name) for name in GRAPH_ARRAYS}, entry.get('cycles', []))
+        return GroupSnapshot(entry['group_id'], roster, entry['fetched_at'], graph=graph)
+
+    def _write(self, snapshots: List[GroupSnapshot]) -> Tuple[int, Dict[str, Dict[str, Any]]]:
+        """在线程中执行。返回写入的群数与重新指向新文件的待恢复条目。"""
+        chunks: List[bytes] = []
+        offset = 0
+        groups = []
+
+        def add(sections: Sections, name: str, data: bytes):
+            nonlocal offset
+            sections[name] = (offset, len(data))
+            chunks.append(data)
+            offset += len(data)
+
+        for snapshot in snapshots:
+            roster = snapshot.roster
+            sections: Sections = {}
+            add(sections, 'ids', STRING_SEPARATOR.join(roster.ids).encode('utf-8'))
+            add(sections, 'names', STRING_SEPARATOR.join(roster.names).encode('utf-8'))
+            add(sections, 'inviter', roster.inviter.tobytes())
+            entry = {'group_id': snapshot.group_id, 'group_name': roster.group_name, 'fetched_at': snapshot.fetched_at,
+                     'member_count': roster.member_count, 'fingerprint': roster.fingerprint(), 'sections': sections}
+            if snapshot.has_graph:
+                graph = snapshot.graph
+                for name in GRAPH_ARRAYS:
+                    add(sections, name, getattr(graph, name).tobytes())
+                entry['cycles'] = graph.cycles
+            groups.append(entry)
+
+        # 尚未恢复的旧快照按原始字节写回
+        carried = {}
+        for gid, old in self._pending.items():
+            sections = {}
+            for name in old['sections']:
+                add(sections, name, self._section(old, name).tobytes())
+            entry = {**old, 'sections': sections}
+            groups.append(entry)
+            carried[gid] = entry
+
+        header = json.dumps({'byteorder': sys.byteorder, 'itemsize': array('i').itemsize, 'saved_at': time.time(),
+                             'groups': groups}, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header)))
+            f.write(header)
+            for chunk in chunks:
+                f.write(chunk)
+        # 旧文件仍被映射时在部分平台上无法替换，先关闭映射，之后映射新文件继续提供待恢复的群
+        self._close_map()
+        os.replace(tmp_path, self.path)
+        if carried:
+            self._file = open(self.path, 'rb')
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._data_start = _PREAMBLE.size + len(header)
+        return len(groups), carried
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'pending': len(self._pending),
+            'restored': self.restored,
+            'saves': self.saves,
+            'saved_groups': self.saved_groups,
+            'save_failures': self.save_failures,
+            'last_save_seconds': self.last_save_seconds,
+        }